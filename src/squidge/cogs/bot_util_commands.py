@@ -9,7 +9,6 @@ from discord.ext import commands
 from discord.ext.commands import Context
 
 from src.squidge.entry.consts import COMMAND_SYMBOL
-from src.squidge.savedata.topics import TOPICS, TOPICS_FR, THROTTLE_TOPICS
 
 
 class BotUtilCommands(commands.Cog):
@@ -51,11 +50,13 @@ class BotUtilCommands(commands.Cog):
         help=f'{COMMAND_SYMBOL}topic',
         pass_ctx=True)
     async def topic(self, ctx: Context):
+        # The topics are a long list, so only load them when they're asked for
+        from src.squidge.savedata import topics
         if self._within_limit():
-            topic_to_discuss = random.choice(TOPICS)
+            topic_to_discuss = random.choice(topics.TOPICS)
             await ctx.send(f"You should discuss... `{topic_to_discuss}` ...Go!")
         else:
-            topic_to_discuss = random.choice(THROTTLE_TOPICS)
+            topic_to_discuss = random.choice(topics.THROTTLE_TOPICS)
             await ctx.send(topic_to_discuss)
 
     @commands.command(
@@ -66,9 +67,33 @@ class BotUtilCommands(commands.Cog):
         help=f'{COMMAND_SYMBOL}sujet',
         pass_ctx=True)
     async def sujet(self, ctx: Context):
-        topic_to_discuss = random.choice(TOPICS_FR)
+        from src.squidge.savedata import topics
+        topic_to_discuss = random.choice(topics.TOPICS_FR)
         await ctx.send(f"Vous devriez discuter... `{topic_to_discuss}` ...C'est parti !")
 
+    @commands.command(
+        name='timings',
+        description="Shows how many messages went through each stage of message processing, and the time taken. "
+                    "Use 'reset' to start counting again.",
+        brief="Message processing timings.",
+        aliases=['message_timings'],
+        help=f'{COMMAND_SYMBOL}timings [reset]',
+        pass_ctx=True)
+    async def timings(self, ctx: Context, option: str = ''):
+        await ctx.send(f"```\n{self.bot.message_timings.report()}\n```")
+        if option.lower() == 'reset':
+            self.bot.message_timings.reset()
+
+    @commands.command(
+        name='startup',
+        description="Shows how long each step of starting the bot took, from the process starting to being ready.",
+        brief="Startup timings.",
+        aliases=['startup_timings'],
+        help=f'{COMMAND_SYMBOL}startup',
+        pass_ctx=True)
+    async def startup(self, ctx: Context):
+        await ctx.send(f"```\n{self.bot.startup_timings.report()}\n```")
+
     def _within_limit(self) -> bool:
         """Check if rate limit has been exceeded."""
         now = time()
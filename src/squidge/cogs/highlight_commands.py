@@ -1,5 +1,7 @@
 import asyncio
 import re
+import time
+from functools import lru_cache
 from typing import Union, Optional
 
 from discord import User, Message, DMChannel, TextChannel
@@ -15,8 +17,17 @@ class HighlightCommands(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self._prefilter: Optional[HighlightPrefilter] = None
         super().__init__()
 
+    @property
+    def prefilter(self) -> 'HighlightPrefilter':
+        """The prefilter for the current highlights, rebuilt if they were changed or reloaded."""
+        saved_highlights = self.bot.save_data.highlights
+        if self._prefilter is None or self._prefilter.source is not saved_highlights:
+            self._prefilter = HighlightPrefilter(saved_highlights)
+        return self._prefilter
+
     @commands.command(
         name='highlight',
         description="Notifies you for a given phrase.",
@@ -26,6 +37,7 @@ class HighlightCommands(commands.Cog):
         pass_ctx=True)
     async def highlight(self, ctx: Context, *, phrase: str):
         added = toggle_highlight(self.bot.save_data.highlights, ctx.author.id, phrase)
+        self._prefilter = None
         if added:
             no_space_warning = "" if '\\b' in phrase else \
                 "Note: your phrase doesn't have \\b in it, so might match inside words. Discord trims spaces from messages! " \
@@ -35,21 +47,80 @@ class HighlightCommands(commands.Cog):
             await ctx.send(f"You are no longer watching `{phrase}`.")
         await self.bot.save_data.save(ctx)
 
-    async def process_highlight(self, ctx: Context):
-        """Send a highlight message if appropriate"""
+    async def process_highlight(self, message: Message):
+        """Send a highlight message if appropriate. Messages in DMs are never highlighted."""
+        if not message.content or isinstance(message.channel, DMChannel):
+            return
         saved_highlights = self.bot.save_data.highlights
-        for user_id, watched in saved_highlights.highlights.items():
-            found = should_highlight(saved_highlights, user_id, ctx.message)
+        timings = self.bot.message_timings
+        start = time.perf_counter()
+        candidates = self.prefilter.candidates(message.content)
+        timings.record("highlight prefilter", time.perf_counter() - start, bool(candidates))
+        if not candidates:
+            return
+
+        for user_id in candidates:
+            with timings.time("highlight match"):
+                found = should_highlight(saved_highlights, user_id, message)
             if found:
                 user_id_int = int(user_id)
-                channel: TextChannel = ctx.channel
+                channel: TextChannel = message.channel
                 # Make sure the user can see this channel!
                 if any(user_id_int == member.id for member in channel.members):
-                    user = ctx.bot.get_user(user_id_int)
-                    await user.send(f"Hey! Your highlight `{found}` was mentioned at: {ctx.message.jump_url}")
+                    user = self.bot.get_user(user_id_int)
+                    await user.send(f"Hey! Your highlight `{found}` was mentioned at: {message.jump_url}")
             await asyncio.sleep(0.001)  # yield
 
 
+class HighlightPrefilter:
+    """
+    Cheaply narrows down whose highlights could match a message, before running their regexes.
+
+    Each highlight is split on its \\b boundaries, and if every part is plain word characters
+    the longest part must appear in the message for the highlight to match. All those required parts are
+    searched for with one combined regex, so most messages are ruled out with a single scan;
+    after that only users with a required part in the message (by substring check) are matched in full.
+    Highlights with other regex syntax can't be reduced to a required part and are always matched in full.
+    """
+
+    def __init__(self, saved_highlights: Highlights):
+        self.source = saved_highlights
+        # User id to the required parts of their highlights, for users whose highlights all have one
+        self.required: dict[str, set[str]] = {}
+        # Users with a highlight that must always be checked
+        self.unfiltered: list[str] = []
+        for user_id, watched in saved_highlights.highlights.items():
+            parts = set()
+            for raw_highlight in watched:
+                part = _required_part(raw_highlight)
+                if part is None:
+                    self.unfiltered.append(user_id)
+                    break
+                parts.add(part)
+            else:
+                if parts:
+                    self.required[user_id] = parts
+
+        every_part = sorted({part for parts in self.required.values() for part in parts}, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(map(re.escape, every_part)), re.IGNORECASE) if every_part else None
+
+    def candidates(self, content: str) -> list[str]:
+        """Return the users whose highlights might match the content."""
+        if self.pattern is None or not self.pattern.search(content):
+            return self.unfiltered
+        lowered = content.lower()
+        return self.unfiltered + [user_id for user_id, parts in self.required.items()
+                                  if any(part in lowered for part in parts)]
+
+
+def _required_part(raw_highlight: str) -> Optional[str]:
+    """Return the longest literal part (lowercase) a message must contain to match the highlight, or None."""
+    parts = [part for part in raw_highlight.split("\\b") if part]
+    if not parts or not all(re.fullmatch(r'\w+', part) for part in parts):
+        return None
+    return max(parts, key=len).lower()
+
+
 def standardise_user_id(user: Union[User, str, int]) -> str:
     """Return the user/user id object as an id str."""
     user_id = str(user.id) if isinstance(user, User) else str(user)
@@ -84,11 +155,16 @@ def should_highlight(saved_highlights: Highlights, user, message: Message) -> Op
         content = " " + message.content + " "
         for raw_highlight in saved_highlights.highlights[user_id]:
             highlight = _raw_highlight_to_regex_highlight(raw_highlight)
-            if bool(re.search(highlight, content, re.IGNORECASE)):
+            if _compile_highlight(highlight).search(content):
                 return _highlight_to_display(highlight)
     return None
 
 
+@lru_cache(maxsize=1024)
+def _compile_highlight(highlight: str) -> re.Pattern:
+    return re.compile(highlight, re.IGNORECASE)
+
+
 def _raw_highlight_to_regex_highlight(raw: str):
     """Return a raw highlight as its Regex form. Fixes a weakness in Python where boundaries aren't what you expect"""
     return raw.replace("\\b", "[\\b\\s\\W]+").replace(" ", "[\\b\\s\\W]+")
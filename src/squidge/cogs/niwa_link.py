@@ -1,21 +1,35 @@
 """Nintendo Independent Wiki Alliance (NIWA) link cog."""
+import asyncio
+import copy
 import json
+import logging
+import os
 from io import BytesIO
-from typing import TypedDict, Optional
+from typing import TypedDict, Optional, TYPE_CHECKING
 
+import aiohttp
 import discord
-import requests
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from src.squidge.discordsupport.pagination_view import PaginationView
-from src.squidge.discordsupport.slash_compat import defer_if_interaction, send_or_edit
+from src.squidge.discordsupport.slash_compat import defer_if_interaction, send_or_edit, send_file_or_edit
 from src.squidge.entry.SquidgeBot import SquidgeBot
+from src.squidge.pwbsupport.federated_search import FederatedSearch
+from src.squidge.pwbsupport.wiki_health import WikiHealthChecker, SORT_KEYS, report_csv, sort_report
+from src.squidge.savedata.json_cache import CachedJsonFetcher
 from src.squidge.savedata.niwa_permissions import NIWAPermissions
+from src.squidge.savedata.niwa_wikis import NIWAWikiIndex
+from src.squidge.savedata.wiki_registry import WikiRegistry, DEFAULT_REGISTRY_FILE
+
+if TYPE_CHECKING:
+    from src.squidge.pwbsupport.wiki_pool import WikiPool
 
 WOB_JSON_LINK = "https://raw.githubusercontent.com/invalidCards/WikiOperatingBuddy/master/_wikis.json"
 WIKI_LOOKUP_JSON_LINK = "https://raw.githubusercontent.com/GameWikis/WikiLookup/master/WikiLookup.json"
+WOB_CACHE_FILE = "data/niwa/wob_wikis.json"
+WIKI_LOOKUP_CACHE_FILE = "data/niwa/wl_wikis.json"
 
 
 class WLWiki(TypedDict):
@@ -42,19 +56,64 @@ class WOBWiki(TypedDict):
 
 
 class NIWALinkCommands(commands.Cog):
-    wob_wikis: list[WOBWiki]
-    wl_wikis: list[WLWiki]
+    wob_wikis: NIWAWikiIndex
+    wl_wikis: NIWAWikiIndex
 
     def __init__(self, bot):
         self.bot = bot
-        self.wob_wikis = []
-        self.wl_wikis = []
+        # The last pulled lists are cached on disk, so they're here straight after a restart
+        self.wob_fetcher = CachedJsonFetcher(WOB_JSON_LINK, WOB_CACHE_FILE)
+        self.wl_fetcher = CachedJsonFetcher(WIKI_LOOKUP_JSON_LINK, WIKI_LOOKUP_CACHE_FILE)
+        self.wob_wikis = NIWAWikiIndex(copy.deepcopy(self.wob_fetcher.load_cached() or []))
+        self.wl_wikis = NIWAWikiIndex(copy.deepcopy(self.wl_fetcher.load_cached() or []))
+        self.registry_file = os.getenv("WIKI_REGISTRY_FILE") or DEFAULT_REGISTRY_FILE
+        self.registry = WikiRegistry.load(self.registry_file)
+        self._wiki_pool: Optional['WikiPool'] = None
+        self.federated_search = FederatedSearch()
+        self.health_checker = WikiHealthChecker()
+        self._preload_task: Optional[asyncio.Task] = None
         super().__init__()
 
+    async def cog_load(self) -> None:
+        self._preload_task = asyncio.create_task(self._preload())
+
+    async def cog_unload(self) -> None:
+        if self._preload_task is not None:
+            self._preload_task.cancel()
+            self._preload_task = None
+        if self._wiki_pool is not None:
+            self._wiki_pool.close()
+
+    async def _preload(self):
+        """Bring the cached lists up to date in the background; usually a 304 each."""
+        for name, fetcher in (('wob', self.wob_fetcher), ('wl', self.wl_fetcher)):
+            try:
+                data, changed = await fetcher.fetch()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+                logging.warning(f"Could not refresh the {name} wikis, using the cached copy: {err!r}")
+                continue
+            # Only replace lists nobody has started changing with the add/option commands since
+            if changed and name == 'wob' and not self.wob_wikis.modified:
+                self.wob_wikis = NIWAWikiIndex(copy.deepcopy(data))
+            elif changed and name == 'wl' and not self.wl_wikis.modified:
+                self.wl_wikis = NIWAWikiIndex(copy.deepcopy(data))
+
     @property
     def permissions(self) -> NIWAPermissions:
         return self.bot.save_data.niwa_permissions
 
+    @property
+    def wiki_pool(self) -> 'WikiPool':
+        """Connections to the registered wikis. pywikibot is only imported once something needs them."""
+        if self._wiki_pool is None:
+            from src.squidge.pwbsupport.wiki_pool import WikiPool
+            self._wiki_pool = WikiPool(self.registry)
+        return self._wiki_pool
+
+    def _can_maintain(self, ctx: Context) -> bool:
+        return str(ctx.author.id) in self.permissions.wob_maintainer \
+            or self.bot.save_data.wiki_permissions.is_admin(ctx.author)
+
     @app_commands.describe(name="The wiki's full display name. If it includes spaces you may use _ or quotes around it \"full name\"")
     @app_commands.describe(homepage="The wiki's homepage URL, e.g. https://examplewiki.com/wiki/Main_Page")
     @app_commands.describe(lang='The wiki code / MediaWiki language, e.g. en.')
@@ -76,10 +135,10 @@ class NIWALinkCommands(commands.Cog):
         if not self.wl_wikis:
             message += "⚠ WARNING: You are adding to a currently empty list. Use wl_pull.\n"
 
-        if any(wiki["name"] == name for wiki in self.wl_wikis):
+        if self.wl_wikis.by_name(name):
             message += f"❌ WARNING: Your new name={name} is non-unique.\n"
 
-        self.wl_wikis.append(
+        self.wl_wikis.add(
             WLWiki(name=name, homepage=homepage, lang=lang, api=api,
                    companies=[], games=[], genres=[], series=[], systems=[])
         )
@@ -103,7 +162,7 @@ class NIWALinkCommands(commands.Cog):
         if not self.wl_wikis:
             message += "❌ ERROR: Empty list. Use wl_pull.\n"
         else:
-            wiki = next((wiki for wiki in self.wl_wikis if wiki["name"].lower() == name.lower()), None)
+            wiki = self.wl_wikis.by_name(name)
             if wiki:
                 option_lower = option.lower()
                 new_values = [val.strip("\'\" ") for val in dict.fromkeys(values.split(','))]
@@ -124,6 +183,7 @@ class NIWALinkCommands(commands.Cog):
                     message += "✅ Added systems successfully. Use wl_dump when you're done."
                 else:
                     message += "❌ ERROR: The option you specified is not recognised. Use: `companies`, `games`, `genres`, `series`, `systems`\n"
+                self.wl_wikis.reindex(wiki)
             else:
                 message += "❌ ERROR: Wiki not found with that name.`\n"
         await send_or_edit(ctx, message)
@@ -145,15 +205,15 @@ class NIWALinkCommands(commands.Cog):
         if not self.wob_wikis:
             message += "⚠ WARNING: You are adding to a currently empty list. Use wob_pull.\n"
 
-        if any(wiki["key"] == key for wiki in self.wob_wikis):
+        if self.wob_wikis.by_key(key):
             message += "❌ WARNING: Your new key is non-unique.\n"
 
         new_aliases = list(dict.fromkeys(aliases.replace(',', '').split(' ')))
 
-        if any(len(set(wiki["aliases"]) & set(new_aliases)) > 0 for wiki in self.wob_wikis):
+        if self.wob_wikis.alias_conflicts(new_aliases):
             message += "❌ WARNING: Your new alias(es) are non-unique.\n"
 
-        self.wob_wikis.append(
+        self.wob_wikis.add(
             WOBWiki(key=key, name=name, url=url, articleUrl=article_url, aliases=new_aliases, setOnly=[])
         )
         message += "✅ Added successfully. Use wl_pull when you're done."
@@ -168,7 +228,7 @@ class NIWALinkCommands(commands.Cog):
         message = ""
 
         if self.wl_wikis:
-            bytes_buffer = BytesIO(json.dumps(self.wl_wikis).encode())
+            bytes_buffer = BytesIO(json.dumps(self.wl_wikis.wikis).encode())
             if ctx.interaction:
                 await ctx.interaction.edit_original_response(attachments=[discord.File(bytes_buffer, filename="WikiLookup.json", description="WikiLookup wikis")])
             else:
@@ -186,7 +246,7 @@ class NIWALinkCommands(commands.Cog):
         message = ""
 
         if self.wob_wikis:
-            bytes_buffer = BytesIO(json.dumps(self.wob_wikis).encode())
+            bytes_buffer = BytesIO(json.dumps(self.wob_wikis.wikis).encode())
             if ctx.interaction:
                 await ctx.interaction.edit_original_response(attachments=[discord.File(bytes_buffer, filename="_wikis.json", description="WikiOperatingBuddy _wikis")])
             else:
@@ -207,8 +267,9 @@ class NIWALinkCommands(commands.Cog):
             if self.wl_wikis:
                 message += "⚠ WARNING: Overwriting previously pulled wikis list. \n"
 
-            self.wl_wikis: list[WLWiki] = requests.get(WIKI_LOOKUP_JSON_LINK, timeout=(6.1, 12)).json()
-            message += f"ℹ {len(self.wl_wikis)} wikis loaded."
+            data, changed = await self.wl_fetcher.fetch()
+            self.wl_wikis = NIWAWikiIndex(copy.deepcopy(data))
+            message += f"ℹ {len(self.wl_wikis)} wikis loaded{'' if changed else ' (unchanged since the last pull)'}."
         except Exception as err:
             message += "❌ Error: " + str(err.args)
         await send_or_edit(ctx, message)
@@ -225,8 +286,9 @@ class NIWALinkCommands(commands.Cog):
             if self.wob_wikis:
                 message += "⚠ WARNING: Overwriting previously pulled wikis list. \n"
 
-            self.wob_wikis: list[WOBWiki] = requests.get(WOB_JSON_LINK, timeout=(6.1, 12)).json()
-            message += f"ℹ {len(self.wob_wikis)} wikis loaded."
+            data, changed = await self.wob_fetcher.fetch()
+            self.wob_wikis = NIWAWikiIndex(copy.deepcopy(data))
+            message += f"ℹ {len(self.wob_wikis)} wikis loaded{'' if changed else ' (unchanged since the last pull)'}."
         except Exception as err:
             message += "❌ Error: " + str(err.args)
         await send_or_edit(ctx, message)
@@ -240,9 +302,8 @@ class NIWALinkCommands(commands.Cog):
         message = ""
         if self.wl_wikis:
             try:
-                fields = []
-                for wiki in self.wl_wikis:
-                    fields_per_wiki = {
+                def fields_per_wiki(wiki: dict) -> dict[str, str]:
+                    return {
                         "name": wiki["name"],
                         "homepage": wiki["homepage"],
                         "lang": wiki["lang"],
@@ -253,10 +314,9 @@ class NIWALinkCommands(commands.Cog):
                         "series": ', '.join(wiki.get("series", [])),
                         "systems": ', '.join(wiki.get("systems", []))
                     }
-                    fields.append(fields_per_wiki)
                 context_to_use = ctx.interaction if ctx.interaction else ctx
-                view = PaginationView("Wikis supported by WikiLookup",
-                                      fields, fields_per_page=9)
+                view = PaginationView.from_items("Wikis supported by WikiLookup",
+                                                 self.wl_wikis.wikis, fields_per_wiki, fields_per_page=9)
                 await view.send(context_to_use)
 
             except Exception as err:
@@ -276,19 +336,17 @@ class NIWALinkCommands(commands.Cog):
         message = ""
         if self.wob_wikis:
             try:
-                fields = []
-                for wiki in self.wob_wikis:
-                    fields_per_wiki = {
+                def fields_per_wiki(wiki: dict) -> dict[str, str]:
+                    return {
                         "key": wiki["key"],
                         "name": wiki["name"],
                         "url": wiki["url"],
                         "articleUrl": wiki["articleUrl"],
                         "aliases": ', '.join(wiki["aliases"])
                     }
-                    fields.append(fields_per_wiki)
                 context_to_use = ctx.interaction if ctx.interaction else ctx
-                view = PaginationView("Wikis supported by Wiki Operating Bot",
-                                      fields, fields_per_page=5)
+                view = PaginationView.from_items("Wikis supported by Wiki Operating Bot",
+                                                 self.wob_wikis.wikis, fields_per_wiki, fields_per_page=5)
                 await view.send(context_to_use)
 
             except Exception as err:
@@ -298,3 +356,143 @@ class NIWALinkCommands(commands.Cog):
         else:
             message += "❌ Nothing to show. Use wob_pull.\n"
             await send_or_edit(ctx, message)
+
+    @app_commands.describe(source="Which pulled list to register: wl (WikiLookup) or wob (Wiki Operating Buddy).")
+    @app_commands.guilds(*SquidgeBot.squidge_guilds())
+    @commands.hybrid_command(
+        name='wiki_registry_import',
+        description="Registers the pulled WL or WOB wikis so wiki commands can reach them.")
+    async def wiki_registry_import(self, ctx: Context, source: str):
+        await defer_if_interaction(ctx)
+        if not self._can_maintain(ctx):
+            await send_or_edit(ctx, "❌ You must be a WOB maintainer or bot admin to do this.")
+            return
+
+        source = source.lower()
+        if source == 'wl':
+            entries = WikiRegistry.entries_from_wiki_lookup(self.wl_wikis)
+        elif source == 'wob':
+            entries = WikiRegistry.entries_from_wob(self.wob_wikis)
+        else:
+            await send_or_edit(ctx, "❌ ERROR: The source must be `wl` or `wob`.")
+            return
+        if not entries:
+            await send_or_edit(ctx, f"❌ Nothing to register. Use {source}_pull.")
+            return
+
+        added = self.registry.merge(entries)
+        self.registry.save(self.registry_file)
+        await send_or_edit(ctx, f"✅ Registered {len(entries)} wikis ({added} new); "
+                                f"{len(self.registry.wikis)} wikis are registered in total.")
+
+    @app_commands.guilds(*SquidgeBot.squidge_guilds())
+    @commands.hybrid_command(
+        name='wiki_registry_status',
+        description="Lists the registered wikis.")
+    async def wiki_registry_status(self, ctx: Context):
+        await defer_if_interaction(ctx)
+        if not self.registry.wikis:
+            await send_or_edit(ctx, "❌ No wikis are registered. Use wiki_registry_import.")
+            return
+        lines = [f"{entry.key}: {entry.name} ({entry.api}, {entry.concurrency} at once, every {entry.interval:g}s)"
+                 for entry in self.registry.wikis.values()]
+        bytes_buffer = BytesIO('\n'.join(lines).encode())
+        await send_file_or_edit(ctx, discord.File(bytes_buffer, filename="wiki_registry.txt"),
+                                f"ℹ {len(lines)} wikis registered.")
+
+    @app_commands.describe(title="The page title to look for on every registered wiki.")
+    @app_commands.guilds(*SquidgeBot.squidge_guilds())
+    @commands.hybrid_command(
+        name='wiki_find',
+        description="Finds which registered wikis have a page with the given title.")
+    async def wiki_find(self, ctx: Context, *, title: str):
+        await defer_if_interaction(ctx)
+        if not self.registry.wikis:
+            await send_or_edit(ctx, "❌ No wikis are registered. Use wiki_registry_import.")
+            return
+
+        from pywikibot import Page
+        results = await self.wiki_pool.fan_out(lambda site: Page(site, title).exists(), timeout=30)
+        found = [self.registry.wikis[key].name for key, exists in results.items() if exists is True]
+        failed = sum(1 for result in results.values() if isinstance(result, Exception))
+        message = f"ℹ `{title}` is on {len(found)} of {len(results)} wikis"
+        message += f" ({failed} couldn't be reached)" if failed else ""
+        message += ": " + ', '.join(found) if found else "."
+        await send_or_edit(ctx, message[:2000])
+
+    @app_commands.describe(query="A game, series or system, e.g. Splatoon or Game Boy. Close spellings are matched too.")
+    @app_commands.guilds(*SquidgeBot.squidge_guilds())
+    @commands.hybrid_command(
+        name='wl_lookup',
+        description="Finds the WikiLookup wikis that cover a game, series or system.")
+    async def wl_lookup(self, ctx: Context, *, query: str):
+        await defer_if_interaction(ctx)
+        if not self.wl_wikis:
+            await send_or_edit(ctx, "❌ Nothing to search. Use wl_pull.")
+            return
+
+        results = self.wl_wikis.search(query)
+        if not results:
+            await send_or_edit(ctx, f"ℹ No wikis cover `{query}`.")
+            return
+        lines = [f"**{wiki['name']}** ({wiki.get('lang', 'en')}) <{wiki['homepage']}>: {', '.join(dict.fromkeys(terms))}"
+                 for wiki, terms in results]
+        await send_or_edit(ctx, '\n'.join(lines)[:2000])
+
+    @app_commands.describe(query="What to search every registered wiki for.")
+    @app_commands.guilds(*SquidgeBot.squidge_guilds())
+    @commands.hybrid_command(
+        name='wiki_search',
+        description="Searches the registered wikis (or else the WikiLookup wikis) all at once.")
+    async def wiki_search(self, ctx: Context, *, query: str):
+        await defer_if_interaction(ctx)
+        wikis = list(self.registry.wikis.values()) or WikiRegistry.entries_from_wiki_lookup(self.wl_wikis)
+        if not wikis:
+            await send_or_edit(ctx, "❌ No wikis to search. Use wl_pull or wiki_registry_import.")
+            return
+
+        result = await self.federated_search.search(wikis, query)
+        if not result.hits:
+            await send_or_edit(ctx, f"ℹ Nothing found for `{query}`: {result.summary()}.")
+            return
+        context_to_use = ctx.interaction if ctx.interaction else ctx
+        view = PaginationView.from_items(f"{query[:50]}: {result.summary()}", result.hits,
+                                         lambda hit: {f"{hit.title} ({hit.wiki.name})"[:256]: hit.url or hit.wiki.api},
+                                         items_per_page=10, fields_per_page=10)
+        await view.send(context_to_use)
+
+    @app_commands.describe(source="Which list to check: wl (WikiLookup), wob (Wiki Operating Buddy) or registry.")
+    @app_commands.describe(sort="How to sort the report: status, latency, version or name.")
+    @app_commands.describe(refresh="Probe every wiki again, even those checked in the last 15 minutes.")
+    @app_commands.guilds(*SquidgeBot.squidge_guilds())
+    @commands.hybrid_command(
+        name='wiki_health',
+        description="Checks every wiki's API in a list at once, attaching a report of which are up, how fast, and their versions.")
+    async def wiki_health(self, ctx: Context, source: str = 'wl', sort: str = 'status', refresh: bool = False):
+        await defer_if_interaction(ctx)
+        source, sort = source.lower(), sort.lower()
+        if sort not in SORT_KEYS:
+            await send_or_edit(ctx, f"❌ ERROR: sort must be one of {', '.join(SORT_KEYS)}.")
+            return
+        if source == 'wl':
+            wikis = [(wiki["name"], wiki["api"]) for wiki in self.wl_wikis if wiki.get("api")]
+        elif source == 'wob':
+            wikis = [(wiki["name"], wiki["url"].rstrip('/') + '/api.php') for wiki in self.wob_wikis if wiki.get("url")]
+        elif source == 'registry':
+            wikis = [(entry.name, entry.api) for entry in self.registry.wikis.values()]
+        else:
+            await send_or_edit(ctx, "❌ ERROR: The source must be `wl`, `wob` or `registry`.")
+            return
+        if not wikis:
+            await send_or_edit(ctx, f"❌ Nothing to check. Use {'wiki_registry_import' if source == 'registry' else source + '_pull'}.")
+            return
+
+        results = sort_report(await self.health_checker.check(wikis, refresh=refresh), sort)
+        up = [result for result in results if result.ok]
+        message = f"ℹ {len(up)} of {len(results)} wikis are up"
+        if up:
+            mean_ms = sum(result.latency_ms for result in up) / len(up)
+            message += f", answering in {mean_ms:.0f} ms on average"
+        message += f"; {len(results) - len(up)} are down or broken." if len(up) < len(results) else "."
+        bytes_buffer = BytesIO(report_csv(results).encode())
+        await send_file_or_edit(ctx, discord.File(bytes_buffer, filename=f"{source}_health.csv"), message)
@@ -1,15 +1,20 @@
 """Wiki commands cog."""
 import asyncio
 import datetime
+import json
 import logging
 import os
 import re
+import tempfile
+from collections import Counter
+from io import BytesIO, TextIOWrapper
 from itertools import chain
-from typing import Optional, List, Generator
+from typing import Optional, List, Generator, TYPE_CHECKING
 
+import aiohttp
+import discord
 import pywikibot.config
-import requests
-from discord import TextChannel, Message, Interaction
+from discord import TextChannel, Interaction
 from discord.ext import commands
 from discord.ext.commands import Context, Bot
 # noinspection PyProtectedMember
@@ -18,14 +23,26 @@ from pywikibot.data import api
 from pywikibot.page import Revision
 from pywikibot.site._namespace import BuiltinNamespace
 
-from src.squidge.discordsupport.channel_logger import MESSAGE_TEXT_LIMIT
-from src.squidge.entry.consts import COMMAND_SYMBOL
-from src.squidge.pwbsupport.category import CategoryAddBot
-from src.squidge.pwbsupport.helpers import get_all_users_generator
-from src.squidge.pwbsupport.interwiki import InterwikiBotConfig, InterwikiBot
+from src.squidge.discordsupport.slash_compat import send_file_or_edit
+from src.squidge.entry.consts import COMMAND_SYMBOL, SQUIDGE_ALERTS_CHANNEL_ID
+from src.squidge.pwbsupport.edit_rate import EditRateDetector, replay
+from src.squidge.pwbsupport.helpers import get_all_users_generator, try_delete_page
+from src.squidge.pwbsupport.http_pool import get_http_session
+from src.squidge.pwbsupport.mass_delete import DeleteEntry, MassDeleter
+from src.squidge.pwbsupport.moderation_rules import ModerationEngine, validate_rule, validate_rules
+from src.squidge.pwbsupport.recent_changes import RecentChangeEvent, RecentChangesPipeline, EventRecorder
+from src.squidge.pwbsupport.site_sessions import SiteSessionManager
+from src.squidge.pwbsupport.sites import LazySites
+from src.squidge.pwbsupport.throttle import ThrottledEditor
 from src.squidge.savedata.bad_words import BadWords
+from src.squidge.savedata.moderation_rules import ModerationRules
 from src.squidge.savedata.wiki_permissions import WikiPermissions
 
+# The category, interwiki and file scripts are big, so they're imported by the commands that use them
+if TYPE_CHECKING:
+    from src.squidge.pwbsupport.interwiki import InterwikiBotConfig
+    from src.squidge.pwbsupport.translation_index import TranslationIndex
+
 DEFAULT_EDIT = f"[[User:{os.getenv('WIKI_USERNAME')}|Bot edit]] ([[User_talk:{os.getenv('WIKI_USERNAME')}|Something wrong?]])"
 EDIT_WITH_AUTHORIZED_BY = f"[[User:{os.getenv('WIKI_USERNAME')}|Bot edit]] authorized by "
 REDIRECT_TEXT = "#REDIRECT [["
@@ -52,37 +69,22 @@ class WikiCommands(commands.Cog):
         pywikibot.config.colorized_output = True
         pywikibot.config.interwiki_shownew = True
 
-        self.sites: dict[str, Site] = {}
-
-        # Find the password file and family file
-        file = ".pwd"
-        for i in range(0, 10):
-            if os.path.exists(file):
-                pywikibot.config.password_file = file
-                break
-            else:
-                file = "../" + file
-        else:
-            logging.warning("Wiki password file not found. Wiki commands that require login will not work.")
-
-        file = "src/squidge/pwbsupport/splatoonwiki_family.py"
-        for i in range(0, 10):
-            if os.path.exists(file):
-                pywikibot.config.family_files['splatoonwiki'] = file
-                self.sites['en'] = Site(code='en', fam='splatoonwiki')
-                # noinspection PyTypeChecker
-                self.sites['fr'] = Site(code='fr', fam='splatoonwiki')
-                # noinspection PyTypeChecker
-                self.sites['es'] = Site(code='es', fam='splatoonwiki')
-                break
-            else:
-                file = "../" + file
-        else:
-            logging.critical("***Family file not found. Interwiki commands will not work.***")
-            self.sites['en'] = Site(fam='splatoonwiki', url="https://splatoonwiki.org")
+        # Each site (and the password and family files) is only set up when first used
+        self.sites = LazySites()
+        self.sessions = SiteSessionManager(self.sites)
 
         pywikibot.config.put_throttle = 1  # i.e. 1 operation per second throttle
         self.recent_vandals = set()
+        # What the recent changes stages found on the event going through them, as (emoji, detail)
+        self._event_findings: list[tuple[str, str]] = []
+        self.recent_changes: Optional[RecentChangesPipeline] = None
+        self.moderation: Optional[ModerationEngine] = None
+        self.rate_detector = EditRateDetector()
+        # Appends every recent change as JSONL, a file per wiki per day, if a directory is set
+        record_dir = os.getenv("RECENT_CHANGES_RECORD_DIR")
+        self.event_recorder: Optional[EventRecorder] = EventRecorder(record_dir) if record_dir else None
+        self.recent_change_counts: Counter[tuple[str, str]] = Counter()
+        self.translations: Optional['TranslationIndex'] = None
         super().__init__()
 
     @property
@@ -98,9 +100,13 @@ class WikiCommands(commands.Cog):
     def bad_words(self) -> BadWords:
         return self.bot.save_data.bad_words
 
-    def login_to_sites(self):
-        for site in self.sites.values():
-            site.login()
+    @property
+    def moderation_rules(self) -> ModerationRules:
+        return self.bot.save_data.moderation_rules
+
+    async def login_to_sites(self, *codes: str):
+        """Make sure we're logged into the given sites (default all), only logging in where needed."""
+        await self.sessions.ensure(*codes)
 
     async def _get_patrol_pings(self):
         return "".join([f"<@!{i}> " for i in self.permissions.patrol])
@@ -120,7 +126,7 @@ class WikiCommands(commands.Cog):
         old_category = args[0]
         new_category = args[1]
         if self.permissions.is_editor(ctx.author):
-            self.login_to_sites()
+            await self.login_to_sites('en')
             if not old_category.lower().startswith("category"):
                 old_category = "Category:" + old_category
             if not new_category.lower().startswith("category"):
@@ -163,7 +169,7 @@ class WikiCommands(commands.Cog):
         pass_ctx=True)
     async def delete_category(self, ctx: Context, *, category_title: str):
         if self.permissions.is_admin(ctx.author):
-            self.login_to_sites()
+            await self.login_to_sites('en')
             if not category_title.lower().startswith("category"):
                 category_title = "Category:" + category_title
 
@@ -192,6 +198,205 @@ class WikiCommands(commands.Cog):
         else:
             await ctx.send("You don't have admin permission.")
 
+    @commands.command(
+        name='clean_category',
+        description="Reports pages that are in a category and also in one of its subcategories. "
+                    "Add `recurse` to look through the whole subtree, `apply` to remove the redundant category, "
+                    "and `rebuild` to refresh the cached category tree.",
+        brief="Reports (and optionally fixes) over-categorised pages.",
+        aliases=['cleancat'],
+        help=f'{COMMAND_SYMBOL}clean_category <cat> [recurse] [apply] [rebuild]',
+        pass_ctx=True)
+    async def clean_category(self, ctx: Context, *, message: str):
+        args = message.split(' ')
+        flags = {arg.lower() for arg in args[1:]}
+        if not args[0] or not flags <= {'recurse', 'apply', 'rebuild'}:
+            await ctx.send(f'`{COMMAND_SYMBOL}clean_category <cat> [recurse] [apply] [rebuild]`. '
+                           f'Category names must have underscores.')
+            return
+
+        if not self.permissions.is_editor(ctx.author):
+            await ctx.send("You don't have editor permission.")
+            return
+
+        category_title = args[0]
+        if not category_title.lower().startswith("category"):
+            category_title = "Category:" + category_title
+        category_title = category_title.replace('_', ' ')
+        cat_page = pywikibot.Category(self.inkipedia, category_title)
+        await ctx.send(f"Loading the category tree under `{category_title}`...")
+
+        from src.squidge.pwbsupport.category import CategoryDatabase, CategoryGraph
+
+        def analyse():
+            cat_db = CategoryDatabase(rebuild='rebuild' in flags)
+            try:
+                graph = CategoryGraph.from_database(cat_db, cat_page)
+            finally:
+                cat_db.dump()
+            return graph, graph.overcategorized(graph.ids[cat_page], recurse='recurse' in flags)
+
+        loop = asyncio.get_running_loop()
+        graph, overcategorized = await loop.run_in_executor(None, analyse)
+
+        total = sum(len(members) for _, members in overcategorized)
+        lines = [f"{len(graph.subcats)} categories and {len(graph.pages)} pages in the tree. "
+                 f"{total} over-categorised page(s) in {category_title}."]
+        for child_id, members in overcategorized:
+            lines.append(f"\n{graph.page(child_id).title()} ({len(members)}):")
+            lines.extend(graph.page(member_id).title() for member_id in members)
+        report = BytesIO('\n'.join(lines).encode())
+        await send_file_or_edit(ctx, discord.File(report, filename="overcategorised.txt"), lines[0])
+
+        if 'apply' not in flags or not total:
+            return
+
+        await self.login_to_sites('en')
+        editor = ThrottledEditor()
+        auth_by = EDIT_WITH_AUTHORIZED_BY + ctx.author.__str__() + " "
+        count = 0
+        for child_id, members in overcategorized:
+            child = graph.page(child_id)
+            summary = (auth_by + "Removing " + cat_page.title(as_link=True, textlink=True)
+                       + " as the page is already in " + child.title(as_link=True, textlink=True))
+            for member_id in members:
+                try:
+                    if await editor.run(graph.page(member_id).change_category, cat_page, None, summary=summary):
+                        count += 1
+                except pywikibot.exceptions.Error as err:
+                    logging.error(f"Failed to clean {graph.page(member_id)}: {err}")
+        await ctx.send(f"Done, {count} page(s) changed.")
+
+    @commands.command(
+        name='listify',
+        description="Makes a sorted list of all members of a category, either saved to a wiki page "
+                    "(split into numbered subpages if it gets too big) or sent here as a file. "
+                    "Add `recurse` (or `recurse:<depth>`) to include subcategories' members.",
+        brief="Lists the members of a category.",
+        aliases=['catlist'],
+        help=f'{COMMAND_SYMBOL}listify <cat> <list_page|file> [recurse[:depth]] [append|overwrite]',
+        pass_ctx=True)
+    async def listify(self, ctx: Context, *, message: str):
+        args = message.split(' ')
+        if len(args) < 2:
+            await ctx.send(f'`{COMMAND_SYMBOL}listify <cat> <list_page|file> [recurse[:depth]] [append|overwrite]`. '
+                           f'Page names must have underscores.')
+            return
+
+        if not self.permissions.is_editor(ctx.author):
+            await ctx.send("You don't have editor permission.")
+            return
+
+        category_title = args[0]
+        if not category_title.lower().startswith("category"):
+            category_title = "Category:" + category_title
+        category_title = category_title.replace('_', ' ')
+        list_title = args[1].replace('_', ' ')
+        to_file = list_title.lower() == 'file'
+
+        recurse = False
+        flags = set()
+        for arg in args[2:]:
+            (option, _, value) = arg.lower().partition(':')
+            if option == 'recurse':
+                recurse = int(value) if value.isdigit() else True
+            else:
+                flags.add(option)
+
+        from src.squidge.pwbsupport.category import CategoryListifyRobot
+        bot = CategoryListifyRobot(category_title, 'file' if to_file else list_title,
+                                   EDIT_WITH_AUTHORIZED_BY + ctx.author.__str__() + " listing [[:" + category_title + "]]",
+                                   append='append' in flags,
+                                   overwrite='overwrite' in flags,
+                                   recurse=recurse,
+                                   stream=True,
+                                   site=self.inkipedia)
+        loop = asyncio.get_running_loop()
+        if to_file:
+            await ctx.send(f"Listing `{category_title}`...")
+            raw = tempfile.TemporaryFile()
+            text = TextIOWrapper(raw, encoding='utf-8', write_through=True)
+            count = await loop.run_in_executor(None, bot.run_streaming, text)
+            text.detach()
+            raw.seek(0)
+            with raw:
+                await send_file_or_edit(ctx, discord.File(raw, filename="category_list.txt"),
+                                        f"{count} page(s) in `{category_title}`.")
+            return
+
+        if not (bot.append or bot.overwrite) and await loop.run_in_executor(None, bot.list.exists):
+            await ctx.send(f"`{list_title}` already exists. Add `append` or `overwrite`.")
+            return
+        await self.login_to_sites('en')
+        await ctx.send(f"Listing `{category_title}` to `{list_title}`...")
+        count = await loop.run_in_executor(None, bot.run_streaming)
+        await ctx.send(f"Done, {count} page(s) listed.")
+
+    @commands.command(
+        name='export_category',
+        description="Downloads the original files in a category into a zip (or tar) archive. "
+                    "Add `recurse` (or `recurse:<depth>`) to include subcategories, and `site:<code>` for another wiki. "
+                    "Running it again after an interruption resumes the export.",
+        brief="Archives the files in a category.",
+        aliases=['exportcat', 'archive_category'],
+        help=f'{COMMAND_SYMBOL}export_category <cat> [recurse[:depth]] [tar] [site:<code>]',
+        pass_ctx=True)
+    async def export_category(self, ctx: Context, *, message: str):
+        args = message.split(' ')
+        if not args[0]:
+            await ctx.send(f'`{COMMAND_SYMBOL}export_category <cat> [recurse[:depth]] [tar] [site:<code>]`. '
+                           f'Category names must have underscores.')
+            return
+
+        if not self.permissions.is_editor(ctx.author):
+            await ctx.send("You don't have editor permission.")
+            return
+
+        category_title = args[0]
+        if not category_title.lower().startswith("category"):
+            category_title = "Category:" + category_title
+        category_title = category_title.replace('_', ' ')
+
+        recurse = False
+        archive_format = 'zip'
+        site = self.inkipedia
+        for arg in args[1:]:
+            (option, _, value) = arg.lower().partition(':')
+            if option == 'recurse':
+                recurse = int(value) if value.isdigit() else True
+            elif option == 'tar':
+                archive_format = 'tar'
+            elif option == 'site' and value in self.sites:
+                site = self.sites[value]
+            else:
+                await ctx.send(f"I don't understand the option `{arg}`.")
+                return
+
+        from src.squidge.pwbsupport.category_export import CategoryArchiveExporter
+        exporter = CategoryArchiveExporter(site, category_title, recurse=recurse, archive_format=archive_format)
+        await ctx.send(f"Exporting the files in `{category_title}`...")
+        result = await exporter.run()
+
+        summary = f"Done, {result.added} file(s) added to `{os.path.basename(result.archive_path)}`"
+        if result.resumed_from:
+            summary += f" (resumed after {result.resumed_from})"
+        summary += f". {len(result.skipped_duplicates)} duplicate(s) skipped, {len(result.failed)} failed."
+        if result.failed:
+            summary += " Run the command again to retry the failures."
+        await ctx.send(summary)
+
+        report_lines = ([f"Duplicate: {line}" for line in result.skipped_duplicates]
+                        + [f"Failed: {title}" for title in result.failed])
+        if report_lines:
+            report = BytesIO('\n'.join(report_lines).encode())
+            await ctx.send(file=discord.File(report, filename="export_report.txt"))
+
+        size_limit = ctx.guild.filesize_limit if ctx.guild else 8 * 1024 * 1024
+        if os.path.getsize(result.archive_path) <= size_limit:
+            await ctx.send(file=discord.File(result.archive_path))
+        else:
+            await ctx.send(f"The archive is too big to upload here; it is saved on the bot host at `{result.archive_path}`.")
+
     @commands.command(
         name='nuke',
         description="Deletes all images uploaded by a user. Reverts all edits made. Blocks.",
@@ -201,7 +406,7 @@ class WikiCommands(commands.Cog):
         pass_ctx=True)
     async def nuke(self, ctx: Context, *, user: str):
         # Get the user to nuke
-        self.login_to_sites()
+        await self.login_to_sites('en')
         user_to_nuke = pywikibot.User(self.inkipedia, user)
 
         if not user_to_nuke or not user_to_nuke.isRegistered(force=True):
@@ -236,83 +441,240 @@ class WikiCommands(commands.Cog):
         else:
             await ctx.send("You don't have admin permission.")
 
-    async def handle_inkipedia_event(self, message: Message) -> Optional[str]:
-        if message.embeds:
-            embed = message.embeds[0]
-            content = embed.title or embed.description
-            if content:
-                # Scan new pages and new accounts
-                emotes_to_check = [":new:", "🆕", ":wave:", "👋", ":outbox_tray:", "📤"]
-                if any(emote in content for emote in emotes_to_check):
-                    source_user = re.search(r"\[([^\]]+)]", content)
-                    if source_user:
-                        source_user = source_user.group(1)
-                    else:
-                        logging.warning(
-                            f"handle_inkipedia_event: There were no [] in the message and so a source user was not found.")
-                        return
+    def start_recent_changes(self):
+        """Start following the wikis' recent changes, if not already."""
+        # Rules come from the save data, so (re)build them now that it's loaded
+        self.moderation = ModerationEngine(self.moderation_rules.rules, {'sightengine': self._check_profanity})
+        if self.recent_changes is None:
+            self.recent_changes = RecentChangesPipeline(
+                list(self.sites.values()),
+                # Vandals are tracked before the event can flag its own user, and the other stages' findings
+                # are sent together, so one event makes at most one alert
+                [self._record_event, self._track_vandals, self._moderate_event, self._detect_rates,
+                 self._send_event_alert, self._count_event])
+        self.recent_changes.start()
+
+    async def cog_unload(self) -> None:
+        self.sessions.stop()
+        if self.recent_changes is not None:
+            await self.recent_changes.stop()
+        if self.event_recorder is not None:
+            await self.event_recorder.close()
+
+    def _event_url(self, event: RecentChangeEvent) -> str:
+        site = self.sites[event.site_code]
+        if event.revid:
+            return f"<{site.base_url(site.path())}?diff={event.revid}>"
+        return f"<{Page(site, event.title).full_url()}>"
+
+    async def _send_alert(self, text: str):
+        alerts_channel = self.bot.get_channel(SQUIDGE_ALERTS_CHANNEL_ID)
+        if alerts_channel:
+            await alerts_channel.send(text)
+        else:
+            logging.error(f"Could not find the alerts channel to send: {text}")
 
-                    # As insurance, also check that the source user indeed appears as a link, to make sure
-                    # we haven't tripped over any funny symbols in the user's name
-                    source_user_as_page = Page(self.inkipedia, source_user, BuiltinNamespace.USER)
-                    if source_user_as_page.title(underscore=True) not in content:
-                        logging.error(
-                            f"handle_inkipedia_event: Determined the source user to be {source_user} but {source_user_as_page} is not in the content.")
-                        return
+    async def _moderate_event(self, event: RecentChangeEvent):
+        """Run the moderation rules over the event, alerting on any hits."""
+        if self.moderation is None:
+            return
 
-                    logging.debug(f"handle_inkipedia_event: Checking {content}")
+        hits = await self.moderation.evaluate(event, f"{event.user} {event.title} {event.comment}")
+        if hits:
+            self.recent_vandals.add(event.user)
+            self._event_findings += [("🚨", f"{hit.rule}: {hit.detail}") for hit in hits]
+
+    async def _check_profanity(self, content: str) -> Optional[str]:
+        """Return what Sight Engine found in the content if it has phrases that aren't whitelisted."""
+        # In each false trigger, if it's a whole word, remove it
+        # [\s\W\b] is there to match space/punctuation/end of the string
+        for word in self.bad_words.false_triggers or []:
+            content = re.sub(r"[\s\W\b](" + word + r")[\s\W\b]", "", content, flags=re.I)
+        if not content.strip():
+            return None
+
+        logging.info(f"_check_profanity: Querying {content}")
+        form = aiohttp.FormData()
+        form.add_field('text', content)
+        form.add_field('lang', 'en')
+        form.add_field('mode', 'standard')
+        async with get_http_session().post('https://api.sightengine.com/1.0/text/check.json', data=form) as response:
+            as_json = await response.json(content_type=None)
+        logging.info(as_json)
+        # Check for success
+        status = as_json.get("status")
+        if status == "success":
+            profanity_matches = as_json.get("profanity", {}).get("matches")
+            if profanity_matches:
+                matched_phrases = set()
+                current_level = "low"
+                for match in profanity_matches:
+                    phrase = match["match"]
+                    if phrase not in self.bad_words.whitelist:
+                        matched_phrases.add(phrase)
+                        if match["intensity"] == "high":
+                            current_level = "high"
+                        elif match["intensity"] == "medium" and current_level != "high":
+                            current_level = "medium"
+
+                if matched_phrases:
+                    return f"{current_level} intensity match: ||[{', '.join(matched_phrases)}]||"
+                else:
+                    logging.info(f"_check_profanity: ✔ Checked but had only whitelisted phrases")
+            else:
+                logging.info(f"_check_profanity: ✔ Checked and determined clean")
+        elif status == "failure":
+            logging.error("Sight engine failure: " + as_json.get("error").get("message"))
+        else:
+            logging.error(f"Sight engine unknown response: {as_json}")
+        return None
 
-                    # Remove square brackets as they are primarily links, and also fool some detection (e.g. [ is a c)
-                    content = content.replace("[", "").replace("]", "")
-                    if not content:
-                        return
+    @commands.command(
+        name='mod_rules',
+        description="Lists the moderation rules run over recent changes, with their hit counts and timings.",
+        brief="List the moderation rules.",
+        aliases=['modrules'],
+        help=f'{COMMAND_SYMBOL}mod_rules',
+        pass_ctx=True)
+    async def mod_rules(self, ctx: Context):
+        rules = '\n'.join(json.dumps(rule) for rule in self.moderation_rules.rules) or "No rules."
+        timings = self.moderation.timings.report() if self.moderation else "Not running."
+        report = BytesIO(f"Rules:\n{rules}\n\nSince the bot started:\n{timings}".encode())
+        await ctx.send(f"{len(self.moderation_rules.rules)} moderation rule(s).",
+                       file=discord.File(report, filename="moderation_rules.txt"))
 
-                    # In each false trigger, if it's a whole word, remove it
-                    # [\s\W\b] is there to match space/punctuation/end of the string
-                    for word in self.bad_words.false_triggers or []:
-                        content = re.sub(r"[\s\W\b](" + word + r")[\s\W\b]", "", content, flags=re.I)
-
-                    logging.info(f"handle_inkipedia_event: Querying {content}")
-                    files = {
-                        'text': (None, content),
-                        'lang': (None, 'en'),
-                        'mode': (None, 'standard'),
-                    }
-                    response = requests.post('https://api.sightengine.com/1.0/text/check.json', files=files)
-                    as_json = response.json()
-                    logging.info(as_json)
-                    # Check for success
-                    status = as_json.get("status")
-                    if status == "success":
-                        profanity_matches = as_json.get("profanity", {}).get("matches")
-                        if profanity_matches:
-                            matched_phrases = set()
-                            current_level = "low"
-                            for match in profanity_matches:
-                                phrase = match["match"]
-                                if phrase not in self.bad_words.whitelist:
-                                    matched_phrases.add(phrase)
-                                    if match["intensity"] == "high":
-                                        current_level = "high"
-                                    elif match["intensity"] == "medium" and current_level != "high":
-                                        current_level = "medium"
-
-                            if matched_phrases:
-                                self.recent_vandals.add(source_user)
-                                return f"🚨 {current_level} intensity match: ||[{', '.join(matched_phrases)}]|| {message.jump_url} " + await self._get_patrol_pings()
-                            else:
-                                logging.info(f"handle_inkipedia_event: ✔ Checked but had only whitelisted phrases")
-                        else:
-                            logging.info(f"handle_inkipedia_event: ✔ Checked and determined clean")
-
-                    elif status == "failure":
-                        logging.error("Sight engine failure: " + as_json.get("error").get("message"))
-                        return None
-                    else:
-                        logging.error("Sight engine unknown response: " + response.text)
-                        return None
-        else:
-            logging.warning("No embeds found in Wiki Notifier message!")
+    @commands.command(
+        name='mod_rule',
+        description="Adds a moderation rule, or replaces the rule with the same name. The rule is a JSON object with "
+                    "a name and kind (username, title, comment, size, edit_rate or external), and the kind's settings. "
+                    "See ModerationEngine for the details.",
+        brief="Add or replace a moderation rule.",
+        aliases=['modrule'],
+        help=f'{COMMAND_SYMBOL}mod_rule {{"name": "spam titles", "kind": "title", "pattern": "buy\\s+cheap"}}',
+        pass_ctx=True)
+    async def mod_rule(self, ctx: Context, *, message: str):
+        if not self.permissions.is_patrol(ctx.author) and not self.permissions.is_admin(ctx.author):
+            await ctx.send(f'You do not have permission to do this (you must be a bot patrol or bot admin).')
+            return
+
+        try:
+            rule = json.loads(message.strip().strip('`'))
+        except ValueError as err:
+            await ctx.send(f"That isn't valid JSON: {err}")
+            return
+        problem = validate_rule(rule)
+        if problem:
+            await ctx.send(problem)
+            return
+
+        rules = [r for r in self.moderation_rules.rules if r.get('name') != rule['name']]
+        replaced = len(rules) != len(self.moderation_rules.rules)
+        rules.append(rule)
+        problem = validate_rules(rules)
+        if problem:
+            await ctx.send(problem)
+            return
+        self.moderation_rules.rules = rules
+        if self.moderation:
+            self.moderation.compile(rules)
+        await ctx.send(f"{'Replaced' if replaced else 'Added'} moderation rule {rule['name']}.")
+        await self.bot.save_data.save(ctx)
+
+    @commands.command(
+        name='mod_rule_remove',
+        description="Removes the moderation rule with the given name.",
+        brief="Remove a moderation rule.",
+        aliases=['modrule_remove', 'remove_mod_rule'],
+        help=f'{COMMAND_SYMBOL}mod_rule_remove <name>',
+        pass_ctx=True)
+    async def mod_rule_remove(self, ctx: Context, *, name: str):
+        if not self.permissions.is_patrol(ctx.author) and not self.permissions.is_admin(ctx.author):
+            await ctx.send(f'You do not have permission to do this (you must be a bot patrol or bot admin).')
+            return
+
+        rules = [r for r in self.moderation_rules.rules if r.get('name') != name]
+        if len(rules) == len(self.moderation_rules.rules):
+            await ctx.send(f"There's no moderation rule called {name}.")
+            return
+        self.moderation_rules.rules = rules
+        if self.moderation:
+            self.moderation.compile(rules)
+        await ctx.send(f"Removed moderation rule {name}.")
+        await self.bot.save_data.save(ctx)
+
+    async def _record_event(self, event: RecentChangeEvent):
+        if self.event_recorder is not None:
+            await self.event_recorder.record(event)
+
+    async def _detect_rates(self, event: RecentChangeEvent):
+        """Flag users and IP ranges going over a rate limit, and let editors nuke the user that did."""
+        for anomaly in self.rate_detector.observe(event):
+            self.recent_vandals.add(event.user)
+            self._event_findings.append(("📈", str(anomaly)))
+
+    @commands.command(
+        name='rc_replay',
+        description="Replays a recorded day of recent changes (a .jsonl file of events) through the edit-rate detector, "
+                    "reporting how fast it ran and what it would have flagged. Nothing is alerted.",
+        brief="Benchmark the edit-rate detector on recorded events.",
+        aliases=['rcreplay'],
+        help=f'{COMMAND_SYMBOL}rc_replay (with an attached .jsonl file)',
+        pass_ctx=True)
+    async def rc_replay(self, ctx: Context):
+        if not self.permissions.is_admin(ctx.author):
+            await ctx.send("You don't have admin permission.")
+            return
+
+        lines = await self._read_attachment_lines(ctx, extensions=(".jsonl",))
+        if lines is None:
+            return
+        try:
+            events = [RecentChangeEvent.from_dict(json.loads(line)) for line in lines]
+        except (ValueError, TypeError) as err:
+            await ctx.send(f"That isn't a file of recorded events: {err}")
+            return
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, replay, events)
+        report = BytesIO('\n'.join(f"{anomaly.event.timestamp} {anomaly.event.site_code} {anomaly}"
+                                   for anomaly in result.anomalies).encode())
+        await ctx.send(result.summary(), file=discord.File(report, filename="rc_replay.txt"))
+
+    async def _track_vandals(self, event: RecentChangeEvent):
+        """Alert on everything a user flagged by an earlier event goes on to do."""
+        self._event_findings = []
+        if event.user in self.recent_vandals:
+            self._event_findings.append(("👀", f"flagged user ({event.log_action or event.kind})"))
+
+    async def _send_event_alert(self, event: RecentChangeEvent):
+        """Send everything the stages found on the event as one alert, pinging patrollers for new findings."""
+        findings, self._event_findings = self._event_findings, []
+        if not findings:
+            return
+        emojis = ''.join(dict.fromkeys(emoji for emoji, _ in findings))
+        text = f"{emojis} {event.user} on {event.title}: {'; '.join(detail for _, detail in findings)} " \
+               f"{self._event_url(event)}"
+        if any(emoji != "👀" for emoji, _ in findings):
+            text += " " + await self._get_patrol_pings()
+        await self._send_alert(text)
+
+    async def _count_event(self, event: RecentChangeEvent):
+        self.recent_change_counts[(event.site_code, event.log_type or event.kind)] += 1
+
+    @commands.command(
+        name='rc_stats',
+        description="Shows how many recent changes of each kind have been seen on each wiki since the bot started.",
+        brief="Recent changes statistics.",
+        aliases=['rcstats'],
+        help=f'{COMMAND_SYMBOL}rc_stats',
+        pass_ctx=True)
+    async def rc_stats(self, ctx: Context):
+        if not self.recent_change_counts:
+            await ctx.send("No recent changes seen yet.")
+            return
+        lines = [f"{code} {kind}: {count}" for (code, kind), count in sorted(self.recent_change_counts.items())]
+        queued = self.recent_changes.queue.qsize() if self.recent_changes else 0
+        await ctx.send('\n'.join(lines) + f"\n({queued} waiting to be processed)")
 
     @commands.command(
         name='false',
@@ -571,7 +933,7 @@ class WikiCommands(commands.Cog):
             await ctx.send("You don't have admin permission.")
 
     async def run_auto_delete(self, cat_page, category_title, author):
-        self.login_to_sites()
+        await self.login_to_sites('en')
         auth_by = EDIT_WITH_AUTHORIZED_BY + author + " "
         orphaned_summary = auth_by + "Deleting orphaned talk page in [[:" + category_title + "]]"
         broken_redirect_summary = auth_by + "Deleting broken redirect page in [[:" + category_title + "]]"
@@ -621,14 +983,14 @@ class WikiCommands(commands.Cog):
                                            unused_redirect_summary):
         if not target_page.exists():
             # Delete the broken redirect
-            return self._try_delete_page(page, broken_redirect_summary + " targeting " + (target_page.title()))
+            return try_delete_page(page, broken_redirect_summary + " targeting " + (target_page.title()))
 
         if target_page.isRedirectPage():
             # Double redirect
             target_target_page = target_page.getRedirectTarget()
             if target_target_page == page:
                 # Circular reference
-                return self._try_delete_page(page, broken_redirect_summary + " targeting " + (target_page.title()))
+                return try_delete_page(page, broken_redirect_summary + " targeting " + (target_page.title()))
             # else fix the redirect instead
             page.set_redirect_target(
                 target_target_page,
@@ -640,7 +1002,7 @@ class WikiCommands(commands.Cog):
             if self._is_in_use(page):
                 self._handle_not_deleting(page, "redirect is in use. Please verify.")
             else:
-                return self._try_delete_page(page, unused_redirect_summary + " targeting " + (
+                return try_delete_page(page, unused_redirect_summary + " targeting " + (
                     target_page.title(as_link=True)))
         return False
 
@@ -657,7 +1019,7 @@ class WikiCommands(commands.Cog):
             given_reason = self._get_given_delete_reason(page)
 
             if not given_reason and is_uploader:
-                return self._try_delete_page(page, author_request_summary)
+                return try_delete_page(page, author_request_summary)
 
             # If it's a duplicate
             given_reason_cf = given_reason.casefold()
@@ -665,7 +1027,7 @@ class WikiCommands(commands.Cog):
                 dupe_target = self._get_dupe_file_target(page, given_reason)
                 if dupe_target:
                     if dupe_target.exists():
-                        return self._try_delete_page(
+                        return try_delete_page(
                             page, f"{duplicate_request_summary} targeting {dupe_target.title(as_link=True)}")
                     else:
                         self._handle_not_deleting(
@@ -675,7 +1037,7 @@ class WikiCommands(commands.Cog):
                         page, "the dupe reason does not contain a file target.")
             elif is_uploader:
                 if AUTHOR_REQ_REGEX.search(given_reason_cf):
-                    return self._try_delete_page(page, author_request_summary)
+                    return try_delete_page(page, author_request_summary)
                 else:
                     self._handle_not_deleting(
                         page, "author requested deletion but I didn't understand the reason.", False, True)
@@ -693,7 +1055,7 @@ class WikiCommands(commands.Cog):
 
         try:
             if page.latest_revision.user == page.oldest_revision.user:
-                return self._try_delete_page(page, author_request_summary)
+                return try_delete_page(page, author_request_summary)
             # else
             self._handle_not_deleting(page, "someone other than the author requested deletion of a userpage.")
         except Exception as error:
@@ -707,13 +1069,13 @@ class WikiCommands(commands.Cog):
             return False
 
         # Delete the empty category
-        return self._try_delete_page(page, unused_category_summary)
+        return try_delete_page(page, unused_category_summary)
 
     async def _handle_talkpage_auto_delete(self, page: Page, summary):
         content_page = page.toggleTalkPage()
         if content_page is None or not content_page.exists() or content_page.isRedirectPage():
             # Delete the orphan
-            return self._try_delete_page(page, summary)
+            return try_delete_page(page, summary)
         # else
         self._handle_not_deleting(page, "its contents page is in use.")
         return False
@@ -775,7 +1137,7 @@ class WikiCommands(commands.Cog):
         size_threshold = 4000
 
         if self.permissions.is_editor(ctx.author):
-            self.login_to_sites()
+            await self.login_to_sites('en')
             if not category_title.lower().startswith("category"):
                 category_title = "Category:" + category_title
 
@@ -803,52 +1165,185 @@ class WikiCommands(commands.Cog):
         else:
             await ctx.send("You don't have admin permission.")
 
+    def _interwiki_config(self, ctx: Context, site: Site) -> 'InterwikiBotConfig':
+        """Return the interwiki configuration for running on the given site."""
+        from src.squidge.pwbsupport.interwiki import InterwikiBotConfig
+        interwiki_conf = InterwikiBotConfig()
+        # tempting to run in async mode, but we control the event loop, so don't do that
+        # Restoring is handled per site with InterwikiDumps rather than with "-restore all"
+
+        # Do not use additional summary with autonomous mode
+        # (we don't care for the i18n submodule)
+        interwiki_conf.summary = EDIT_WITH_AUTHORIZED_BY + ctx.author.__str__() + " interwiki update"
+        interwiki_conf.auto = True
+        interwiki_conf.autonomous = True
+        interwiki_conf.always = True
+        # The query size adapts to the server from here, up to maxquerysizelimit,
+        # and no more than maxopensubjects are held at once so we don't consume the whole wiki in one go!!
+        interwiki_conf.minsubjects = 10  # 100 by default.
+        interwiki_conf.maxquerysize = 25  # starting size, was 50
+        interwiki_conf.maxquerysizelimit = 200
+        interwiki_conf.maxopensubjects = 200
+        interwiki_conf.nobackonly = False
+        # ensure that we don't try to change main page
+        # (skip is a class attribute, so give each config its own)
+        interwiki_conf.skip = {pywikibot.Page(site, site.siteinfo['mainpage'])}
+        if self.translations is not None:
+            interwiki_conf.hintsource = self.translations.hints_for
+        return interwiki_conf
+
+    async def _load_translations(self, ctx: Context):
+        """(Re)build the official names index, if one is configured, to give interwiki its hints."""
+        from src.squidge.pwbsupport.translation_index import load_translation_index
+        self.translations = load_translation_index(os.getenv("WIKI_TRANSLATIONS_FILE"))
+        if self.translations is not None:
+            loop = asyncio.get_running_loop()
+            matched = await loop.run_in_executor(None, self.translations.match_sites, list(self.sites.values()))
+            await ctx.send(f"Matched {matched} page(s) by their official names.")
+
     @commands.command(
         name='interwiki',
-        description="Run interwiki sync command",
+        description="Run interwiki sync command. Continues from the last checkpoint if a previous run was interrupted, "
+                    "unless `restart` is given. With `dryrun`, nothing is edited; instead the changes it would make "
+                    f"are attached as a diff that `{COMMAND_SYMBOL}interwiki_apply` can make later.",
         brief="Run interwiki sync command",
-        help=f'{COMMAND_SYMBOL}interwiki',
+        help=f'{COMMAND_SYMBOL}interwiki [restart|dryrun]',
         pass_ctx=True)
-    async def perform_interwiki(self, ctx: Context):
+    async def perform_interwiki(self, ctx: Context, *, message: str = ""):
         if self.permissions.is_editor(ctx.author):
             await ctx.send("Configuring interwiki...")
-            interwiki_conf = InterwikiBotConfig()
-            # tempting to run in async mode, but we control the event loop, so don't do that
-            # interwiki_conf.readOptions("-restore all")
-
-            # Do not use additional summary with autonomous mode
-            # (we don't care for the i18n submodule)
-            interwiki_conf.summary = EDIT_WITH_AUTHORIZED_BY + ctx.author.__str__() + " interwiki update"
-            interwiki_conf.auto = True
-            interwiki_conf.autonomous = True
-            interwiki_conf.always = True
-            interwiki_conf.minsubjects = 10  # 100 by default. Don't consume the whole wiki in one go!!
-            interwiki_conf.maxquerysize = 25  # was 50
-            interwiki_conf.nobackonly = False
+            options = message.lower().split()
+            restart = 'restart' in options
 
             # Refresh our logins now
-            self.login_to_sites()
+            await self.login_to_sites()
+            await self._load_translations(ctx)
+
+            if 'dryrun' in options:
+                await self._interwiki_dry_run(ctx)
+                return
+
+            from src.squidge.pwbsupport.interwiki import InterwikiBot, InterwikiDumps
 
-            # ensure that we don't try to change main page
             for (code, site) in self.sites.items():
-                interwiki_conf.skip.clear()
-                main_page_name = site.siteinfo['mainpage']
-                interwiki_conf.skip.add(pywikibot.Page(site, main_page_name))
-                bot = InterwikiBot(interwiki_conf)
+                bot = InterwikiBot(self._interwiki_config(ctx, site))
                 bot.site = site
-                bot.setPageGenerator(iter(pagegenerators.AllpagesPageGenerator(includeredirects=False)))
+
+                # The dump holds the unfinished pages of an interrupted run, and continues alphabetically after them
+                dump = InterwikiDumps(site=site, do_continue=True)
+                if restart:
+                    dump.discard()
+                if dump.has_dump():
+                    await ctx.send(f"Continuing interwiki for {code} from its last checkpoint.")
+                    bot.setPageGenerator(iter(dump.read_dump()))
+                else:
+                    bot.setPageGenerator(iter(pagegenerators.AllpagesPageGenerator(includeredirects=False, site=site)))
 
                 try:
                     await ctx.send(f"Running interwiki for {code}...")
-                    await bot.run()
+                    await bot.run(dump=dump)
                 except Exception as err:
                     pywikibot.exception()
-                    await ctx.send(f"Interwiki terminated early: {err[:2000]}")
+                    dump.write_dump(bot.dump_titles, append=False)
+                    await ctx.send(f"Interwiki terminated early: {str(err)[:2000]}")
+                else:
+                    dump.discard()
                 finally:
                     await ctx.send(f"...Interwiki finished for {code}.")
         else:
             await ctx.send("You don't have editor permission.")
 
+    async def _interwiki_dry_run(self, ctx: Context):
+        """Run interwiki on each site in turn without editing, and attach the diff of what it would change."""
+        from src.squidge.pwbsupport.interwiki import InterwikiBot
+        from src.squidge.pwbsupport.interwiki_diff import InterwikiDiffWriter
+        diff_dir = pywikibot.config.datafilepath('data', 'interwiki-diffs')
+        os.makedirs(diff_dir, exist_ok=True)
+        diff_path = os.path.join(diff_dir, f"interwiki-{datetime.datetime.now():%Y%m%d-%H%M%S}.jsonl")
+
+        async def run_site(code: str, site: Site):
+            conf = self._interwiki_config(ctx, site)
+            conf.dryrun = writer
+            # Nothing is saved, so each commit is just a preload and a diff record;
+            # batch as many as can be open at once for fewer, fuller preloads
+            conf.commitbatch = conf.maxopensubjects
+            bot = InterwikiBot(conf)
+            bot.site = site
+            bot.setPageGenerator(iter(pagegenerators.AllpagesPageGenerator(includeredirects=False, site=site)))
+            try:
+                await bot.run(threaded=True)
+            except Exception as err:
+                pywikibot.exception()
+                await ctx.send(f"Interwiki dry run for {code} terminated early: {str(err)[:2000]}")
+
+        await ctx.send(f"Running an interwiki dry run for {', '.join(self.sites)}...")
+        with open(diff_path, 'w', encoding='utf-8') as diff_file:
+            writer = InterwikiDiffWriter(diff_file)
+            # One site at a time, as the live run does, so the bots don't contend for the wikis or the writer
+            for code, site in self.sites.items():
+                await run_site(code, site)
+
+        summary = f"Interwiki dry run finished: {writer.summary()}"
+        size_limit = ctx.guild.filesize_limit if ctx.guild else 8 * 1024 * 1024
+        if os.path.getsize(diff_path) < size_limit:
+            await ctx.send(summary, file=discord.File(diff_path, filename=os.path.basename(diff_path)))
+        else:
+            await ctx.send(f"{summary}\nThe diff is too big to attach; it's saved as `{os.path.basename(diff_path)}`.")
+
+    @commands.command(
+        name='interwiki_apply',
+        description="Makes the edits of an interwiki dry run diff, from an attached jsonl file or else the latest one "
+                    "saved. Pages whose links changed since the dry run are skipped.",
+        brief="Apply an interwiki dry run.",
+        help=f'{COMMAND_SYMBOL}interwiki_apply (with an optional jsonl attachment)',
+        pass_ctx=True)
+    async def interwiki_apply(self, ctx: Context):
+        if not self.permissions.is_editor(ctx.author):
+            await ctx.send("You don't have editor permission.")
+            return
+
+        if ctx.message.attachments:
+            lines = await self._read_attachment_lines(ctx, extensions=('.jsonl',))
+            if lines is None:
+                return
+        else:
+            diff_dir = pywikibot.config.datafilepath('data', 'interwiki-diffs')
+            diffs = sorted(f for f in os.listdir(diff_dir) if f.endswith('.jsonl')) if os.path.isdir(diff_dir) else []
+            if not diffs:
+                await ctx.send(f"There's no saved dry run; run `{COMMAND_SYMBOL}interwiki dryrun` first.")
+                return
+            with open(os.path.join(diff_dir, diffs[-1]), encoding='utf-8') as diff_file:
+                lines = diff_file.read().splitlines()
+            await ctx.send(f"Applying {diffs[-1]}.")
+
+        from src.squidge.pwbsupport.interwiki_diff import InterwikiDiffApplier, read_diff
+        try:
+            records = read_diff(lines)
+        except ValueError as err:
+            await ctx.send(f"That isn't an interwiki diff: {err}")
+            return
+
+        await self.login_to_sites()
+        applier = InterwikiDiffApplier(self.inkipedia, records)
+        loop = asyncio.get_running_loop()
+        planned = await loop.run_in_executor(None, lambda: list(applier.plan()))
+        await ctx.send(f"{len(planned)} of {len(applier.edits)} page(s) to update...")
+
+        editor = ThrottledEditor()
+        auth_by = EDIT_WITH_AUTHORIZED_BY + ctx.author.__str__() + " "
+        count = 0
+        for page, new_text, summary in planned:
+            page.text = new_text
+            try:
+                await editor.run(page.save, summary=auth_by + summary, prompt=False, nocreate=True)
+                count += 1
+            except pywikibot.exceptions.Error as err:
+                applier.skipped.append(f"{page.title()}: {err}")
+
+        report = BytesIO('\n'.join(applier.skipped).encode())
+        await ctx.send(f"Done, {count} page(s) changed, {len(applier.skipped)} skipped.",
+                       file=discord.File(report, filename="interwiki_apply_skipped.txt"))
+
     @commands.command(
         name='delete_list',
         description="Deletes files on wiki from an attached text file.",
@@ -858,53 +1353,138 @@ class WikiCommands(commands.Cog):
         pass_ctx=True)
     async def delete_list(self, ctx: Context):
         if self.permissions.is_admin(ctx.author):
-            self.login_to_sites()
+            await self.login_to_sites('en')
             try:
-                # If there is an attachment, read it
-                if not ctx.message.attachments or str(ctx.message.attachments) == "[]":
-                    await ctx.send(
-                        "Please resend this command with an attached txt/csv file.")
+                lines = await self._read_attachment_lines(ctx)
+                if lines is None:
                     return
 
-                attachments = ctx.message.attachments
-                split_v1 = str(attachments).split("filename='")[1]
-                filename = str(split_v1).split("' ")[0]
-                if filename.endswith(".txt") or filename.endswith(".csv"):  # if csv or txt
-                    file_bytes = await attachments[0].read()  # Read the contents of the file as bytes
-                    file_contents = file_bytes.decode("utf-8").splitlines()  # Decode the bytes as a string[]
-                    edit_summary_pre = EDIT_WITH_AUTHORIZED_BY + str(ctx.author) + " "
-                    result = "Deleted: \n"
-                    if not file_contents:
-                        await ctx.send(f"Nothing in, or could not read, the file. {file_bytes=} {file_contents=}.")
-                        return
-
-                    for line in file_contents:
-                        if line:
-                            # If the line contains a comma, it's the 'Replaced X with Y format'.
-                            # Otherwise, simply run the deletion.
-                            (page_to_delete, _, destination_page) = line.partition(',')
-                            page_to_delete = page_to_delete.strip()
-                            page_to_delete = Page(self.inkipedia, page_to_delete, ns=BuiltinNamespace.FILE)
-                            if destination_page:
-                                destination_page = destination_page.strip()
-                                destination_page = Page(self.inkipedia, destination_page, ns=BuiltinNamespace.FILE)
-                                edit_summary = f"replaced {page_to_delete.title(as_link=False)} " \
-                                               f"with {destination_page.title(as_link=True)}"
-                            else:
-                                edit_summary = f"mass deleting files"
-
-                            if self._try_delete_page(page_to_delete, edit_summary_pre + edit_summary):
-                                result += line + "\n"
-                            else:
-                                result += "*FAILED* " + line + "\n"
-                    await ctx.send(result[:MESSAGE_TEXT_LIMIT])
-                else:
-                    await ctx.send(f"Expecting csv or txt attachment, actually {repr(attachments)} -> {split_v1} -> {filename}")
+                edit_summary_pre = EDIT_WITH_AUTHORIZED_BY + str(ctx.author) + " "
+                entries = []
+                for line in lines:
+                    # If the line contains a comma, it's the 'Replaced X with Y format'.
+                    # Otherwise, simply run the deletion.
+                    (page_to_delete, _, destination_page) = line.partition(',')
+                    page_to_delete = Page(self.inkipedia, page_to_delete.strip(), ns=BuiltinNamespace.FILE)
+                    if destination_page.strip():
+                        destination_page = Page(self.inkipedia, destination_page.strip(), ns=BuiltinNamespace.FILE)
+                        edit_summary = f"replaced {page_to_delete.title(as_link=False)} " \
+                                       f"with {destination_page.title(as_link=True)}"
+                    else:
+                        edit_summary = f"mass deleting files"
+                    entries.append(DeleteEntry(line, page_to_delete, edit_summary_pre + edit_summary))
+
+                await ctx.send(f"Deleting {len(entries)} page(s)...")
+                with tempfile.TemporaryFile() as raw:
+                    results = TextIOWrapper(raw, encoding='utf-8')
+                    outcome = await MassDeleter(self.inkipedia).run(entries, results)
+                    results.detach()
+                    raw.seek(0)
+                    await ctx.send(f"Done, {outcome.deleted} deleted, {outcome.failed} failed, "
+                                   f"{outcome.missing} already missing.",
+                                   file=discord.File(raw, filename="delete_list_results.txt"))
             except Exception as ex:
                 await ctx.send(f"There was a problem: {ex.args}")
         else:
             logging.warning(f"Ignoring {ctx.author}'s request for deletion as they aren't a registered admin. -> {ctx.message.jump_url}")
 
+    @commands.command(
+        name='move_files',
+        description="Renames files from an attached text file of `old,new` lines and updates every page that uses them. "
+                    "Without `apply`, only reports what would change.",
+        brief="Mass rename files and update their uses.",
+        aliases=['movefiles', 'mass_move_files'],
+        help=f'{COMMAND_SYMBOL}move_files [apply] (with a txt/csv attachment of old,new lines)',
+        pass_ctx=True)
+    async def move_files(self, ctx: Context, *, message: str = ""):
+        if not self.permissions.is_admin(ctx.author):
+            await ctx.send("You don't have admin permission.")
+            return
+
+        lines = await self._read_attachment_lines(ctx)
+        if lines is None:
+            return
+
+        renames = {}
+        for line in lines:
+            (old_title, _, new_title) = line.partition(',')
+            if not old_title.strip() or not new_title.strip():
+                await ctx.send(f"Every line must be in `old,new` form. This isn't: `{line}`")
+                return
+            renames[old_title.strip()] = new_title.strip()
+
+        apply = message.strip().lower() == 'apply'
+        from src.squidge.pwbsupport.file_mover import BulkFileMover
+        mover = BulkFileMover(self.inkipedia, renames)
+        await ctx.send(f"Checking {len(renames)} rename(s) and their file usage...")
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(None, mover.plan)
+        rewrites = await loop.run_in_executor(None, lambda: list(mover.preview_rewrites(plan)))
+
+        report_lines = [f"Move: {old} -> {new}" for old, new in plan.moves.items()]
+        report_lines += [f"Cannot move: {problem}" for problem in plan.problems]
+        report_lines += [f"Rewrite: {rewrite.page.title()} ({rewrite.count} link(s) to "
+                         f"{', '.join(sorted(plan.usages[rewrite.page.title()]))})"
+                         for rewrite in rewrites]
+        needs_review = [rewrite for rewrite in rewrites if rewrite.needs_review]
+        report_lines += [f"Needs review: {rewrite.page.title()} (not rewritten: {', '.join(rewrite.needs_review)})"
+                         for rewrite in needs_review]
+        summary = (f"{len(plan.moves)} file(s) to move, {len(plan.problems)} problem(s), "
+                   f"{len(rewrites)} page(s) to update, {len(needs_review)} page(s) needing review.")
+        report = BytesIO('\n'.join(report_lines).encode())
+        await ctx.send(summary + ("" if apply else f" This was a dry run; use `{COMMAND_SYMBOL}move_files apply` to do it."),
+                       file=discord.File(report, filename="move_files_plan.txt"))
+        if not apply:
+            return
+
+        await self.login_to_sites('en')
+        editor = ThrottledEditor()
+        auth_by = EDIT_WITH_AUTHORIZED_BY + ctx.author.__str__() + " "
+        moved = set()
+        # A file that's the target of a chained rename can't keep a redirect, or the next move couldn't use its title
+        chained = set(plan.moves.values())
+        for old_title, new_title in plan.moves.items():
+            try:
+                await editor.run(Page(self.inkipedia, old_title).move, new_title,
+                                 reason=auth_by + "mass renaming files", movetalk=True,
+                                 noredirect=old_title in chained)
+                moved.add(old_title)
+            except pywikibot.exceptions.Error as err:
+                logging.error(f"Failed to move {old_title} to {new_title}: {err}")
+
+        # Moves leave redirects, so pages that still use a file that failed to move are safe to leave as-is
+        updated = 0
+        for rewrite in rewrites:
+            page = rewrite.page
+            if not rewrite.count or not plan.usages[page.title()] <= moved:
+                continue
+            page.text = rewrite.text
+            try:
+                await editor.run(page.save, summary=auth_by + "updating links to renamed files", prompt=False)
+                updated += 1
+            except pywikibot.exceptions.Error as err:
+                logging.error(f"Failed to update file links on {page}: {err}")
+        await ctx.send(f"Done, {len(moved)}/{len(plan.moves)} file(s) moved and {updated} page(s) updated.")
+
+    async def _read_attachment_lines(self, ctx: Context,
+                                     extensions: tuple[str, ...] = (".txt", ".csv")) -> Optional[List[str]]:
+        """Return the non-empty lines of the message's attachment, or None (with a reply) if there isn't a suitable one."""
+        if not ctx.message.attachments:
+            await ctx.send(f"Please resend this command with an attached {'/'.join(extensions)} file.")
+            return None
+
+        attachment = ctx.message.attachments[0]
+        if not attachment.filename.endswith(extensions):
+            await ctx.send(f"Expecting {'/'.join(extensions)} attachment, actually {attachment.filename}")
+            return None
+
+        file_bytes = await attachment.read()
+        lines = [line.strip() for line in file_bytes.decode("utf-8").splitlines() if line.strip()]
+        if not lines:
+            await ctx.send(f"Nothing in, or could not read, the file {attachment.filename}.")
+            return None
+        return lines
+
     @commands.command(
         name='iotm',
         description="Run Inkipedian of the Month command",
@@ -919,7 +1499,7 @@ class WikiCommands(commands.Cog):
             await ctx.send(f"Done. Please see {url}")
 
     async def _do_iotm(self):
-        self.login_to_sites()
+        await self.login_to_sites('en')
 
         # Define namespace weighting
         ns_to_score = {
@@ -1030,7 +1610,7 @@ class WikiCommands(commands.Cog):
                                              rule_title):
         user = interaction.user
         if self.permissions.is_editor(user):
-            self.login_to_sites()
+            await self.login_to_sites('en')
             switch = {
                 'user': BuiltinNamespace.USER,
                 'user talk': BuiltinNamespace.USER_TALK,
@@ -1068,6 +1648,7 @@ class WikiCommands(commands.Cog):
             regex_str = operation_switch.get(operation, None)
             rule_pages = pagegenerators.RegexFilterPageGenerator(namespace_filter_pages, re.compile(regex_str))
 
+            from src.squidge.pwbsupport.category import CategoryAddBot
             bot = CategoryAddBot(rule_pages, category_no_ns,
                                  comment=EDIT_WITH_AUTHORIZED_BY + user.__str__() + " adding category " + category_no_ns,
                                  prompt=False)
@@ -1092,22 +1673,6 @@ class WikiCommands(commands.Cog):
                                  and not backlink.full_url().startswith(trig_usertalkspace)
                                  for backlink in backlinks)
 
-    @staticmethod
-    def _try_delete_page(page, delete_summary) -> bool:
-        try:
-            deleted = page.delete(reason=delete_summary, prompt=False)
-        except pywikibot.exceptions.Error as err:
-            logging.error(f"Failed to delete {page} because a wiki exception occurred: {err}.", exc_info=err)
-            return False
-
-        if deleted == 1:
-            return True
-        else:
-            #  0 = no action was done
-            # -1 = marked for deletion instead
-            logging.error(f"Failed to delete {page} (delete returned {deleted}).")
-            return False
-
     @staticmethod
     def _previous_revision_text(page) -> Optional[str]:
         """Return the previous revision's text for this page (i.e. the one before latest); None if there isn't one"""
@@ -1,16 +1,45 @@
 import asyncio
 import logging
+import sys
+import threading
+from collections import OrderedDict
+from io import BytesIO
 from logging import StreamHandler
 from typing import Optional
 
+import discord
 from discord.abc import Messageable
 
 MESSAGE_TEXT_LIMIT = 2000
+# Seconds to gather records for before sending them as one message
+FLUSH_INTERVAL = 5.0
+# Distinct records held between flushes; any more are dropped (and counted)
+MAX_PENDING = 200
+
+# Where records that couldn't be sent are reported: straight to stderr, not through any logger,
+# as a logger would hand them back to the channel handler that just failed
+_fallback_handler = StreamHandler(sys.stderr)
+_fallback_handler.setFormatter(logging.Formatter('[%(levelname)s] %(name)s: %(message)s'))
 
 
 class ChannelLogHandler(StreamHandler):
+    """
+    Ships log records to a Discord channel.
+
+    emit only adds the record to a bounded buffer, so it's cheap and safe to call from any thread.
+    A single task on the bot's loop sends everything gathered over FLUSH_INTERVAL as one message,
+    or as one attachment if it's too long for a message. Repeats of a record in that time are sent once
+    with a count, and records beyond MAX_PENDING are dropped, with the number dropped sent instead.
+    """
+
     def __init__(self, channel: Messageable, logger: Optional[logging.Logger], log_level: int | str = logging.INFO):
         StreamHandler.__init__(self)
+        self._pending: OrderedDict[str, int] = OrderedDict()
+        self._dropped = 0
+        self._buffer_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._consumer: Optional[asyncio.Task] = None
         if channel:
             self.log_channel = channel
             logger = logger or logging.getLogger()
@@ -19,11 +48,79 @@ class ChannelLogHandler(StreamHandler):
             formatter = logging.Formatter('[%(levelname)s]: %(message)s')
             self.setFormatter(formatter)
             logger.addHandler(self)
+            try:
+                self._start(asyncio.get_running_loop())
+            except RuntimeError:
+                # Not made on the loop; the consumer starts with the first record emitted there
+                pass
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._consumer = loop.create_task(self._consume())
+        if self._pending or self._dropped:
+            self._wake.set()
 
     def emit(self, record):
-        msg = self.format(record)
-        while len(msg) > MESSAGE_TEXT_LIMIT:
-            truncated_send = msg[:MESSAGE_TEXT_LIMIT]
-            asyncio.create_task(self.log_channel.send(truncated_send))
-            msg = msg[MESSAGE_TEXT_LIMIT:]
-        asyncio.create_task(self.log_channel.send(msg))
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._buffer_lock:
+            first = not self._pending and not self._dropped
+            if msg in self._pending:
+                self._pending[msg] += 1
+            elif len(self._pending) < MAX_PENDING:
+                self._pending[msg] = 1
+            else:
+                self._dropped += 1
+
+        if self._loop is None:
+            try:
+                self._start(asyncio.get_running_loop())
+            except RuntimeError:
+                # No loop yet; the records wait in the buffer until there is one
+                return
+        if first and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take(self) -> tuple[list[tuple[str, int]], int]:
+        with self._buffer_lock:
+            pending = list(self._pending.items())
+            dropped = self._dropped
+            self._pending.clear()
+            self._dropped = 0
+        return pending, dropped
+
+    async def _consume(self):
+        while True:
+            await self._wake.wait()
+            # Gather whatever else comes in over the interval into the same send
+            await asyncio.sleep(FLUSH_INTERVAL)
+            self._wake.clear()
+            pending, dropped = self._take()
+            if pending or dropped:
+                await self._send(pending, dropped)
+
+    async def _send(self, pending: list[tuple[str, int]], dropped: int):
+        lines = [msg if count == 1 else f"{msg} (x {count - 1} more)" for msg, count in pending]
+        if dropped:
+            lines.append(f"[WARNING]: {dropped} more log record(s) were dropped.")
+        text = '\n'.join(lines)
+        try:
+            if len(text) <= MESSAGE_TEXT_LIMIT:
+                await self.log_channel.send(text)
+            else:
+                await self.log_channel.send(f"{len(lines)} log record(s):",
+                                            file=discord.File(BytesIO(text.encode()), filename="log.txt"))
+        except Exception as err:
+            _fallback_handler.handle(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.ERROR, 'levelname': 'ERROR',
+                'msg': f"ChannelLogHandler: could not send {len(lines)} log record(s): {err}"}))
+
+    def close(self):
+        if self._consumer is not None:
+            self._consumer.cancel()
+        super().close()
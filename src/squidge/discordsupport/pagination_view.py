@@ -2,13 +2,61 @@
 With thanks to
 https://github.com/richardschwabe/discord-bot-2022-course/blob/main/pagination.py
 """
-from typing import Union
+import inspect
+import itertools
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional, Sequence, TypeVar, Union
 
 import discord
 from discord import Interaction, Message
 from discord.ext.commands import Context
 from discord.ui.view import View
 
+T = TypeVar('T')
+# A page's fields, as (label, value) pairs
+PageFields = list[tuple[str, str]]
+# Called with a page number (from 1) for that page's fields, which may be awaited.
+# A page with no fields, when the page count isn't known, is past the end.
+PageProvider = Callable[[int], Union[PageFields, Awaitable[PageFields]]]
+# Called once, on the first search, for the searchable text of every page in order
+SearchIndexSource = Callable[[], Iterable[str]]
+# Recently viewed pages kept, so paging back and forth doesn't ask the provider again
+PAGE_CACHE_SIZE = 8
+
+
+def _normalise_text(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+def _page_text(fields: Iterable[tuple[str, str]]) -> str:
+    return _normalise_text(' '.join(f"{label} {value}" for (label, value) in fields))
+
+
+class PageJumpModal(discord.ui.Modal, title="Go to page"):
+    """Asks for a page to go to and/or text to show only the matching pages of."""
+
+    def __init__(self, pagination: 'PaginationView'):
+        super().__init__()
+        self.pagination = pagination
+        self.page = discord.ui.TextInput(
+            label=f"Page (1 to {pagination.page_count})" if pagination.page_count else "Page",
+            required=False, max_length=6)
+        self.add_item(self.page)
+        if pagination.can_search:
+            self.search = discord.ui.TextInput(
+                label="Only show pages containing (blank for all)",
+                required=False, max_length=100, default=pagination.filter_text)
+            self.add_item(self.search)
+        else:
+            self.search = None
+
+    async def on_submit(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        search = self.search.value if self.search is not None else None
+        problem = await self.pagination.jump(self.page.value.strip(), search)
+        if problem:
+            await interaction.followup.send(f"❌ {problem}", ephemeral=True)
+
 
 class PaginationView(View):
     current_page: int = 1
@@ -16,23 +64,136 @@ class PaginationView(View):
 
     def __init__(self,
                  title: str,
-                 fields: list[dict[str, str]],
+                 fields: Optional[list[dict[str, str]]] = None,
                  show_page_count: bool = True,
-                 fields_per_page: int = 5):
-        """Constructor for PaginationView"""
+                 fields_per_page: int = 5,
+                 *,
+                 provider: Optional[PageProvider] = None,
+                 page_count: Optional[int] = None,
+                 search_index: Optional[SearchIndexSource] = None,
+                 cache_size: int = PAGE_CACHE_SIZE):
+        """
+        Constructor for PaginationView.
+        Either pass fields, to show fields_per_page of them at a time, or a provider that makes each page
+        when it's shown, with the page_count if it's known. Only the shown page and the cache_size pages
+        viewed before it are ever held, so a view over thousands of entries costs no more than one over ten.
+        Views made from fields or items can be searched; a provider's view can be if given a search_index.
+        """
         super().__init__(timeout=10 * 60)  # in seconds (so, 10 minutes)
 
-        self.data = []
-        for item in fields:
-            for (key, value) in item.items():
-                self.data.append({
-                    "label": key,
-                    "item": value
-                })
-        # print(f"__init__: {repr(self.data)}")
+        if provider is None:
+            source = fields or []
+            provider = self._fields_provider(source, fields_per_page)
+            page_count = -(-sum(len(item) for item in source) // fields_per_page)
+            search_index = search_index or self._fields_search_index(source, fields_per_page)
+        self.provider = provider
+        # None until the last page is found, when the provider doesn't know how many there are
+        self.page_count: Optional[int] = max(page_count, 1) if page_count is not None else None
         self.title = title
         self.show_page_count = show_page_count
         self.fields_per_page = fields_per_page
+        self.cache_size = cache_size
+        self._pages: OrderedDict[int, PageFields] = OrderedDict()
+        self._search_index_source = search_index
+        # The normalised text of each page, made on the first search
+        self._search_index: Optional[list[str]] = None
+        self.filter_text = ''
+        # The pages matching filter_text, in order, or None when not filtered
+        self.matches: Optional[list[int]] = None
+
+    @classmethod
+    def from_items(cls,
+                   title: str,
+                   items: Sequence[T],
+                   to_fields: Callable[[T], dict[str, str]],
+                   items_per_page: int = 1,
+                   **kwargs) -> 'PaginationView':
+        """A view over items, where each item's fields are only made when its page is shown."""
+        def provider(page: int) -> PageFields:
+            start = (page - 1) * items_per_page
+            return [field for item in items[start:start + items_per_page] for field in to_fields(item).items()]
+
+        def search_index() -> Iterable[str]:
+            for start in range(0, len(items), items_per_page):
+                yield _page_text(field for item in items[start:start + items_per_page]
+                                 for field in to_fields(item).items())
+
+        kwargs.setdefault('search_index', search_index)
+        return cls(title, provider=provider, page_count=-(-len(items) // items_per_page), **kwargs)
+
+    @staticmethod
+    def _fields_provider(fields: list[dict[str, str]], fields_per_page: int) -> PageProvider:
+        def provider(page: int) -> PageFields:
+            flattened = itertools.chain.from_iterable(item.items() for item in fields)
+            start = (page - 1) * fields_per_page
+            return list(itertools.islice(flattened, start, start + fields_per_page))
+
+        return provider
+
+    @staticmethod
+    def _fields_search_index(fields: list[dict[str, str]], fields_per_page: int) -> SearchIndexSource:
+        def search_index() -> Iterable[str]:
+            flattened = itertools.chain.from_iterable(item.items() for item in fields)
+            while page := list(itertools.islice(flattened, fields_per_page)):
+                yield _page_text(page)
+
+        return search_index
+
+    @property
+    def can_search(self) -> bool:
+        return self._search_index_source is not None
+
+    def search(self, text: str) -> list[int]:
+        """The pages containing every word of the text, in their labels or values."""
+        if self._search_index is None:
+            self._search_index = list(self._search_index_source())
+        words = _normalise_text(text).split()
+        return [page for page, page_text in enumerate(self._search_index, start=1)
+                if all(word in page_text for word in words)]
+
+    async def jump(self, page: str, search: Optional[str] = None) -> Optional[str]:
+        """
+        Show only the pages matching search (if given; blank shows all again), then go to the page
+        (or else the first page shown). Returns what was wrong with the request, if anything.
+        """
+        if search is not None and _normalise_text(search) != self.filter_text:
+            if not _normalise_text(search):
+                self.filter_text, self.matches = '', None
+            else:
+                matches = self.search(search)
+                if not matches:
+                    return f"No pages contain `{search[:100]}`."
+                self.filter_text, self.matches = _normalise_text(search), matches
+                if not page:
+                    self.current_page = matches[0]
+
+        if page:
+            if not page.isdigit() or int(page) < 1 or (self.page_count is not None and int(page) > self.page_count):
+                return f"There's no page {page[:10]}."
+            if self.page_count is None and not await self.get_page(int(page)):
+                return f"There's no page {page}; the pages end before it."
+            self.current_page = int(page)
+        await self.update_message(await self.get_current_page_data())
+        return None
+
+    def _neighbour(self, step: int) -> Optional[int]:
+        """The page shown before (step -1) or after (step 1) the current one, if there is one."""
+        if self.matches is None:
+            page = self.current_page + step
+            return page if page >= 1 and (self.page_count is None or page <= self.page_count) else None
+        if step < 0:
+            earlier = [page for page in self.matches if page < self.current_page]
+            return earlier[-1] if earlier else None
+        later = [page for page in self.matches if page > self.current_page]
+        return later[0] if later else None
+
+    @property
+    def first_page(self) -> int:
+        return self.matches[0] if self.matches else 1
+
+    @property
+    def last_page(self) -> Optional[int]:
+        return self.matches[-1] if self.matches else self.page_count
 
     async def send(self, ctx: Union[Context, Interaction]):
         if isinstance(ctx, Context):
@@ -40,25 +201,50 @@ class PaginationView(View):
         else:
             message = await ctx.edit_original_response(view=self)
         self.message = message
-        await self.update_message(self.data[:self.fields_per_page])
+        await self.update_message(await self.get_current_page_data())
+
+    async def get_page(self, page: int) -> PageFields:
+        fields = self._pages.get(page)
+        if fields is not None:
+            self._pages.move_to_end(page)
+            return fields
 
-    def create_embed(self, data):
+        fields = self.provider(page)
+        if inspect.isawaitable(fields):
+            fields = await fields
+        fields = list(fields)
+        self._pages[page] = fields
+        while len(self._pages) > self.cache_size:
+            self._pages.popitem(last=False)
+        return fields
+
+    async def get_current_page_data(self) -> PageFields:
+        fields = await self.get_page(self.current_page)
+        if self.page_count is None and len(fields) < self.fields_per_page:
+            # A short page from a provider that doesn't know its length is the last one
+            self.page_count = self.current_page
+            if not fields and self.current_page > 1:
+                self.page_count = self.current_page = self.current_page - 1
+                fields = await self.get_page(self.current_page)
+        return fields
+
+    def create_embed(self, data: PageFields):
         title = self.title
         if self.show_page_count:
-            title += f" {self.current_page} / {(int(len(self.data) / self.fields_per_page) + 1)}"
-        print(f"create_embed: {self.current_page=}, {title=}")
+            title += f" {self.current_page} / {self.page_count or '?'}"
+        if self.matches is not None:
+            title += f" ({len(self.matches)} page(s) contain \"{self.filter_text}\")"
         embed = discord.Embed(title=title)
-        for field in data:
-            embed.add_field(name=field['label'], value=field['item'], inline=True)
-            print(f"create_embed: {repr(field)}")
+        for (label, value) in data:
+            embed.add_field(name=label, value=value, inline=True)
         return embed
 
-    async def update_message(self, data):
+    async def update_message(self, data: PageFields):
         self.update_buttons()
         await self.message.edit(embed=self.create_embed(data), view=self)
 
     def update_buttons(self):
-        if self.current_page == 1:
+        if self._neighbour(-1) is None:
             self.first_page_button.disabled = True
             self.prev_button.disabled = True
             self.first_page_button.style = discord.ButtonStyle.gray
@@ -69,47 +255,53 @@ class PaginationView(View):
             self.first_page_button.style = discord.ButtonStyle.green
             self.prev_button.style = discord.ButtonStyle.primary
 
-        if self.current_page == int(len(self.data) / self.fields_per_page) + 1:
+        if self._neighbour(1) is None:
             self.next_button.disabled = True
             self.last_page_button.disabled = True
             self.last_page_button.style = discord.ButtonStyle.gray
             self.next_button.style = discord.ButtonStyle.gray
         else:
             self.next_button.disabled = False
-            self.last_page_button.disabled = False
-            self.last_page_button.style = discord.ButtonStyle.green
             self.next_button.style = discord.ButtonStyle.primary
+            # The last page can't be jumped to until it's been found
+            self.last_page_button.disabled = self.last_page is None
+            self.last_page_button.style = \
+                discord.ButtonStyle.gray if self.last_page is None else discord.ButtonStyle.green
 
-    def get_current_page_data(self):
-        until_item = self.current_page * self.fields_per_page
-        from_item = until_item - self.fields_per_page
-        return self.data[from_item:until_item]
+        # Nothing to jump to or search on a single page
+        self.jump_button.disabled = self.page_count == 1 and self.matches is None
 
     @discord.ui.button(label="|<",
                        style=discord.ButtonStyle.green)
     async def first_page_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         await interaction.response.defer()
-        self.current_page = 1
+        self.current_page = self.first_page
 
-        await self.update_message(self.get_current_page_data())
+        await self.update_message(await self.get_current_page_data())
 
     @discord.ui.button(label="<",
                        style=discord.ButtonStyle.primary)
     async def prev_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         await interaction.response.defer()
-        self.current_page -= 1
-        await self.update_message(self.get_current_page_data())
+        self.current_page = self._neighbour(-1) or self.current_page
+        await self.update_message(await self.get_current_page_data())
 
     @discord.ui.button(label=">",
                        style=discord.ButtonStyle.primary)
     async def next_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         await interaction.response.defer()
-        self.current_page += 1
-        await self.update_message(self.get_current_page_data())
+        self.current_page = self._neighbour(1) or self.current_page
+        await self.update_message(await self.get_current_page_data())
 
     @discord.ui.button(label=">|",
                        style=discord.ButtonStyle.green)
     async def last_page_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         await interaction.response.defer()
-        self.current_page = int(len(self.data) / self.fields_per_page) + 1
-        await self.update_message(self.get_current_page_data())
+        if self.last_page is not None:
+            self.current_page = self.last_page
+        await self.update_message(await self.get_current_page_data())
+
+    @discord.ui.button(label="Go to…",
+                       style=discord.ButtonStyle.secondary)
+    async def jump_button(self, interaction: discord.Interaction, _: discord.ui.Button):
+        await interaction.response.send_modal(PageJumpModal(self))
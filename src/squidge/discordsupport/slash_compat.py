@@ -1,3 +1,6 @@
+from typing import Optional
+
+import discord
 from discord.ext.commands import Context
 
 
@@ -11,3 +14,10 @@ async def send_or_edit(ctx: Context, message: str):
         await ctx.interaction.edit_original_response(content=message)
     else:
         await ctx.send(content=message)
+
+
+async def send_file_or_edit(ctx: Context, file: discord.File, message: Optional[str] = None):
+    if ctx.interaction:
+        await ctx.interaction.edit_original_response(content=message, attachments=[file])
+    else:
+        await ctx.send(content=message, file=file)
@@ -1,8 +1,10 @@
 import asyncio
+import importlib
 import json
 import logging
 import os
 import sys
+import time
 from typing import List, Optional
 
 import discord
@@ -10,22 +12,29 @@ from discord import TextChannel, Message, User
 from discord.ext import commands
 from discord.ext.commands import Bot, CommandNotFound, UserInputError, MissingRequiredArgument, Context
 
-from src.squidge.cogs.bot_util_commands import BotUtilCommands
-from src.squidge.cogs.server_commands import ServerCommands
-from src.squidge.cogs.wiki_commands import WikiCommands
 from src.squidge.discordsupport.channel_logger import ChannelLogHandler
 from src.squidge.entry.consts import COMMAND_SYMBOL
+from src.squidge.entry.timings import StageTimings
+from src.squidge.pwbsupport.http_pool import close_http_session
 from src.squidge.savedata.save_data import SaveData
 
 
 class SquidgeBot(Bot):
 
-    def __init__(self):
+    def __init__(self, started_at: Optional[float] = None):
+        # perf_counter() when the process started, to time startup from
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        # Time spent on each step of starting up, see the startup command
+        self.startup_timings = StageTimings()
         self.ready = False
         self.save_data = SaveData()
         self.wiki_commands = None
         self.highlight_commands = None
+        # Kept so the task isn't garbage collected before it's done
+        self._wiki_commands_task: Optional[asyncio.Task] = None
         self.presence = ""
+        # Time spent on each stage of on_message, see the timings command
+        self.message_timings = StageTimings()
 
         intents = discord.Intents.default()
         intents.members = True  # Needed to call fetch_members for username & tag recognition (grant/deny)
@@ -58,8 +67,14 @@ class SquidgeBot(Bot):
             ChannelLogHandler(logs_channel, None, logging.WARNING)
 
         # Load Cogs
+        # The wiki cog pulls in pywikibot, so it's imported off the loop while we connect, and added when ready
+        wiki_commands_import = asyncio.get_running_loop().run_in_executor(
+            None, self._timed_import, 'src.squidge.cogs.wiki_commands')
+
+        from src.squidge.cogs.bot_util_commands import BotUtilCommands
         await self.try_add_cog(BotUtilCommands)
-        self.wiki_commands = await self.try_add_cog(WikiCommands)
+
+        from src.squidge.cogs.server_commands import ServerCommands
         await self.try_add_cog(ServerCommands)
 
         from src.squidge.cogs.wiki_slash_commands import WikiSlashCommands
@@ -71,6 +86,9 @@ class SquidgeBot(Bot):
         from src.squidge.cogs.highlight_commands import HighlightCommands
         self.highlight_commands = await self.try_add_cog(HighlightCommands)
 
+        self._wiki_commands_task = asyncio.create_task(self._add_wiki_commands(wiki_commands_import))
+        self._wiki_commands_task.add_done_callback(self._log_task_failure)
+
         # Sync slash commands
         assert self.tree.get_commands(), "No commands were registered"
         for guild in SquidgeBot.squidge_guilds():
@@ -78,12 +96,37 @@ class SquidgeBot(Bot):
 
     async def try_add_cog(self, cog: commands.cog):
         try:
-            new_cog = cog(self)
-            await self.add_cog(new_cog)
+            with self.startup_timings.time(f"load {cog.__name__}"):
+                new_cog = cog(self)
+                await self.add_cog(new_cog)
             return new_cog
         except Exception as e:
             logging.error(f"Failed to load {cog=}: {e=}")
 
+    @staticmethod
+    def _log_task_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+    def _timed_import(self, module: str):
+        with self.startup_timings.time(f"import {module.rsplit('.', 1)[-1]}"):
+            return importlib.import_module(module)
+
+    async def _add_wiki_commands(self, module_import: asyncio.Future):
+        try:
+            module = await module_import
+        except Exception as e:
+            logging.error(f"Failed to import the wiki commands: {e=}")
+            return
+        self.wiki_commands = await self.try_add_cog(module.WikiCommands)
+        # If we were ready first, start what on_ready would have
+        if self.ready and self.wiki_commands:
+            self.wiki_commands.start_recent_changes()
+
+    async def close(self):
+        await close_http_session()
+        await super().close()
+
     async def on_command_error(self, ctx: Context, error, **kwargs):
         if isinstance(error, CommandNotFound):
             return
@@ -102,31 +145,34 @@ class SquidgeBot(Bot):
         if not self.ready:
             return
 
-        # If it's the WikiNotifier bot, do stuff.
-        # else, don't respond to bot messages.
+        # Don't respond to bot messages.
+        # Wiki events come from the wikis' recent changes (see WikiCommands.start_recent_changes)
         if message.author.bot:
-            # If WikiNotifier
-            if message.author.id.__str__() == "1027464071362121728":
-                # If #recent-changes channel in Inkipedia
-                if message.channel.id.__str__() == "1020516169146454037":
-                    message_to_send = await self.wiki_commands.handle_inkipedia_event(message)
-                    if message_to_send:
-                        # Reply in #squidge-alerts
-                        bot_spam = message.channel.guild.get_channel(1033866281549582376)
-                        await bot_spam.send(message_to_send)
             return
 
-        # Process the message in the normal way
-        ctx = await self.get_context(message)
-        await self.invoke(ctx)
+        # Only build the full context for messages that could be commands
+        if message.content.startswith(COMMAND_SYMBOL):
+            with self.message_timings.time("command"):
+                ctx = await self.get_context(message)
+                await self.invoke(ctx)
+        else:
+            self.message_timings.record("not a command", 0)
+
         # Process our highlights
-        await self.highlight_commands.process_highlight(ctx)
+        if self.highlight_commands and message.content:
+            await self.highlight_commands.process_highlight(message)
 
     async def on_ready(self):
         logging.info(f'Logged in as {self.user.name}, id {self.user.id}')
+        if not self.ready:
+            self.startup_timings.record("process start to connected", time.perf_counter() - self.started_at)
+            logging.info(f"Startup:\n{self.startup_timings.report()}")
         await self.change_presence(activity=discord.Game(name=self.presence))
         await self.load_save_data()
         self.ready = True
+        # Moderation needs the save data, so only follow the wikis once it's loaded
+        if self.wiki_commands:
+            self.wiki_commands.start_recent_changes()
 
     def do_the_thing(self):
         loop = asyncio.get_event_loop()
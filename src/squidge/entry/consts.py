@@ -1,2 +1,4 @@
 BOT_NAME = "squidge"
 COMMAND_SYMBOL = '~'
+# The #squidge-alerts channel, where wiki moderation alerts are sent
+SQUIDGE_ALERTS_CHANNEL_ID = 1033866281549582376
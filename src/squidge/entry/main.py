@@ -1,11 +1,13 @@
 import os
 import sys
+import time
 
 import dotenv
 import logging
 
 
 def main():
+    started_at = time.perf_counter()
     dotenv_path = dotenv.find_dotenv()
     if not dotenv_path:
         assert False, ".env file not found. Please check the .env file is present in the root folder."
@@ -17,10 +19,13 @@ def main():
 
     # Import must be after the env loading
     print(sys.path)
+    import_started_at = time.perf_counter()
     from src.squidge.entry.SquidgeBot import SquidgeBot
+    imported_at = time.perf_counter()
 
     logging.basicConfig(level=logging.INFO)
-    squidge = SquidgeBot()
+    squidge = SquidgeBot(started_at)
+    squidge.startup_timings.record("import SquidgeBot", imported_at - import_started_at)
     squidge.do_the_thing()
     logging.info("Main exited!")
 
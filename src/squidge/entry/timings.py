@@ -0,0 +1,49 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass
+class StageTiming:
+    calls: int = 0
+    hits: int = 0
+    total_seconds: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_seconds * 1000 / self.calls if self.calls else 0.0
+
+
+class StageTimings:
+    """Call counts, hit counts and time taken for named stages of some processing, for reporting on Discord."""
+
+    def __init__(self):
+        self.stages: dict[str, StageTiming] = {}
+
+    def record(self, name: str, seconds: float, hit: bool = False):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageTiming()
+        stage.calls += 1
+        stage.total_seconds += seconds
+        if hit:
+            stage.hits += 1
+
+    @contextmanager
+    def time(self, name: str):
+        """Time the body of the with block as one call of the stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def reset(self):
+        self.stages.clear()
+
+    def report(self) -> str:
+        if not self.stages:
+            return "Nothing recorded yet."
+        return '\n'.join(f"{name}: {stage.calls} call(s), {stage.hits} hit(s), "
+                         f"{stage.total_seconds * 1000:.1f} ms total, {stage.mean_ms:.3f} ms mean"
+                         for name, stage in self.stages.items())
@@ -44,6 +44,9 @@ Options for "listify" action:
                 listified in addition to the pages themselves.
  -prefix:#    - You may specify a list prefix like "#" for a numbered list or
                 any other prefix. Default is a bullet list with prefix "*".
+ -stream[:#]  - Sort each category's members into a temporary file and merge
+                the files as the list is written, splitting the list across
+                numbered subpages once it passes # bytes (default 1 MiB).
 
 Options for "remove" action:
 
@@ -133,11 +136,13 @@ This will move all pages in the category US to the category United States.
 # Distributed under the terms of the MIT license.
 #
 import codecs
+import heapq
 import math
 import os
 import pickle
 import re
-from contextlib import suppress
+import tempfile
+from contextlib import ExitStack, suppress
 from operator import methodcaller
 from textwrap import fill
 from typing import Optional, Union
@@ -931,6 +936,9 @@ class CategoryListifyRobot:
 
     """Create a list containing all of the members in a category."""
 
+    # Sorted run files read at once when streaming the list
+    MAX_OPEN_RUNS = 64
+
     def __init__(self, cat_title: Optional[str], list_title: Optional[str],
                  edit_summary: str,
                  append: bool = False,
@@ -939,13 +947,26 @@ class CategoryListifyRobot:
                  talk_pages: bool = False,
                  recurse: Union[int, bool] = False,
                  prefix: str = '*',
-                 namespaces=None) -> None:
-        """Initializer."""
+                 namespaces=None,
+                 stream: bool = False,
+                 max_page_size: int = 1024 * 1024,
+                 site=None) -> None:
+        """Initializer.
+
+        :param stream: sort each category's members into a temporary file
+            and merge the files as the list is written, rather than building
+            the whole list in memory.
+        :param max_page_size: in stream mode, the size in bytes after which
+            the list is split across numbered subpages of the list page.
+        :param site: the site to work on; the default site if not given.
+        """
         self.edit_summary = edit_summary
         self.append = append
         self.overwrite = overwrite
         self.show_images = show_images
-        self.site = pywikibot.Site()
+        self.stream = stream
+        self.max_page_size = max_page_size
+        self.site = site or pywikibot.Site()
         if not cat_title:
             cat_title = pywikibot.input(
                 'Please enter the name of the category to listify:')
@@ -970,20 +991,17 @@ class CategoryListifyRobot:
                 '-overwrite option to overwrite the output page.'))
             return
 
+        if self.stream:
+            self.run_streaming()
+            return
+
         set_of_articles = set(self.cat.articles(recurse=self.recurse,
                                                 namespaces=self.namespaces))
         if self.subcats:
             set_of_articles |= set(self.cat.subcategories())
 
-        list_string = ''
-        for article in sorted(set_of_articles):
-            textlink = not (article.is_filepage() and self.show_images)
-            list_string += '{} {}'.format(
-                self.prefix, article.title(as_link=True, textlink=textlink))
-            if self.talk_pages and not article.isTalkPage():
-                list_string += ' -- [[{}|talk]]'.format(
-                    article.toggleTalkPage().title())
-            list_string += '\n'
+        list_string = ''.join(self.format_line(article)
+                              for article in sorted(set_of_articles))
 
         if self.list.text and self.append:
             # append content by default at the bottom
@@ -996,6 +1014,142 @@ class CategoryListifyRobot:
                 {'fromcat': self.cat.title(), 'num': len(set_of_articles)})
         self.list.put(list_string, summary=self.edit_summary)
 
+    def format_line(self, article: pywikibot.Page) -> str:
+        """Return the list line for one member, including the newline."""
+        textlink = not (article.is_filepage() and self.show_images)
+        line = '{} {}'.format(
+            self.prefix, article.title(as_link=True, textlink=textlink))
+        if self.talk_pages and not article.isTalkPage():
+            line += ' -- [[{}|talk]]'.format(
+                article.toggleTalkPage().title())
+        return line + '\n'
+
+    def _member_groups(self):
+        """Yield the members of each category in the tree, one at a time."""
+        if self.subcats:
+            yield self.cat.subcategories()
+
+        if self.recurse is True:
+            max_depth = None
+        else:
+            max_depth = int(self.recurse)
+        queue = [(self.cat, 0)]
+        seen = {self.cat}
+        while queue:
+            cat, depth = queue.pop()
+            yield cat.articles(namespaces=self.namespaces)
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for subcat in cat.subcategories():
+                if subcat not in seen:
+                    seen.add(subcat)
+                    queue.append((subcat, depth + 1))
+
+    def _write_run(self, path: str, members) -> None:
+        """Write the members to path, sorted, as sort key, tab, list line."""
+        with open(path, 'w', encoding='utf-8') as run:
+            for member in sorted(members):
+                # Pages sort by namespace then title; the fixed width number
+                # and the tab (below any title character) keep that order
+                # when the keys are compared as strings
+                run.write('{:06d}\t{}\t{}'.format(
+                    member.namespace().id + 10, member.title(),
+                    self.format_line(member)))
+
+    @staticmethod
+    def _merge_runs(paths, output: str) -> None:
+        """Merge sorted run files into one, deleting them."""
+        with ExitStack() as stack, open(output, 'w', encoding='utf-8') as out:
+            runs = [stack.enter_context(open(path, encoding='utf-8'))
+                    for path in paths]
+            out.writelines(heapq.merge(*runs))
+        for path in paths:
+            os.remove(path)
+
+    def iter_sorted_lines(self):
+        """Yield the list line of every member once, in sorted order.
+
+        Each category's members are sorted and spilled to a temporary file
+        as they are fetched, so only one category's members are held in
+        memory at a time. The files are then merged as the lines are read,
+        at most MAX_OPEN_RUNS at once, merging runs early if there are more.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            runs = []
+            for number, members in enumerate(self._member_groups()):
+                path = os.path.join(directory, str(number))
+                self._write_run(path, members)
+                runs.append(path)
+                if len(runs) >= self.MAX_OPEN_RUNS:
+                    merged = path + '-merged'
+                    self._merge_runs(runs, merged)
+                    runs = [merged]
+
+            previous = None
+            with ExitStack() as stack:
+                files = [stack.enter_context(open(path, encoding='utf-8'))
+                         for path in runs]
+                for entry in heapq.merge(*files):
+                    key, _, line = entry.rpartition('\t')
+                    if key != previous:
+                        yield line
+                        previous = key
+
+    def run_streaming(self, output=None) -> int:
+        """Write the list as the members are merged.
+
+        :param output: a text stream to write the list to instead of the
+            wiki. If not given, the list is saved to the list page, split
+            across numbered subpages if it grows beyond max_page_size.
+        :return: the number of members listed.
+        """
+        count = 0
+        if output is not None:
+            for line in self.iter_sorted_lines():
+                output.write(line)
+                count += 1
+            return count
+
+        chunk = []
+        chunk_size = 0
+        subpages = []
+        for line in self.iter_sorted_lines():
+            line_size = len(line.encode('utf-8'))
+            if chunk and chunk_size + line_size > self.max_page_size:
+                subpages.append(self._put_subpage(len(subpages) + 1, chunk))
+                chunk = []
+                chunk_size = 0
+            chunk.append(line)
+            chunk_size += line_size
+            count += 1
+
+        if subpages:
+            if chunk:
+                subpages.append(self._put_subpage(len(subpages) + 1, chunk))
+            chunk = ['{} {}\n'.format(self.prefix, page.title(as_link=True))
+                     for page in subpages]
+
+        list_string = ''.join(chunk)
+        if self.list.text and self.append:
+            # append content by default at the bottom
+            list_string = self.list.text + '\n' + list_string
+            pywikibot.output('Category list appending...')
+        self.list.put(list_string, summary=self._summary(count))
+        return count
+
+    def _summary(self, num: int) -> str:
+        """Return the edit summary for a list (part) of num members."""
+        return self.edit_summary or i18n.twtranslate(
+            self.site, 'category-listifying',
+            {'fromcat': self.cat.title(), 'num': num})
+
+    def _put_subpage(self, number: int, lines) -> pywikibot.Page:
+        """Save one numbered part of a split list."""
+        subpage = pywikibot.Page(self.site,
+                                 '{}/{}'.format(self.list.title(), number))
+        subpage.put(''.join(lines), summary=self._summary(len(lines)))
+        return subpage
+
 
 class CategoryTidyRobot(Bot, CategoryPreprocess):
     """
@@ -1440,6 +1594,125 @@ class CleanBot(Bot):
             grandchild.change_category(self.cat, None, summary)
 
 
+class CategoryGraph:
+
+    """Interned view of a category subtree for batch analysis.
+
+    The subtree is loaded once through a CategoryDatabase, so repeat runs
+    are served from its dump rather than the API. Every page and category
+    is interned to an integer id and memberships are held as frozensets of
+    ids, so overlaps across the whole tree are plain set algebra.
+
+    This is the batch counterpart of CleanBot (and of the interactive
+    CategoryTidyRobot): one walk of the tree, then a full report.
+    """
+
+    def __init__(self) -> None:
+        """Initializer."""
+        self.pages = []  # type: list[pywikibot.Page]
+        self.ids = {}  # type: dict[pywikibot.Page, int]
+        self.subcats = {}  # type: dict[int, frozenset]
+        self.articles = {}  # type: dict[int, frozenset]
+        self._descendants = {}  # type: dict[int, frozenset]
+
+    def intern(self, page: pywikibot.Page) -> int:
+        """Return the id of page, assigning a new one if needed."""
+        page_id = self.ids.get(page)
+        if page_id is None:
+            page_id = len(self.pages)
+            self.ids[page] = page_id
+            self.pages.append(page)
+        return page_id
+
+    def page(self, page_id: int) -> pywikibot.Page:
+        """Return the page for an interned id."""
+        return self.pages[page_id]
+
+    @classmethod
+    def from_database(cls, cat_db: CategoryDatabase,
+                      root: pywikibot.Category,
+                      max_depth: int = 10) -> 'CategoryGraph':
+        """Load the subtree under root from cat_db.
+
+        Categories already in the database are not fetched again. Loops in
+        the category structure are walked only once.
+
+        :param cat_db: the category store to load through.
+        :param root: the category at the top of the tree.
+        :param max_depth: the depth beyond which subcategories are not
+            opened.
+        """
+        graph = cls()
+        queue = [(root, 0)]
+        seen = {graph.intern(root)}
+        while queue:
+            cat, depth = queue.pop()
+            cat_id = graph.intern(cat)
+            subcats = cat_db.get_subcats(cat) if depth < max_depth else set()
+            graph.subcats[cat_id] = frozenset(graph.intern(c) for c in subcats)
+            graph.articles[cat_id] = frozenset(
+                graph.intern(p) for p in cat_db.get_articles(cat))
+            for subcat in subcats:
+                subcat_id = graph.ids[subcat]
+                if subcat_id not in seen:
+                    seen.add(subcat_id)
+                    queue.append((subcat, depth + 1))
+        return graph
+
+    def descendant_articles(self, cat_id: int) -> frozenset:
+        """Return the ids of all articles in cat_id and its subcategories."""
+        cached = self._descendants.get(cat_id)
+        if cached is not None:
+            return cached
+
+        # Iterative post-order walk, so deep trees don't hit the recursion
+        # limit and loops are only entered once.
+        result = set()
+        stack = [cat_id]
+        visited = set()
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            known = self._descendants.get(current)
+            if known is not None:
+                result |= known
+                continue
+            result |= self.articles.get(current, frozenset())
+            stack.extend(self.subcats.get(current, frozenset()))
+
+        cached = frozenset(result)
+        self._descendants[cat_id] = cached
+        return cached
+
+    def overcategorized(self, root_id: int, recurse: bool = False):
+        """Find direct members of root_id that are also under a subcategory.
+
+        Stub categories are skipped, as in CleanBot.
+
+        :param root_id: the id of the category to clean.
+        :param recurse: whether to look through the whole subtree of each
+            subcategory rather than only its direct articles.
+        :return: list of (subcategory id, sorted member ids) pairs.
+        """
+        subcats = self.subcats.get(root_id, frozenset())
+        children = subcats | self.articles.get(root_id, frozenset())
+        result = []
+        for child_id in sorted(subcats, key=lambda i: self.pages[i]):
+            if self.pages[child_id].title().endswith('stubs'):
+                continue
+            if recurse:
+                grandchildren = self.descendant_articles(child_id)
+            else:
+                grandchildren = self.articles.get(child_id, frozenset())
+            overlap = grandchildren & children
+            if overlap:
+                result.append(
+                    (child_id, sorted(overlap, key=lambda i: self.pages[i])))
+        return result
+
+
 def main(*args: str) -> None:
     """
     Process command line arguments and invoke bot.
@@ -1467,6 +1740,8 @@ def main(*args: str) -> None:
     keep_sortkey = None
     depth = 5
     prefix = '*'
+    stream = False
+    max_page_size = 1024 * 1024
 
     # Process global args and prepare generator args parser
     local_args = pywikibot.handle_args(args)
@@ -1542,6 +1817,10 @@ def main(*args: str) -> None:
             keep_sortkey = True
         elif option == 'prefix':
             prefix = value
+        elif option == 'stream':
+            stream = True
+            if value:
+                max_page_size = int(value)
         elif option == 'always':
             options[option] = True
         else:
@@ -1622,6 +1901,8 @@ def main(*args: str) -> None:
                                    talk_pages=talkpages,
                                    recurse=options.get('recurse', False),
                                    prefix=prefix,
+                                   stream=stream,
+                                   max_page_size=max_page_size,
                                    namespaces=gen_factory.namespaces)
     elif action == 'clean':
         bot = CleanBot(**options)
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Union
+
+import pywikibot
+from pywikibot import Category, Site
+from pywikibot.site._namespace import BuiltinNamespace
+
+from src.squidge.pwbsupport.http_pool import get_http_session
+from src.squidge.savedata.checkpoint import Checkpoint
+
+IMAGEINFO_BATCH_SIZE = 50
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+CHECKPOINT_EVERY = 25
+
+
+@dataclass
+class ExportResult:
+    archive_path: str
+    added: int = 0
+    skipped_duplicates: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    resumed_from: int = 0
+
+
+class CategoryArchiveExporter:
+    """
+    Exports the original files in a category to a zip or tar archive.
+
+    Files are listed with one imageinfo query per 50 titles, a batch at a time as the downloads need them,
+    downloaded by `concurrency` workers over the shared keep-alive HTTP pool, and handed through a bounded
+    queue to one writer that copies them into the archive. A download is spooled to disk past 1 MB,
+    and at most twice `concurrency` finished or unfinished downloads exist at once, however big the category.
+    Files whose SHA-1 is already in the archive are skipped, and progress is checkpointed so an
+    interrupted export resumes where it stopped.
+
+    The archive is written to a .part file, renamed once it's closed, so the archive is never left half-written.
+    On resuming, only the files the .part really holds count as done; a zip that wasn't closed can't be read,
+    so its export starts again, and a tar is cut back to its last complete file.
+    """
+
+    def __init__(self, site: Site, category: Union[str, Category],
+                 recurse: Union[bool, int] = False,
+                 archive_format: str = 'zip',
+                 concurrency: int = 4,
+                 output_dir: Optional[str] = None):
+        assert archive_format in ('zip', 'tar'), f"Unknown archive format {archive_format}"
+        self.site = site
+        self.category = category if isinstance(category, Category) else Category(site, category)
+        self.recurse = recurse
+        self.archive_format = archive_format
+        self.concurrency = concurrency
+        output_dir = output_dir or pywikibot.config.datafilepath('data', 'exports')
+        base_name = f"{site.family.name}-{site.code}-{self.category.title(with_ns=False, as_filename=True)}"
+        self.archive_path = os.path.join(output_dir, f"{base_name}.{archive_format}")
+        self.part_path = self.archive_path + '.part'
+        self.checkpoint = Checkpoint(os.path.join(output_dir, f"{base_name}.{archive_format}.checkpoint.json"))
+
+    def iter_file_info_batches(self) -> Iterator[list[dict]]:
+        """Yield lists of {title, url, sha1, size} for the files in the category, one API request per list."""
+        batch = []
+        seen = set()
+        for page in self.category.articles(recurse=self.recurse, namespaces=[BuiltinNamespace.FILE]):
+            title = page.title()
+            if title in seen:
+                continue
+            seen.add(title)
+            batch.append(title)
+            if len(batch) >= IMAGEINFO_BATCH_SIZE:
+                yield list(self._query_imageinfo(batch))
+                batch = []
+        if batch:
+            yield list(self._query_imageinfo(batch))
+
+    def _query_imageinfo(self, titles: list[str]) -> Iterator[dict]:
+        request = self.site.simple_request(action='query', prop='imageinfo', iiprop='url|sha1|size',
+                                           titles='|'.join(titles))
+        data = request.submit()
+        for page in data.get('query', {}).get('pages', {}).values():
+            info = (page.get('imageinfo') or [None])[0]
+            if not info or 'url' not in info:
+                logging.warning(f"CategoryArchiveExporter: no file info for {page.get('title')}, skipping.")
+                continue
+            yield {'title': page['title'], 'url': info['url'], 'sha1': info.get('sha1'), 'size': info.get('size', 0)}
+
+    @staticmethod
+    def _entry_name(title: str) -> str:
+        return title.split(':', 1)[-1].replace('/', '_')
+
+    def _recover_archive(self) -> Optional[set[str]]:
+        """
+        Return the names of the complete entries in the .part archive, ready to be appended to,
+        or None (and remove it) if it can't be read.
+        """
+        try:
+            if self.archive_format == 'zip':
+                # A zip without its central directory (from a crash) doesn't open, and appending to it would
+                # start a second archive after it
+                with zipfile.ZipFile(self.part_path, 'r') as archive:
+                    return set(archive.namelist())
+
+            part_size = os.path.getsize(self.part_path)
+            names = set()
+            end = 0
+            with tarfile.open(self.part_path, 'r') as archive:
+                for member in archive:
+                    member_end = member.offset_data + -(-member.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                    if member_end > part_size:
+                        break
+                    names.add(member.name)
+                    end = member_end
+            # Drop any partly written entry, and end the archive there so it can be appended to
+            with open(self.part_path, 'r+b') as f:
+                f.truncate(end)
+                f.seek(end)
+                f.write(bytes(2 * tarfile.BLOCKSIZE))
+            return names
+        except (OSError, zipfile.BadZipFile, tarfile.TarError) as err:
+            logging.warning(f"CategoryArchiveExporter: can't resume {self.part_path}, starting again: {err}")
+            os.remove(self.part_path)
+            return None
+
+    def _open_archive(self, resume: bool):
+        mode = 'a' if resume else 'w'
+        if self.archive_format == 'zip':
+            return zipfile.ZipFile(self.part_path, mode, compression=zipfile.ZIP_STORED, allowZip64=True)
+        return tarfile.open(self.part_path, mode)
+
+    def _add_to_archive(self, archive, name: str, spool, size: int):
+        spool.seek(0)
+        if isinstance(archive, zipfile.ZipFile):
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                shutil.copyfileobj(spool, entry, DOWNLOAD_CHUNK_SIZE)
+        else:
+            tar_info = tarfile.TarInfo(name)
+            tar_info.size = size
+            tar_info.mtime = int(time.time())
+            archive.addfile(tar_info, spool)
+
+    async def run(self) -> ExportResult:
+        os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+        loop = asyncio.get_running_loop()
+        state = self.checkpoint.load()
+        if state is not None and not os.path.exists(self.part_path) and os.path.exists(self.archive_path):
+            # The last export finished with some files failed; add them to its archive
+            os.replace(self.archive_path, self.part_path)
+        names = None
+        if state is not None and os.path.exists(self.part_path):
+            names = await loop.run_in_executor(None, self._recover_archive)
+        resume = names is not None
+        if resume:
+            done_titles: set[str] = {title for title in state['done'] if self._entry_name(title) in names}
+            archived_sha1s: dict[str, str] = {sha1: title for sha1, title in state['sha1s'].items()
+                                              if title in done_titles}
+        else:
+            done_titles, archived_sha1s = set(), {}
+        result = ExportResult(self.archive_path, resumed_from=len(done_titles))
+
+        session = get_http_session()
+        archive = await loop.run_in_executor(None, self._open_archive, resume)
+        # Files to download, and downloaded files to write; both bounded, so neither piles up
+        to_download: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        to_write: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+
+        async def save_checkpoint():
+            # Copied on the loop, as the other tasks carry on changing them while it's written
+            state = {'done': sorted(done_titles), 'sha1s': dict(archived_sha1s)}
+            await loop.run_in_executor(None, self.checkpoint.save, state)
+
+        async def list_files():
+            batches = self.iter_file_info_batches()
+            while (batch := await loop.run_in_executor(None, next, batches, None)) is not None:
+                for info in batch:
+                    title, sha1 = info['title'], info['sha1']
+                    if title in done_titles:
+                        continue
+                    if sha1 and sha1 in archived_sha1s:
+                        result.skipped_duplicates.append(f"{title} (same as {archived_sha1s[sha1]})")
+                        done_titles.add(title)
+                        continue
+                    await to_download.put(info)
+            for _ in range(self.concurrency):
+                await to_download.put(None)
+
+        async def download():
+            while (info := await to_download.get()) is not None:
+                spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+                try:
+                    async with session.get(info['url']) as response:
+                        response.raise_for_status()
+                        size = 0
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            spool.write(chunk)
+                            size += len(chunk)
+                except Exception as err:
+                    spool.close()
+                    logging.error(f"CategoryArchiveExporter: failed to download {info['title']}: {err}")
+                    result.failed.append(info['title'])
+                    continue
+                # Waits while the writer is behind, so finished downloads can't pile up
+                await to_write.put((info, spool, size))
+            await to_write.put(None)
+
+        async def write():
+            since_checkpoint = 0
+            downloaders = self.concurrency
+            while downloaders:
+                item = await to_write.get()
+                if item is None:
+                    downloaders -= 1
+                    continue
+                info, spool, size = item
+                title, sha1 = info['title'], info['sha1']
+                with spool:
+                    # Check again: an identical file may have been written while this one downloaded
+                    if sha1 and sha1 in archived_sha1s:
+                        result.skipped_duplicates.append(f"{title} (same as {archived_sha1s[sha1]})")
+                    else:
+                        writing = loop.run_in_executor(None, self._add_to_archive, archive,
+                                                       self._entry_name(title), spool, size)
+                        try:
+                            await writing
+                        except asyncio.CancelledError:
+                            # The write carries on in the executor; the spool and archive can't close under it
+                            await asyncio.wait([writing])
+                            raise
+                        if sha1:
+                            archived_sha1s[sha1] = title
+                        result.added += 1
+                done_titles.add(title)
+                since_checkpoint += 1
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    since_checkpoint = 0
+                    await save_checkpoint()
+
+        tasks = [asyncio.create_task(list_files()), asyncio.create_task(write())]
+        tasks += [asyncio.create_task(download()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            while not to_write.empty():
+                item = to_write.get_nowait()
+                if item is not None:
+                    item[1].close()
+            await loop.run_in_executor(None, archive.close)
+            await save_checkpoint()
+
+        os.replace(self.part_path, self.archive_path)
+        if not result.failed:
+            self.checkpoint.delete()
+        return result
@@ -0,0 +1,185 @@
+import ipaddress
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Hashable, Iterable, Optional
+
+from src.squidge.pwbsupport.recent_changes import RecentChangeEvent
+
+BUCKETS_PER_WINDOW = 12
+MAX_TRACKED_KEYS = 10000
+
+
+class RateWindow:
+    """
+    Counts events over a sliding window with a fixed ring of buckets, so memory is constant per key
+    and an update costs at most one pass over the ring (and usually touches one bucket).
+    The window slides a bucket at a time, so a count may include up to a bucket's width of older events.
+    """
+    __slots__ = ('bucket_seconds', 'counts', 'total', 'head', 'quiet_until')
+
+    def __init__(self, window: float, buckets: int = BUCKETS_PER_WINDOW):
+        self.bucket_seconds = window / buckets
+        self.counts = [0] * buckets
+        self.total = 0
+        # The absolute number of the newest bucket, i.e. time // bucket_seconds
+        self.head: Optional[int] = None
+        # Don't flag this key again before this time
+        self.quiet_until = 0.0
+
+    def _advance(self, now: float):
+        index = int(now // self.bucket_seconds)
+        if self.head is None:
+            self.head = index
+            return
+        # Events arriving out of order count towards the newest bucket
+        if index <= self.head:
+            return
+        size = len(self.counts)
+        for step in range(1, min(index - self.head, size) + 1):
+            slot = (self.head + step) % size
+            self.total -= self.counts[slot]
+            self.counts[slot] = 0
+        self.head = index
+
+    def add(self, now: float, count: int = 1) -> int:
+        """Count events at now and return the total in the window."""
+        self._advance(now)
+        self.counts[self.head % len(self.counts)] += count
+        self.total += count
+        return self.total
+
+    def count(self, now: float) -> int:
+        self._advance(now)
+        return self.total
+
+
+class RateCounters:
+    """RateWindows by key, keeping only the most recently used max_keys so memory stays bounded."""
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._windows: OrderedDict[Hashable, RateWindow] = OrderedDict()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def window(self, key: Hashable, seconds: float) -> RateWindow:
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = RateWindow(seconds)
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+        return window
+
+    def add(self, key: Hashable, seconds: float, now: float) -> int:
+        return self.window(key, seconds).add(now)
+
+    def clear(self):
+        self._windows.clear()
+
+
+def ip_range(user: str) -> Optional[str]:
+    """Return the range an anonymous (IP) editor is counted in: the /24 for IPv4, /64 for IPv6. None for accounts."""
+    try:
+        address = ipaddress.ip_address(user)
+    except ValueError:
+        return None
+    prefix = 24 if address.version == 4 else 64
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    # The event types (RecentChangeEvent.event_type) counted
+    events: tuple[str, ...]
+    max_count: int
+    # Seconds
+    window: float
+    # Counted per 'user', or per IP 'range' for anonymous editors
+    scope: str = 'user'
+
+
+DEFAULT_LIMITS = (
+    RateLimit('page creations', ('new',), 5, 60),
+    RateLimit('uploads', ('upload',), 5, 60),
+    RateLimit('edits', ('edit', 'new'), 20, 60),
+    RateLimit('page creations from one range', ('new',), 8, 60, scope='range'),
+    RateLimit('edits from one range', ('edit', 'new'), 30, 60, scope='range'),
+)
+
+
+@dataclass
+class RateAnomaly:
+    limit: RateLimit
+    # The user or IP range over the limit
+    key: str
+    count: int
+    # The event that went over the limit
+    event: RecentChangeEvent
+
+    def __str__(self):
+        return f"{self.key}: {self.count} {self.limit.name} in {self.limit.window:g}s"
+
+
+class EditRateDetector:
+    """
+    Flags users, and IP ranges of anonymous editors, that go over a rate limit such as page creations per minute.
+    Each key is flagged once per window, however long it stays over the limit, so a wave gives one alert per source.
+    """
+
+    def __init__(self, limits: Iterable[RateLimit] = DEFAULT_LIMITS, max_keys: int = MAX_TRACKED_KEYS):
+        self.limits = list(limits)
+        self.counters = RateCounters(max_keys)
+        self._by_type: dict[str, list[RateLimit]] = {}
+        for limit in self.limits:
+            for event_type in limit.events:
+                self._by_type.setdefault(event_type, []).append(limit)
+
+    def observe(self, event: RecentChangeEvent) -> list[RateAnomaly]:
+        limits = self._by_type.get(event.event_type)
+        if not limits:
+            return []
+        now = event.posix_time
+        anomalies = []
+        for limit in limits:
+            key = event.user if limit.scope == 'user' else ip_range(event.user)
+            if not key:
+                continue
+            window = self.counters.window((event.site_code, limit.name, key), limit.window)
+            count = window.add(now)
+            if count > limit.max_count and now >= window.quiet_until:
+                window.quiet_until = now + limit.window
+                anomalies.append(RateAnomaly(limit, key, count, event))
+        return anomalies
+
+
+@dataclass
+class ReplayResult:
+    events: int = 0
+    seconds: float = 0.0
+    anomalies: list[RateAnomaly] = field(default_factory=list)
+    tracked_keys: int = 0
+
+    def summary(self) -> str:
+        rate = self.events / self.seconds if self.seconds else 0
+        return (f"Replayed {self.events} event(s) in {self.seconds * 1000:.1f} ms ({rate:,.0f} events/s), "
+                f"{len(self.anomalies)} anomal{'y' if len(self.anomalies) == 1 else 'ies'}, "
+                f"{self.tracked_keys} key(s) tracked at the end.")
+
+
+def replay(events: Iterable[RecentChangeEvent], detector: Optional[EditRateDetector] = None) -> ReplayResult:
+    """Run recorded events through a detector (a fresh one by default), timing only the detection."""
+    detector = detector or EditRateDetector()
+    result = ReplayResult()
+    events = list(events)
+    start = time.perf_counter()
+    for event in events:
+        result.anomalies.extend(detector.observe(event))
+    result.seconds = time.perf_counter() - start
+    result.events = len(events)
+    result.tracked_keys = len(detector.counters)
+    return result
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import aiohttp
+
+from src.squidge.pwbsupport.http_pool import get_http_session
+from src.squidge.savedata.wiki_registry import WikiEntry
+
+# Seconds one wiki gets to answer, and the whole search gets before answering with what's in
+WIKI_TIMEOUT = 4.0
+SEARCH_DEADLINE = 6.0
+RESULTS_PER_WIKI = 5
+# Wikis searched at once
+SEARCH_CONCURRENCY = 24
+CACHE_TTL = 10 * 60
+CACHE_SIZE = 512
+# Failures in a row before a wiki is skipped, and for how long at first (doubling each time it fails again)
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 10 * 60
+BREAKER_MAX_COOLDOWN = 6 * 60 * 60
+
+
+@dataclass
+class SearchHit:
+    wiki: WikiEntry
+    title: str
+    url: str
+    # Position in the wiki's own results, from 0
+    rank: int
+    score: float = 0.0
+
+
+@dataclass
+class FederatedResult:
+    hits: list[SearchHit] = field(default_factory=list)
+    answered: list[str] = field(default_factory=list)
+    cached: list[str] = field(default_factory=list)
+    timed_out: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    # Wikis not asked because their circuit breaker is open
+    skipped: list[str] = field(default_factory=list)
+    # Wikis still waiting for a free slot at the deadline, so never asked
+    not_reached: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        parts = [f"{len(self.answered) + len(self.cached)} wiki(s) answered ({len(self.cached)} from cache)"]
+        if self.timed_out:
+            parts.append(f"{len(self.timed_out)} too slow")
+        if self.failed:
+            parts.append(f"{len(self.failed)} failed")
+        if self.skipped:
+            parts.append(f"{len(self.skipped)} skipped as down")
+        if self.not_reached:
+            parts.append(f"{len(self.not_reached)} not reached in time")
+        return ', '.join(parts)
+
+
+class CircuitBreaker:
+    """Stops asking a wiki that keeps failing, for a cooldown that doubles each time it fails again after one."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._failures: dict[str, int] = {}
+        self._open_until: dict[str, float] = {}
+        self._next_cooldown: dict[str, float] = {}
+
+    def allows(self, key: str) -> bool:
+        # Once the cooldown is over, the next search is the trial
+        return time.monotonic() >= self._open_until.get(key, 0.0)
+
+    def record_success(self, key: str):
+        self._failures.pop(key, None)
+        self._open_until.pop(key, None)
+        self._next_cooldown.pop(key, None)
+
+    def record_failure(self, key: str):
+        failures = self._failures[key] = self._failures.get(key, 0) + 1
+        if failures >= self.threshold:
+            cooldown = self._next_cooldown.get(key, self.cooldown)
+            self._open_until[key] = time.monotonic() + cooldown
+            self._next_cooldown[key] = min(cooldown * 2, self.max_cooldown)
+            logging.info(f"CircuitBreaker: skipping {key} for {cooldown:g}s after {failures} failures.")
+
+    @property
+    def open(self) -> list[str]:
+        now = time.monotonic()
+        return [key for key, until in self._open_until.items() if until > now]
+
+
+def _normalise_query(query: str) -> str:
+    return ' '.join(query.casefold().split())
+
+
+class FederatedSearch:
+    """
+    Searches many MediaWikis at once with generator=search, through the shared aiohttp session.
+
+    Every wiki gets WIKI_TIMEOUT seconds from when its request is sent, and the search as a whole answers after
+    SEARCH_DEADLINE seconds with the wikis that answered, so a slow wiki can't hold up the rest.
+    Wikis still waiting for one of the concurrent slots at the deadline weren't asked, so aren't counted as failing. Each wiki's results are cached per query,
+    and wikis that keep failing are skipped for a while by a CircuitBreaker.
+    Results are merged by their rank on their own wiki, with titles matching the query first.
+    """
+
+    def __init__(self, wiki_timeout: float = WIKI_TIMEOUT, deadline: float = SEARCH_DEADLINE,
+                 results_per_wiki: int = RESULTS_PER_WIKI, concurrency: int = SEARCH_CONCURRENCY):
+        self.wiki_timeout = aiohttp.ClientTimeout(total=wiki_timeout)
+        self.deadline = deadline
+        self.results_per_wiki = results_per_wiki
+        self.breaker = CircuitBreaker()
+        self._limit = asyncio.Semaphore(concurrency)
+        # (wiki key, query) to (time.monotonic() fetched, hits)
+        self._cache: OrderedDict[tuple[str, str], tuple[float, list[SearchHit]]] = OrderedDict()
+
+    def _cached(self, key: tuple[str, str]) -> Optional[list[SearchHit]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        fetched, hits = entry
+        if time.monotonic() - fetched > CACHE_TTL:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return hits
+
+    def _store(self, key: tuple[str, str], hits: list[SearchHit]):
+        self._cache[key] = (time.monotonic(), hits)
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _search_wiki(self, wiki: WikiEntry, query: str, sent: set[str]) -> list[SearchHit]:
+        """Search one wiki, adding its key to sent once it has a slot and its request goes out."""
+        params = {
+            'action': 'query', 'format': 'json', 'formatversion': '2',
+            'generator': 'search', 'gsrsearch': query, 'gsrlimit': str(self.results_per_wiki),
+            'gsrnamespace': '0', 'prop': 'info', 'inprop': 'url',
+        }
+        async with self._limit:
+            sent.add(wiki.key)
+            async with get_http_session().get(wiki.api, params=params, timeout=self.wiki_timeout) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        if not isinstance(data, dict):
+            raise ValueError(f"unexpected response: {type(data).__name__}")
+        if 'error' in data:
+            error = data['error']
+            raise ValueError(error.get('info', error) if isinstance(error, dict) else error)
+        pages = (data.get('query') or {}).get('pages') or []
+        try:
+            return [SearchHit(wiki=wiki, title=page['title'], url=page.get('fullurl', ''),
+                              rank=int(page.get('index', 1)) - 1)
+                    for page in pages]
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            raise ValueError(f"unexpected search results: {err!r}") from err
+
+    def _settle(self, wiki: WikiEntry, normalised: str, task: asyncio.Task) -> Optional[list[SearchHit]]:
+        """Record a finished wiki search with its circuit breaker and the cache. Returns its hits, or None."""
+        if task.cancelled():
+            return None
+        err = task.exception()
+        if err is not None:
+            logging.info(f"FederatedSearch: {wiki.key} failed: {err!r}")
+            self.breaker.record_failure(wiki.key)
+            return None
+        self.breaker.record_success(wiki.key)
+        self._store((wiki.key, normalised), task.result())
+        return task.result()
+
+    async def search(self, wikis: Iterable[WikiEntry], query: str) -> FederatedResult:
+        result = FederatedResult()
+        normalised = _normalise_query(query)
+        tasks: dict[asyncio.Task, WikiEntry] = {}
+        # Keys of the wikis whose request was sent, so had the chance to fail
+        sent: set[str] = set()
+        for wiki in wikis:
+            hits = self._cached((wiki.key, normalised))
+            if hits is not None:
+                result.cached.append(wiki.key)
+                result.hits.extend(hits)
+            elif not self.breaker.allows(wiki.key):
+                result.skipped.append(wiki.key)
+            else:
+                tasks[asyncio.create_task(self._search_wiki(wiki, query, sent))] = wiki
+
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            for task in pending:
+                key = tasks[task].key
+                if key in sent:
+                    # Left to finish within its own timeout, so its answer is cached for next time
+                    # and it's only counted as failing if it really fails
+                    result.timed_out.append(key)
+                    task.add_done_callback(lambda t, wiki=tasks[task]: self._settle(wiki, normalised, t))
+                else:
+                    task.cancel()
+                    result.not_reached.append(key)
+            for task in done:
+                wiki = tasks[task]
+                hits = self._settle(wiki, normalised, task)
+                if hits is None:
+                    (result.timed_out if isinstance(task.exception(), asyncio.TimeoutError)
+                     else result.failed).append(wiki.key)
+                    continue
+                result.answered.append(wiki.key)
+                result.hits.extend(hits)
+
+        for hit in result.hits:
+            # Reciprocal rank, with a title that is the query counting as a top result
+            hit.score = 1 / (hit.rank + 1) + (1.0 if _normalise_query(hit.title) == normalised else 0.0)
+        result.hits.sort(key=lambda hit: (-hit.score, hit.wiki.name, hit.title))
+        return result
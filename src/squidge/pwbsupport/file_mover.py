@@ -0,0 +1,209 @@
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from pywikibot import Page, Site
+from pywikibot.site._namespace import BuiltinNamespace
+
+from src.squidge.pwbsupport.helpers import query_with_continue
+
+QUERY_BATCH_SIZE = 50
+FILE_NAMESPACE_ALIASES = r'(?:[Ff]ile|[Ii]mage|[Mm]edia)'
+# Template parameters whose value is a bare file name, e.g. {{Infobox|image=Name.png}}, with an optional number
+IMAGE_PARAMETER_REGEX = re.compile(
+    r'(?:image|img|icon|file|logo|picture|photo|screenshot|cover|artwork|sprite|map)[ _]?\d*', re.IGNORECASE)
+GALLERY_REGEX = re.compile(r'<gallery\b[^>]*>.*?</gallery\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def normalise_file_name(name: str) -> str:
+    """Return a file name (without namespace) as MediaWiki would title it."""
+    name = re.sub(r'[ _]+', ' ', name).strip()
+    return name[:1].upper() + name[1:]
+
+
+def _name_pattern(name: str) -> str:
+    """Return a regex that matches the name as it may be written in wikitext."""
+    first, rest = name[:1], name[1:]
+    first_pattern = f"[{re.escape(first.upper())}{re.escape(first.lower())}]" if first.isalpha() else re.escape(first)
+    return first_pattern + '[ _]+'.join(re.escape(part) for part in rest.split(' '))
+
+
+@dataclass
+class FileMovePlan:
+    # Old file title (with namespace) to new file title, in the order to move them
+    moves: dict[str, str] = field(default_factory=dict)
+    # Lines describing renames that can't be done
+    problems: list[str] = field(default_factory=list)
+    # Title of each page using any of the files, to the old file titles it uses
+    usages: dict[str, set[str]] = field(default_factory=lambda: defaultdict(set))
+
+
+@dataclass
+class PageRewrite:
+    page: Page
+    text: str
+    # File references rewritten
+    count: int
+    # Bare old names found where they may not be a file (e.g. a caption or piped link text), left as they are
+    needs_review: list[str] = field(default_factory=list)
+
+
+class BulkFileMover:
+    """
+    Renames many files at once and rewrites the pages that use them.
+
+    Usages of every file are found with one fileusage query per 50 files,
+    and each using page is fetched, rewritten for all the renames that touch it, and saved once.
+    A single compiled pattern covers all the old names, so rewriting a page is one pass over its text.
+
+    Names with a File: (or Image:, Media:) prefix are always rewritten. Bare names are only rewritten as
+    lines of a <gallery> or as the value of an image parameter (see IMAGE_PARAMETER_REGEX); anywhere else,
+    such as |caption=Name.png or [[Page|Name.png]], they're left alone and reported as needing review.
+    Renames may chain (A->B with B->C, which is moved first), but not share a target or form a loop.
+    """
+
+    def __init__(self, site: Site, renames: dict[str, str]):
+        self.site = site
+        self.renames = {self._file_title(old): self._file_title(new) for old, new in renames.items()}
+        self._new_names = {normalise_file_name(old.split(':', 1)[1]): new.split(':', 1)[1]
+                           for old, new in self.renames.items()}
+        alternatives = '|'.join(_name_pattern(name)
+                                for name in sorted(self._new_names, key=len, reverse=True))
+        # File:Name, a bare name as a template parameter value, at the start of a line, or after | or =.
+        # One pattern, so a page is rewritten in a single pass and chained renames (A->B, B->C) don't cascade.
+        self._name_regex = re.compile(
+            rf'(?P<prefix>(?P<namespace>{FILE_NAMESPACE_ALIASES}\s*:\s*)'
+            rf'|\|\s*(?P<parameter>[^|=\[\]{{}}\n]*?)\s*=[ \t]*'
+            rf'|(?P<line_start>^)[ \t]*'
+            rf'|[=|][ \t]*)'
+            rf'(?P<name>{alternatives})(?=\s*[|\]}}\n]|$)',
+            re.MULTILINE)
+
+    def _file_title(self, title: str) -> str:
+        return Page(self.site, title.strip(), ns=BuiltinNamespace.FILE).title()
+
+    @staticmethod
+    def _is_file_reference(match: re.Match, galleries: list[tuple[int, int]]) -> bool:
+        if match['namespace'] is not None:
+            return True
+        if match['parameter'] is not None:
+            return IMAGE_PARAMETER_REGEX.fullmatch(match['parameter']) is not None
+        if match['line_start'] is not None:
+            return any(start <= match.start() < end for start, end in galleries)
+        return False
+
+    def rewrite_text(self, text: str) -> tuple[str, int, list[str]]:
+        """
+        Return the text with every old file reference replaced, the number of replacements,
+        and the bare old names left alone as they may not be files.
+        """
+        galleries = [gallery.span() for gallery in GALLERY_REGEX.finditer(text)]
+        count = 0
+        needs_review = []
+
+        def replace(match: re.Match) -> str:
+            nonlocal count
+            if not self._is_file_reference(match, galleries):
+                needs_review.append(match.group().strip())
+                return match.group()
+            count += 1
+            return match['prefix'] + self._new_names[normalise_file_name(match['name'])]
+
+        return self._name_regex.sub(replace, text), count, needs_review
+
+    def _batches(self, titles: list[str]) -> Iterator[list[str]]:
+        for i in range(0, len(titles), QUERY_BATCH_SIZE):
+            yield titles[i:i + QUERY_BATCH_SIZE]
+
+    def plan(self) -> FileMovePlan:
+        """Validate the renames and find every page that uses the files."""
+        result = FileMovePlan()
+        sources = list(self.renames)
+        targets = list(self.renames.values())
+
+        existing_targets = set()
+        for batch in self._batches(targets):
+            for data in query_with_continue(self.site, action='query', prop='info', titles='|'.join(batch)):
+                for page in data.get('query', {}).get('pages', {}).values():
+                    if 'missing' not in page:
+                        existing_targets.add(page['title'])
+
+        # Old title to new title of every rename whose file exists, before checking the targets
+        candidates: dict[str, str] = {}
+        checked = set()
+        for batch in self._batches(sources):
+            for data in query_with_continue(self.site, action='query', prop='info|fileusage',
+                                            fulimit='max', titles='|'.join(batch)):
+                for page in data.get('query', {}).get('pages', {}).values():
+                    title = page['title']
+                    # Continued responses repeat the pages with the next slice of their usages
+                    if title in candidates:
+                        for usage in page.get('fileusage', []):
+                            result.usages[usage['title']].add(title)
+                        continue
+                    if title in checked:
+                        continue
+                    checked.add(title)
+                    if 'missing' in page:
+                        result.problems.append(f"{title}: does not exist")
+                        continue
+                    candidates[title] = self.renames[title]
+                    for usage in page.get('fileusage', []):
+                        result.usages[usage['title']].add(title)
+
+        target_counts = Counter(candidates.values())
+        for title, target in list(candidates.items()):
+            if target_counts[target] > 1:
+                result.problems.append(f"{title}: target {target} is also the target of another rename")
+                del candidates[title]
+
+        # Each file now has at most one rename into it, so a loop can only be entered from within itself
+        for title in list(candidates):
+            current = candidates.get(title)
+            while current in candidates and current != title:
+                current = candidates[current]
+            if current == title:
+                loop = [title]
+                while candidates[loop[-1]] != title:
+                    loop.append(candidates[loop[-1]])
+                for looped in loop:
+                    result.problems.append(f"{looped}: renames {' -> '.join(loop + [title])} form a loop")
+                    del candidates[looped]
+
+        # An existing target is only free once its own file is moved away, which may itself be blocked
+        blocked = True
+        while blocked:
+            blocked = False
+            for title, target in list(candidates.items()):
+                if target in existing_targets and target not in candidates:
+                    result.problems.append(f"{title}: target {target} already exists")
+                    del candidates[title]
+                    blocked = True
+
+        # Move along each chain from its end, so A->B only runs after B->C has freed B
+        for title in candidates:
+            chain = []
+            current = title
+            while current in candidates and current not in result.moves:
+                chain.append(current)
+                current = candidates[current]
+            for old_title in reversed(chain):
+                result.moves[old_title] = candidates[old_title]
+
+        # Only rewrite for the files that will actually move
+        for title in list(result.usages):
+            result.usages[title] &= result.moves.keys()
+            if not result.usages[title]:
+                del result.usages[title]
+        return result
+
+    def preview_rewrites(self, plan: FileMovePlan) -> Iterator[PageRewrite]:
+        """Yield the rewrite of every using page, fetched 50 at a time."""
+        pages = [Page(self.site, title) for title in sorted(plan.usages)]
+        for page in self.site.preloadpages(pages):
+            new_text, count, needs_review = self.rewrite_text(page.text)
+            if count == 0:
+                logging.info(f"BulkFileMover: {page.title()} uses a moved file but no link could be rewritten.")
+            yield PageRewrite(page, new_text, count, needs_review)
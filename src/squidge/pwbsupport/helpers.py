@@ -1,8 +1,9 @@
+import logging
 from typing import Optional, Union
 
-from pywikibot import Site
+from pywikibot import Page, Site
 from pywikibot.data import api
-from pywikibot.exceptions import PageRelatedError
+from pywikibot.exceptions import Error, PageRelatedError
 
 
 def get_all_users_generator(
@@ -92,3 +93,35 @@ def try_get_user_from_revision(revision):
         return revision.userName()
     except PageRelatedError:
         return None
+
+
+def try_delete_page(page: Page, delete_summary: str) -> bool:
+    """Delete the page, logging why if it wasn't. Returns whether it was deleted."""
+    try:
+        deleted = page.delete(reason=delete_summary, prompt=False)
+    except Error as err:
+        logging.error(f"Failed to delete {page} because a wiki exception occurred: {err}.", exc_info=err)
+        return False
+
+    if deleted == 1:
+        return True
+    else:
+        #  0 = no action was done
+        # -1 = marked for deletion instead
+        logging.error(f"Failed to delete {page} (delete returned {deleted}).")
+        return False
+
+
+def query_with_continue(site: Site, **parameters):
+    """Submit an API request and yield each response, following the continuation until the end.
+
+    :param site: Wiki site object
+    :param parameters: The API parameters, e.g. action='query', prop='info', titles='A|B'
+    """
+    continue_params = {}
+    while True:
+        data = site.simple_request(**parameters, **continue_params).submit()
+        yield data
+        if 'continue' not in data:
+            break
+        continue_params = data['continue']
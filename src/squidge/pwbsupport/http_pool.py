@@ -0,0 +1,27 @@
+from typing import Optional
+
+import aiohttp
+
+USER_AGENT = "SquidgeBot (https://github.com/kjhf/squidge)"
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the process-wide aiohttp session.
+    Its connector keeps connections alive and pools them per host, so repeat requests to a wiki reuse the same sockets.
+    Must be called from within the running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=64, limit_per_host=8, ttl_dns_cache=300)
+        _session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+    return _session
+
+
+async def close_http_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -298,6 +298,19 @@ The following arguments influence how many pages the bot works on at once:
                    interwiki_min_subjects
 
     -query:        The maximum number of pages that the bot will load at once.
+                   Default value is 50. This is the starting size; the bot
+                   grows or shrinks it with the server's response times.
+
+    -querylimit:   The largest number of pages the bot may grow a query to.
+                   Default value is 200.
+
+    -maxopen:      The most subjects the bot keeps in memory at once. New
+                   pages are not taken from the generator above this.
+                   Default value is 500.
+
+    -commitbatch:  Hold the changes of finished pages until this many pages
+                   are to be changed, then load them again in bulk and make
+                   the changes. 0 makes each page's changes as it finishes.
                    Default value is 50.
 
 Some configuration option can be used to change the working of this bot:
@@ -336,7 +349,9 @@ import asyncio
 import codecs
 import os
 import re
+import shutil
 import sys
+import time
 from collections import Counter, defaultdict
 from contextlib import suppress
 from textwrap import fill
@@ -355,6 +370,7 @@ from pywikibot.backports import Iterable
 from pywikibot.bot import ListOption, OptionHandler, StandardOption
 from pywikibot.cosmetic_changes import moved_links
 from pywikibot.exceptions import (
+    APIError,
     EditConflictError,
     Error,
     InvalidTitleError,
@@ -366,6 +382,7 @@ from pywikibot.exceptions import (
     ServerError,
     SiteDefinitionError,
     SpamblacklistError,
+    TimeoutError,
     UnknownSiteError,
 )
 from pywikibot.tools import first_upper
@@ -429,6 +446,16 @@ class InterwikiBotConfig:
     cleanup = False
     remove = []
     maxquerysize = 50
+    maxquerysizelimit = 200
+    maxopensubjects = 500
+    commitbatch = 50
+    # If set, changes are reported to this instead of being saved. It needs
+    # record_edit(page, old, new, adding, removing, modifying, summary)
+    # and record_conflict(page, problems) methods.
+    dryrun = None
+    # If set, called with each page taken from the generator to return
+    # extra hints for it, as a list of 'code:Title' strings
+    hintsource = None
     same = False
     skip = set()
     skipauto = False
@@ -537,6 +564,12 @@ class InterwikiBotConfig:
             self.minsubjects = int(value)
         elif arg == 'query' and value.isdigit():
             self.maxquerysize = int(value)
+        elif arg == 'querylimit' and value.isdigit():
+            self.maxquerysizelimit = int(value)
+        elif arg == 'maxopen' and value.isdigit():
+            self.maxopensubjects = int(value)
+        elif arg == 'commitbatch' and value.isdigit():
+            self.commitbatch = int(value)
         elif arg == 'back':
             self.nobackonly = True
         elif arg == 'async':
@@ -657,6 +690,10 @@ class Subject(interwiki_graph.Subject):
         self.hintsAsked = False
         self.forcedStop = False
         self.workonme = True
+        # The interned (site, title) key InterwikiBot files this subject under
+        self.key = None
+        # The problems reported while resolving this subject
+        self.problems = []
 
     def getFoundDisambig(self, site):
         """
@@ -1295,6 +1332,18 @@ class Subject(interwiki_graph.Subject):
             self.reportInterwikilessPage(page)
         self.askForHints(counter)
 
+    def batchFailed(self) -> None:
+        """
+        Notify that the promised batch of pages could not be loaded.
+
+        The pages in self.pending are put back on the todo list, so that
+        they are promised again in a later batch. The counts were not
+        reduced when the batch was taken, so the counter is left alone.
+        """
+        for page in self.pending:
+            self.todo.append(page)
+        self.pending.clear()
+
     def isDone(self):
         """Return True if all the work for this subject has completed."""
         return not self.todo
@@ -1302,6 +1351,7 @@ class Subject(interwiki_graph.Subject):
     def problem(self, txt, createneed: bool = True) -> None:
         """Report a problem with the resolution of this subject."""
         pywikibot.error(txt)
+        self.problems.append(txt)
         self.confirm = True
         if createneed:
             self.problemfound = True
@@ -1415,12 +1465,15 @@ class Subject(interwiki_graph.Subject):
 
         return result
 
-    def finish(self):
+    def finish(self, defer: bool = False):
         """
         Round up the subject, making any necessary changes.
 
         This should be called exactly once after the todo list has gone empty.
 
+        :param defer: if True, don't make the changes but return them, so
+            that they can be committed in bulk with commit()
+        :return: the new links by site, if deferred and there are any
         """
         if not self.isDone():
             raise Exception('Bugcheck: finish called before done')
@@ -1430,27 +1483,35 @@ class Subject(interwiki_graph.Subject):
         #     return
 
         if self.origin.isRedirectPage() or self.origin.isCategoryRedirect():
-            return
+            return None
 
         if not self.untranslated and self.conf.untranslatedonly:
-            return
+            return None
 
         if self.forcedStop:  # autonomous with problem
             pywikibot.output('======Aborted processing {}======'
                              .format(self.origin))
-            return
+            if self.conf.dryrun is not None:
+                self.conf.dryrun.record_conflict(
+                    self.origin, self.problems or ['Stopped on an auto entry'])
+            return None
+
+        return self.post_processing(defer)
 
-        self.post_processing()
+    def post_processing(self, defer: bool = False):
+        """Some finishing processes to be done.
 
-    def post_processing(self):
-        """Some finishing processes to be done."""
+        :param defer: if True, return the new links instead of committing
+        """
         pywikibot.output('======Post-processing {}======'.format(self.origin))
         # Assemble list of accepted interwiki links
         new = self.assemble()
         if new is None:  # User said give up
             pywikibot.output('======Aborted processing {}======'
                              .format(self.origin))
-            return
+            if self.conf.dryrun is not None:
+                self.conf.dryrun.record_conflict(self.origin, self.problems)
+            return None
 
         # Make sure new contains every page link, including the page we are
         # processing
@@ -1461,6 +1522,26 @@ class Subject(interwiki_graph.Subject):
            and not self.origin.site.family.interwiki_forward:
             new[self.origin.site] = self.origin
 
+        if defer:
+            # The commit loads the pages again in bulk, so none of the text
+            # is needed until then
+            for page in self.done:
+                drop_page_text(page)
+            return new
+
+        # Only the pages that may be edited need their text from here on
+        keep = set(new.values()) | {self.origin}
+        for page in self.done:
+            if page not in keep:
+                drop_page_text(page)
+        self.commit(new)
+        return None
+
+    def commit(self, new) -> None:
+        """Make the changes to the pages in new and report back links.
+
+        :param new: the new links by site, as returned by a deferred finish
+        """
         updatedSites = []
         # Process all languages here
         self.conf.always = False
@@ -1472,6 +1553,8 @@ class Subject(interwiki_graph.Subject):
         # don't report backlinks for pages we already changed
         if config.interwiki_backlink:
             self.reportBacklinks(new, updatedSites)
+        for page in set(new.values()) | {self.origin}:
+            drop_page_text(page)
 
     def process_limit_two(self, new, updated):
         """Post process limittwo."""
@@ -1713,10 +1796,17 @@ class Subject(interwiki_graph.Subject):
 
         # If we got permission to submit, do so
         if answer != 'y':
+            if self.conf.dryrun is not None:
+                self.conf.dryrun.record_conflict(page, self.problems)
             raise LinkMustBeRemoved(
                 'Found incorrect link to {} in {}'
                 .format(', '.join(x.code for x in removing), page))
 
+        if self.conf.dryrun is not None:
+            self.conf.dryrun.record_edit(page, old, new, adding, removing,
+                                         modifying, mcomment)
+            return True
+
         self.conf.note('Updating live wiki...')
         timeout = 60
         page.text = newtext
@@ -1824,6 +1914,168 @@ class Subject(interwiki_graph.Subject):
                                               page, linkedPage))
 
 
+def drop_page_text(page) -> None:
+    """Forget a page's loaded text, keeping its info, langlinks and props.
+
+    It will be fetched again if anything asks for it.
+    """
+    with suppress(AttributeError):
+        del page.text
+    page._revisions.clear()
+
+
+def subject_key(page) -> tuple:
+    """Return the interned (site, title) key of a page."""
+    return page.site, sys.intern(page.title())
+
+
+class InterwikiCommitQueue:
+
+    """
+    Collects the link changes of finished subjects and commits them in bulk.
+
+    Before committing, every page involved is loaded again with one
+    preload (revisions, info, templates and langlinks) per 50 pages per
+    site. The
+    changes are then checked against that fresh text and those fresh
+    links. replaceLinks and reportBacklinks read them from the pages'
+    cache, so they make no further queries. Subjects are committed one
+    at a time off the event loop, and each save is spaced by pywikibot's
+    put_throttle.
+    """
+
+    def __init__(self, flush_at: int = 50) -> None:
+        """Initializer.
+
+        :param flush_at: the number of planned pages at which the queue
+            should be committed
+        """
+        self.flush_at = flush_at
+        self.plans = []
+
+    def add(self, subject, new) -> None:
+        """Queue a finished subject with the new links by site."""
+        self.plans.append((subject, new))
+
+    @property
+    def full(self) -> bool:
+        """Return whether enough pages are planned to be committed."""
+        return sum(len(new) for _, new in self.plans) >= self.flush_at
+
+    @property
+    def origins(self):
+        """Return generator of the origin pages still to be committed."""
+        return (subject.origin for subject, _ in self.plans)
+
+    @staticmethod
+    def preload(plans) -> None:
+        """Load every page in the plans again, 50 at a time per site."""
+        by_site = defaultdict(dict)
+        for _, new in plans:
+            for site, page in new.items():
+                if not page.section():
+                    by_site[site][page] = None
+        for site, pages in by_site.items():
+            for _ in site.preloadpages(list(pages), groupsize=50,
+                                       templates=True, langlinks=True):
+                pass
+
+    async def flush(self) -> None:
+        """Commit all the queued subjects."""
+        if not self.plans:
+            return
+        plans = self.plans
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.preload, plans)
+        while plans:
+            subject, new = plans[0]
+            try:
+                await loop.run_in_executor(None, subject.commit, new)
+            except Exception:
+                pywikibot.exception()
+            # Only drop it once done, so a checkpoint still has it until then
+            plans.pop(0)
+
+
+class AdaptiveBatchController:
+
+    """
+    Sizes InterwikiBot's queries to what the server can take.
+
+    The batch grows by a fixed step after each query that came back
+    within the target latency and below the lag limit, and halves when
+    a query is slow, the replicas lag, or the server refuses or fails
+    it. After a refusal, the next query also waits for a cool-down that
+    doubles with each consecutive failure.
+    """
+
+    #: API error codes that mean the server wants us to slow down
+    BACKOFF_CODES = {'maxlag', 'ratelimited', 'readonly'}
+
+    def __init__(self, size: int, min_size: int = 5, max_size: int = 200,
+                 target_latency: float = 5.0, max_lag: float = 5.0,
+                 step: int = 5) -> None:
+        """Initializer.
+
+        :param size: the batch size to start at
+        :param min_size: the smallest batch to shrink to
+        :param max_size: the largest batch to grow to
+        :param target_latency: seconds a query may take and still count
+            as healthy
+        :param max_lag: seconds of replication lag to tolerate
+        :param step: number of pages to grow by after a healthy query
+        """
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.size = min(max(size, self.min_size), self.max_size)
+        self.target_latency = target_latency
+        self.max_lag = max_lag
+        self.step = step
+        self.failures = 0
+        self._resume_at = 0.0
+
+    def is_backoff_error(self, error: Exception) -> bool:
+        """Return whether the error means the server is overloaded."""
+        if isinstance(error, (ServerError, TimeoutError)):
+            return True
+        return isinstance(error, APIError) \
+            and error.code in self.BACKOFF_CODES
+
+    def _shrink(self) -> None:
+        self.size = max(self.min_size, self.size // 2)
+
+    def record_success(self, pages: int, latency: float,
+                       lag: Optional[float] = None) -> None:
+        """Record a query of the given number of pages.
+
+        :param pages: the number of pages that were loaded
+        :param latency: seconds the query took
+        :param lag: the replication lag last seen, if known
+        """
+        self.failures = 0
+        if latency > self.target_latency \
+           or (lag is not None and lag > self.max_lag):
+            self._shrink()
+        elif pages >= self.size:
+            # Only grow when the whole batch was used, otherwise the
+            # latency says nothing about a bigger one
+            self.size = min(self.max_size, self.size + self.step)
+
+    def record_failure(self) -> None:
+        """Record a query that the server refused or failed."""
+        self.failures += 1
+        self._shrink()
+        cooldown = min(300, 5 * 2 ** (self.failures - 1))
+        self._resume_at = time.monotonic() + cooldown
+        pywikibot.warning('Server is struggling; batch size is now {}, '
+                          'waiting {} seconds.'.format(self.size, cooldown))
+
+    @property
+    def delay(self) -> float:
+        """Return the seconds to wait before the next query."""
+        return max(0.0, self._resume_at - time.monotonic())
+
+
 class InterwikiBot:
 
     """
@@ -1834,7 +2086,18 @@ class InterwikiBot:
 
     def __init__(self, conf=None) -> None:
         """Initializer."""
-        self.subjects = []
+        # The open subjects by their key, in the order they were added
+        self.subjects = {}
+        # Per site, the subjects that may have pages to load from it, in the
+        # order they were queued. Entries may be stale, which costs one
+        # empty whatsNextPageBatch call when they reach the front.
+        self.queues = defaultdict(dict)
+        # Subjects that changed since the last queryStep, so only those
+        # need to be checked for being done
+        self.touched = []
+        # Finished subjects whose changes are yet to be made
+        self.commits = InterwikiCommitQueue(conf.commitbatch) \
+            if conf and conf.commitbatch else None
         # We count how many pages still need to be loaded per site.
         # This allows us to find out from which site to retrieve pages next
         # in a way that saves bandwidth.
@@ -1843,16 +2106,42 @@ class InterwikiBot:
         self.counts = Counter()
         self.pageGenerator = None
         self.generated = 0
+        # The most recent page taken from the generator, kept so a dump can continue after it
+        self.last_generated = None
         self.conf = conf
         self.site = pywikibot.Site()
+        conf = conf or InterwikiBotConfig()
+        self.batch = AdaptiveBatchController(
+            conf.maxquerysize, max_size=conf.maxquerysizelimit)
+        # Replication lag, refreshed every few queries while it matters
+        self.lag = None
+        self.queries = 0
 
     def add(self, page, hints=None) -> None:
         """Add a single subject to the list."""
+        if page and subject_key(page) in self.subjects:
+            pywikibot.output('Skipping: {} is already being worked on'
+                             .format(page))
+            return
         subj = Subject(page, hints=hints, conf=self.conf)
-        self.subjects.append(subj)
+        subj.key = subject_key(page) if page else (None, str(id(subj)))
+        self.subjects[subj.key] = subj
         for site, count in subj.openSites():
             # Keep correct counters
             self.plus(site, count)
+        self.enqueue(subj)
+        self.touched.append(subj)
+
+    def enqueue(self, subject) -> None:
+        """Queue the subject on every site it still has pages to load from."""
+        for site, _ in subject.openSites():
+            self.queues[site][subject] = None
+
+    def remove(self, subject) -> None:
+        """Forget a finished subject."""
+        del self.subjects[subject.key]
+        for queue in self.queues.values():
+            queue.pop(subject, None)
 
     def setPageGenerator(self, pageGenerator, number=None, until=None) -> None:
         """
@@ -1867,8 +2156,23 @@ class InterwikiBot:
 
     @property
     def dump_titles(self):
-        """Return generator of titles for dump file."""
-        return (s.origin.title(as_link=True) for s in self.subjects)
+        """Return generator of titles for dump file.
+
+        The unfinished subjects and the origins still waiting to be committed
+        come first, and the last generated page always comes last, whether or
+        not it is done, so that continuing from the dump picks up after the
+        generator's position.
+        """
+        last = (self.last_generated.title(as_link=True)
+                if self.last_generated is not None else None)
+        titles = [s.origin.title(as_link=True)
+                  for s in self.subjects.values() if s.origin]
+        if self.commits is not None:
+            titles += [page.title(as_link=True)
+                       for page in self.commits.origins]
+        yield from (title for title in dict.fromkeys(titles) if title != last)
+        if last is not None:
+            yield last
 
     def generateMore(self, number) -> None:
         """Generate more subjects.
@@ -1927,7 +2231,11 @@ class InterwikiBot:
                 if page.title(with_ns=False) > until:
                     break
 
-            self.add(page, hints=self.conf.hints)
+            hints = self.conf.hints
+            if self.conf.hintsource is not None:
+                hints = hints + self.conf.hintsource(page)
+            self.add(page, hints=hints)
+            self.last_generated = page
             self.generated += 1
             if self.generateNumber and self.generated >= self.generateNumber:
                 break
@@ -1938,7 +2246,7 @@ class InterwikiBot:
 
     def firstSubject(self) -> Optional[Subject]:
         """Return the first subject that is still being worked on."""
-        return self.subjects[0] if self.subjects else None
+        return next(iter(self.subjects.values()), None)
 
     def maxOpenSite(self):
         """
@@ -1972,13 +2280,18 @@ class InterwikiBot:
         # Do we still have enough subjects to work on for which the
         # home language has been retrieved? This is rough, because
         # some subjects may need to retrieve a second home-language page!
-        if len(self.subjects) - mycount < self.conf.minsubjects:
+        # Keep enough subjects around to fill a batch of the current size
+        minsubjects = max(self.conf.minsubjects, self.batch.size)
+        if len(self.subjects) - mycount < minsubjects:
             # Can we make more home-language queries by adding subjects?
-            if self.pageGenerator and mycount < self.conf.maxquerysize:
+            # Don't open more subjects than we are allowed to hold
+            room = self.conf.maxopensubjects - len(self.subjects)
+            wanted = min(self.batch.size - mycount, room)
+            if self.pageGenerator and wanted > 0:
                 timeout = 60
                 while timeout < 3600:
                     try:
-                        self.generateMore(self.conf.maxquerysize - mycount)
+                        self.generateMore(wanted)
                     except ServerError:
                         # Could not extract allpages special page?
                         pywikibot.error('could not retrieve more pages. '
@@ -2010,44 +2323,88 @@ class InterwikiBot:
         # Now assemble a reasonable list of pages to get
         subjectGroup = []
         pageGroup = []
-        for subject in self.subjects:
+        queue = self.queues[site]
+        while queue and len(pageGroup) < self.batch.size:
+            subject = next(iter(queue))
+            del queue[subject]
             # Promise the subject that we will work on the site.
             # We will get a list of pages we can do.
             pages = subject.whatsNextPageBatch(site)
             if pages:
                 pageGroup.extend(pages)
                 subjectGroup.append(subject)
-                if len(pageGroup) >= self.conf.maxquerysize:
-                    # We have found enough pages to fill the bandwidth.
-                    break
+        if not queue:
+            del self.queues[site]
 
         if not pageGroup:
             pywikibot.output('NOTE: Nothing left to do 2')
             return False
 
         # Get the content of the assembled list in one blow
-        gen = site.preloadpages(pageGroup, templates=True, langlinks=True,
-                                pageprops=True)
-        for _ in gen:
-            # we don't want to do anything with them now. The
-            # page contents will be read via the Subject class.
-            pass
+        start = time.monotonic()
+        try:
+            gen = site.preloadpages(pageGroup, groupsize=len(pageGroup),
+                                    templates=True, langlinks=True,
+                                    pageprops=True)
+            for _ in gen:
+                # we don't want to do anything with them now. The
+                # page contents will be read via the Subject class.
+                pass
+        except Exception as e:
+            # Give the pages back so that a later batch takes them
+            for subject in subjectGroup:
+                subject.batchFailed()
+                self.enqueue(subject)
+            if not self.batch.is_backoff_error(e):
+                raise
+            self.batch.record_failure()
+            return False
+        self.queries += 1
+        self.batch.record_success(len(pageGroup), time.monotonic() - start,
+                                  self.replication_lag(site))
 
         # Tell all of the subjects that the promised work is done
         for subject in subjectGroup:
             subject.batchLoaded(self)
+            # They may have found more pages to load
+            self.enqueue(subject)
+        self.touched.extend(subjectGroup)
         return True
 
+    def replication_lag(self, site) -> Optional[float]:
+        """
+        Return the site's replication lag, probed every 10th query.
+
+        Probing is cheap, but not free, so it is skipped entirely while
+        the batch is already at its smallest.
+        """
+        if self.batch.size <= self.batch.min_size:
+            return None
+        if self.queries % 10 == 1:
+            try:
+                data = site.simple_request(
+                    action='query', meta='siteinfo', siprop='dbrepllag'
+                ).submit()
+                lags = data['query']['dbrepllag']
+                self.lag = max(float(entry['lag']) for entry in lags)
+            except (Error, KeyError, ValueError):
+                self.lag = None
+        return self.lag
+
     def queryStep(self) -> None:
         """Delete the ones that are done now."""
         self.oneQuery()
-        count = len(self.subjects)
-        pywikibot.output(f"queryStep: iterating {count} subjects.")
-        for i in range(count - 1, -1, -1):
-            subj = self.subjects[i]
+        # Only subjects that were added or loaded can have become done
+        touched = dict.fromkeys(self.touched)
+        self.touched = []
+        pywikibot.output(f"queryStep: checking {len(touched)} of "
+                         f"{len(self.subjects)} subjects.")
+        for subj in touched:
             if subj.isDone():
-                subj.finish()
-                del self.subjects[i]
+                new = subj.finish(defer=self.commits is not None)
+                if new:
+                    self.commits.add(subj, new)
+                self.remove(subj)
 
     def isDone(self) -> bool:
         """Check whether there is still more work to do."""
@@ -2062,19 +2419,37 @@ class InterwikiBot:
         self.counts[site] -= count
         self.counts = +self.counts  # remove zero and negative counts
 
-    async def run(self) -> None:
+    async def run(self, dump=None, checkpoint_every: int = 5,
+                  threaded: bool = False) -> None:
         """
         Start the process until finished.
         SLATE: IMPORTANT EDIT! This routine is now async, with yields every iteration
+
+        :param dump: an InterwikiDumps to checkpoint the unfinished subjects
+            to, so that an interrupted run can be continued from it
+        :param checkpoint_every: number of query steps between checkpoints
+        :param threaded: run each query step in the default executor, so
+            that several bots (each with its own config) load concurrently
         """
         done = self.isDone()
         if done:
             pywikibot.output(f"run: no work to do - finishing immediately!")
 
+        steps = 0
         while not done:
-            await asyncio.sleep(0.1)  # yield
-            self.queryStep()
+            # yield, waiting out any back-off without blocking the loop
+            await asyncio.sleep(max(0.1, self.batch.delay))
+            if threaded:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.queryStep)
+            else:
+                self.queryStep()
             done = self.isDone()
+            if self.commits is not None and (done or self.commits.full):
+                await self.commits.flush()
+            steps += 1
+            if dump is not None and not done and steps % checkpoint_every == 0:
+                dump.write_dump(self.dump_titles, append=False)
 
 
 def compareLanguages(old, new, insite, summary):
@@ -2286,16 +2661,40 @@ class InterwikiDumps(OptionHandler):
         """
         if not os.path.exists(self.path):
             os.makedirs(self.path)
-        filename = os.path.join(self.path,
-                                self.FILE_PATTERN.format(site=self.site))
+        filename = self.filename
         mode = 'appended' if append else 'written'
-        with codecs.open(filename, mode[0], 'utf-8') as f:
+        # Write a new file and swap it in, so a crash mid-write
+        # leaves the previous dump intact
+        tmp_filename = filename + '.tmp'
+        with codecs.open(tmp_filename, 'w', 'utf-8') as f:
+            if append and os.path.exists(filename):
+                with codecs.open(filename, 'r', 'utf-8') as old:
+                    shutil.copyfileobj(old, f)
             f.write('\r\n'.join(iterable))
             f.write('\r\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
         pywikibot.output('Dump {site.code} ({site.family.name}) {mode}.'
                          .format(site=self.site, mode=mode))
         self.remove(filename)
 
+    @property
+    def filename(self) -> str:
+        """Return the path of this site's dump file."""
+        return os.path.join(self.path,
+                            self.FILE_PATTERN.format(site=self.site))
+
+    def has_dump(self) -> bool:
+        """Return whether there is a dump file for this site."""
+        return os.path.exists(self.filename)
+
+    def discard(self) -> None:
+        """Delete this site's dump file, e.g. after a run completed."""
+        with suppress(FileNotFoundError):
+            os.remove(self.filename)
+        self.remove(self.filename)
+
     def delete_dumps(self) -> None:
         """Delete processed dumps."""
         for filename in self.restored_files:
@@ -0,0 +1,133 @@
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Iterable, Iterator, TextIO
+
+import pywikibot
+from pywikibot import Page, textlib
+from pywikibot.exceptions import NoPageError
+
+APPLY_BATCH_SIZE = 50
+
+
+def _titles_by_code(pages: dict) -> dict[str, str]:
+    return {site.code: page.title() for site, page in sorted(pages.items(), key=lambda item: item[0].code)}
+
+
+class InterwikiDiffWriter:
+    """
+    Records what an interwiki run would change, as one JSON object per line, instead of saving it.
+    Set as InterwikiBotConfig.dryrun. Several bots may share one writer, as writes are locked.
+
+    Lines are either
+    `{"action": "edit", "site", "title", "old", "new", "adding", "removing", "modifying", "summary"}`
+    where old and new map language codes to titles, or
+    `{"action": "conflict", "site", "title", "problems"}`.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict):
+        with self._lock:
+            self.stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def record_edit(self, page: Page, old: dict, new: dict, adding, removing, modifying, summary: str):
+        self._write({
+            'action': 'edit',
+            'site': page.site.code,
+            'title': page.title(),
+            'old': _titles_by_code(old),
+            'new': _titles_by_code(new),
+            'adding': [site.code for site in adding],
+            'removing': [site.code for site in removing],
+            'modifying': [site.code for site in modifying],
+            'summary': summary,
+        })
+        with self._lock:
+            self.counts['edits'] += 1
+            self.counts[f'edits on {page.site.code}'] += 1
+            self.counts['links added'] += len(adding)
+            self.counts['links removed'] += len(removing)
+            self.counts['links changed'] += len(modifying)
+
+    def record_conflict(self, page: Page, problems: list[str]):
+        self._write({
+            'action': 'conflict',
+            'site': page.site.code,
+            'title': page.title(),
+            'problems': problems,
+        })
+        with self._lock:
+            self.counts['conflicts'] += 1
+
+    def summary(self) -> str:
+        if not self.counts:
+            return "No changes."
+        return ', '.join(f"{count} {name}" for name, count in sorted(self.counts.items()))
+
+
+def read_diff(lines: Iterable[str]) -> list[dict]:
+    """Parse the lines written by InterwikiDiffWriter, ignoring blank lines."""
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+class InterwikiDiffApplier:
+    """
+    Applies the edits of a dry-run diff without running interwiki again.
+
+    The pages are loaded with one preload (revisions and langlinks) per 50 pages per site,
+    and an edit is only made if the page still has exactly the links the diff was computed from.
+    """
+
+    def __init__(self, family_site: pywikibot.BaseSite, records: list[dict]):
+        self.family = family_site.family
+        self.edits = [record for record in records if record.get('action') == 'edit']
+        # Lines describing edits that were skipped, and why
+        self.skipped: list[str] = []
+
+    def _site(self, code: str):
+        return pywikibot.Site(code, self.family)
+
+    def plan(self) -> Iterator[tuple[Page, str, str]]:
+        """Yield (page, new text, summary) for every edit that still applies."""
+        by_site: dict[str, list[dict]] = {}
+        for record in self.edits:
+            by_site.setdefault(record['site'], []).append(record)
+
+        for code, records in by_site.items():
+            site = self._site(code)
+            for i in range(0, len(records), APPLY_BATCH_SIZE):
+                batch = records[i:i + APPLY_BATCH_SIZE]
+                pages = [Page(site, record['title']) for record in batch]
+                # Preloaded pages are updated in place, so each stays paired with its record
+                for _ in site.preloadpages(pages, langlinks=True):
+                    pass
+                for page, record in zip(pages, batch):
+                    result = self._rewrite(page, record)
+                    if result is not None:
+                        yield page, result, record['summary']
+
+    def _rewrite(self, page: Page, record: dict):
+        try:
+            if not page.exists():
+                raise NoPageError(page)
+            current = {linked.site.code: linked.title() for linked in map(Page, page.iterlanglinks())}
+        except NoPageError:
+            self.skipped.append(f"{page.title()}: no longer exists")
+            return None
+        if current != record['old']:
+            self.skipped.append(f"{page.title()}: its links changed since the dry run")
+            return None
+
+        old_text = page.text
+        new = {self._site(code): Page(self._site(code), title) for code, title in record['new'].items()}
+        new_text = textlib.replaceLanguageLinks(old_text, new, site=page.site, template=page.namespace() == 10)
+        if new_text == old_text:
+            self.skipped.append(f"{page.title()}: nothing to change")
+            return None
+        logging.info(f"InterwikiDiffApplier: {page.title()} will be updated ({record['summary']}).")
+        return new_text
@@ -0,0 +1,86 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Iterable, TextIO
+
+from pywikibot import Page, Site
+
+from src.squidge.pwbsupport.helpers import query_with_continue, try_delete_page
+from src.squidge.pwbsupport.throttle import ThrottledEditor
+
+QUERY_BATCH_SIZE = 50
+DELETE_CONCURRENCY = 4
+
+
+@dataclass
+class DeleteEntry:
+    # The line of the list this came from, reported back as-is
+    line: str
+    page: Page
+    summary: str
+
+
+@dataclass
+class MassDeleteResult:
+    deleted: int = 0
+    failed: int = 0
+    missing: int = 0
+
+
+class MassDeleter:
+    """
+    Deletes a list of pages concurrently, writing the outcome of every line to a results stream as it happens.
+
+    Titles are checked for existence with one prop=info query per 50, so missing pages are skipped
+    without a request each. Deletions run through a ThrottledEditor, so at most `concurrency` are in flight.
+    Note that pywikibot's put_throttle also applies per write, so that sets the floor on how fast this can go.
+    """
+
+    def __init__(self, site: Site, concurrency: int = DELETE_CONCURRENCY, interval: float = 0.0):
+        self.site = site
+        self.editor = ThrottledEditor(interval=interval, concurrency=concurrency)
+
+    def find_existing(self, pages: Iterable[Page]) -> set[str]:
+        """Return the titles of the given pages that exist on the wiki."""
+        titles = list(dict.fromkeys(page.title() for page in pages))
+        existing = set()
+        for i in range(0, len(titles), QUERY_BATCH_SIZE):
+            batch = titles[i:i + QUERY_BATCH_SIZE]
+            for data in query_with_continue(self.site, action='query', prop='info', titles='|'.join(batch)):
+                for page in data.get('query', {}).get('pages', {}).values():
+                    if 'missing' not in page and 'invalid' not in page:
+                        existing.add(page['title'])
+        return existing
+
+    async def run(self, entries: list[DeleteEntry], results: TextIO) -> MassDeleteResult:
+        """Delete every entry whose page exists, writing one `STATUS: line` per entry to results as each finishes."""
+        loop = asyncio.get_running_loop()
+        existing = await loop.run_in_executor(None, self.find_existing, (entry.page for entry in entries))
+        result = MassDeleteResult()
+
+        def record(status: str, entry: DeleteEntry):
+            results.write(f"{status}: {entry.line}\n")
+
+        async def delete_one(entry: DeleteEntry):
+            if entry.page.title() not in existing:
+                result.missing += 1
+                record("MISSING", entry)
+                return
+            if await self.editor.run(try_delete_page, entry.page, entry.summary):
+                result.deleted += 1
+                record("DELETED", entry)
+            else:
+                result.failed += 1
+                record("FAILED", entry)
+
+        # Pages listed twice would only fail the second time, so delete each once
+        seen = set()
+        unique = []
+        for entry in entries:
+            if entry.page.title() in seen:
+                record("DUPLICATE", entry)
+            else:
+                seen.add(entry.page.title())
+                unique.append(entry)
+        await asyncio.gather(*(delete_one(entry) for entry in unique))
+        results.flush()
+        return result
@@ -0,0 +1,206 @@
+import logging
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from src.squidge.entry.timings import StageTimings
+from src.squidge.pwbsupport.edit_rate import RateCounters, ip_range
+from src.squidge.pwbsupport.recent_changes import RecentChangeEvent
+
+# Rule kinds that match a regex against a field of the event, and which field
+PATTERN_FIELDS = {'username': 'user', 'title': 'title', 'comment': 'comment'}
+CHEAP_KINDS = set(PATTERN_FIELDS) | {'size', 'edit_rate'}
+EXTERNAL_KIND = 'external'
+
+# An external check takes the event's text and returns what it found, or None if it's clean
+ExternalCheck = Callable[[str], Awaitable[Optional[str]]]
+
+
+@dataclass
+class RuleHit:
+    rule: str
+    detail: str
+
+
+def validate_rule(rule: dict) -> Optional[str]:
+    """Return what's wrong with a rule declaration, or None if it's usable."""
+    if not isinstance(rule, dict) or not rule.get('name'):
+        return "A rule must be an object with a name."
+    kind = rule.get('kind')
+    if kind not in CHEAP_KINDS and kind != EXTERNAL_KIND:
+        return f"Unknown kind {kind}; expected one of {', '.join(sorted(CHEAP_KINDS | {EXTERNAL_KIND}))}."
+    if kind in PATTERN_FIELDS:
+        try:
+            re.compile(rule.get('pattern', ''))
+        except (re.error, TypeError) as err:
+            return f"Bad pattern: {err}"
+        if not rule.get('pattern'):
+            return "A pattern rule needs a pattern."
+    if kind == 'size' and 'min_delta' not in rule and 'max_delta' not in rule:
+        return "A size rule needs min_delta and/or max_delta."
+    if kind == 'edit_rate' and not (rule.get('max_edits') and rule.get('window')):
+        return "An edit_rate rule needs max_edits and window (seconds)."
+    if kind == EXTERNAL_KIND and not rule.get('service'):
+        return "An external rule needs a service."
+    if rule.get('action', 'flag') not in ('flag', 'allow'):
+        return "action must be flag or allow."
+    return None
+
+
+def validate_rules(rules: list[dict]) -> Optional[str]:
+    """Return what's wrong with a set of rule declarations, or None if the engine can compile all of them."""
+    for rule in rules:
+        problem = validate_rule(rule)
+        if problem:
+            return f"{rule.get('name') if isinstance(rule, dict) else rule}: {problem}"
+    try:
+        ModerationEngine.compile_patterns(rules)
+    except re.error as err:
+        return f"Bad pattern: {err}"
+    return None
+
+
+class ModerationEngine:
+    """
+    Evaluates the moderation rules declared in save data against recent changes.
+
+    Rules are:
+    - `username`, `title` and `comment` rules, matching a regex (case-insensitive) against that field;
+    - `size` rules, flagging a change in page size of at least `min_delta` or at most `max_delta` bytes;
+    - `edit_rate` rules, flagging a user making more than `max_edits` edits in `window` seconds,
+      only for new accounts and IPs if `new_users_only` is set;
+    - `external` rules, calling a registered check (such as Sight Engine) with the event's text.
+
+    Every rule may list the `events` types it applies to (e.g. edit, new, newusers, upload), default all,
+    and an `action`: `flag` (default) or `allow`. Allow rules run first and stop evaluation of the event.
+
+    Each pattern rule is compiled on its own, so rules never mask each other and backreferences work,
+    and only the rules for the event's type are run against it, each timed as its own stage. External rules run last, and only for events no cheap rule already flagged,
+    so the external services are only paid for when nothing cheaper decided.
+    """
+
+    def __init__(self, rules: list[dict], external_checks: dict[str, ExternalCheck]):
+        self.external_checks = external_checks
+        self.timings = StageTimings()
+        # Edit counts per rule and user, for edit_rate rules
+        self._edit_rates = RateCounters()
+        self._new_users: set[str] = set()
+        self.compile(rules)
+
+    def compile(self, rules: list[dict]):
+        """(Re)build the evaluator from the rule declarations, skipping any that are invalid."""
+        self.rules = []
+        for rule in rules:
+            problem = validate_rule(rule)
+            if problem:
+                logging.error(f"ModerationEngine: skipping rule {rule.get('name') if isinstance(rule, dict) else rule}: {problem}")
+            else:
+                self.rules.append(rule)
+
+        self._patterns = self.compile_patterns(self.rules)
+
+        self._numeric = [rule for rule in self.rules if rule['kind'] in ('size', 'edit_rate')]
+        # Windows are sized when created, so start counting afresh in case a rule's window changed
+        self._edit_rates.clear()
+        self._external = [rule for rule in self.rules if rule['kind'] == EXTERNAL_KIND]
+
+    @staticmethod
+    def compile_patterns(rules: list[dict]) -> dict[tuple[str, str], list[tuple[re.Pattern, dict]]]:
+        """(action, field) to each of the pattern rules on it, compiled. Raises re.error for a bad pattern."""
+        patterns = defaultdict(list)
+        for rule in rules:
+            if rule['kind'] in PATTERN_FIELDS:
+                key = (rule.get('action', 'flag'), PATTERN_FIELDS[rule['kind']])
+                patterns[key].append((re.compile(rule['pattern'], re.IGNORECASE), rule))
+        return dict(patterns)
+
+    @staticmethod
+    def _applies(rule: dict, kind: str) -> bool:
+        events = rule.get('events')
+        return not events or kind in events
+
+    def _match_patterns(self, action: str, event: RecentChangeEvent, kind: str) -> list[RuleHit]:
+        hits = []
+        for (rule_action, field), field_rules in self._patterns.items():
+            if rule_action != action:
+                continue
+            value = getattr(event, field) or ''
+            for pattern, rule in field_rules:
+                if not self._applies(rule, kind):
+                    continue
+                start = time.perf_counter()
+                match = pattern.search(value)
+                self.timings.record(rule['name'], time.perf_counter() - start, match is not None)
+                if match:
+                    hits.append(RuleHit(rule['name'], f"{field} matched `{match.group()}`"))
+        return hits
+
+    def _edit_rate(self, rule: dict, event: RecentChangeEvent) -> Optional[str]:
+        if rule.get('new_users_only') and event.user not in self._new_users and not ip_range(event.user):
+            return None
+        count = self._edit_rates.window((rule['name'], event.user), rule['window']).count(event.posix_time)
+        if count > rule['max_edits']:
+            return f"{count} edits in {rule['window']}s"
+        return None
+
+    def _check_numeric(self, rule: dict, event: RecentChangeEvent) -> Optional[str]:
+        if rule['kind'] == 'size':
+            if event.kind not in ('edit', 'new'):
+                return None
+            delta = event.new_size - event.old_size
+            if 'min_delta' in rule and delta >= rule['min_delta']:
+                return f"size changed by {delta:+} bytes"
+            if 'max_delta' in rule and delta <= rule['max_delta']:
+                return f"size changed by {delta:+} bytes"
+            return None
+        return self._edit_rate(rule, event)
+
+    def _observe(self, event: RecentChangeEvent):
+        """Keep the per-user state the edit_rate rules read."""
+        if event.log_type == 'newusers':
+            self._new_users.add(event.user)
+        if event.kind in ('edit', 'new'):
+            for rule in self._numeric:
+                if rule['kind'] == 'edit_rate':
+                    self._edit_rates.add((rule['name'], event.user), rule['window'], event.posix_time)
+
+    async def evaluate(self, event: RecentChangeEvent, text: str) -> list[RuleHit]:
+        """Return the hits of the flag rules on the event. text is what external checks are given."""
+        kind = event.event_type
+        self._observe(event)
+
+        start = time.perf_counter()
+        allowed = self._match_patterns('allow', event, kind)
+        hits = [] if allowed else self._match_patterns('flag', event, kind)
+        self.timings.record(f"patterns ({sum(map(len, self._patterns.values()))} compiled)", time.perf_counter() - start,
+                            bool(allowed or hits))
+        if allowed:
+            return []
+
+        for rule in self._numeric:
+            if not self._applies(rule, kind):
+                continue
+            start = time.perf_counter()
+            detail = self._check_numeric(rule, event)
+            self.timings.record(rule['name'], time.perf_counter() - start, detail is not None)
+            if detail:
+                hits.append(RuleHit(rule['name'], detail))
+
+        if hits:
+            return hits
+
+        for rule in self._external:
+            check = self.external_checks.get(rule['service'])
+            if not self._applies(rule, kind):
+                continue
+            if check is None:
+                logging.error(f"ModerationEngine: no external check named {rule['service']} for rule {rule['name']}")
+                continue
+            start = time.perf_counter()
+            detail = await check(text)
+            self.timings.record(rule['name'], time.perf_counter() - start, detail is not None)
+            if detail:
+                hits.append(RuleHit(rule['name'], detail))
+        return hits
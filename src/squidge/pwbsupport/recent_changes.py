@@ -0,0 +1,264 @@
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Optional
+
+import pywikibot
+from pywikibot import Site
+
+from src.squidge.pwbsupport.helpers import query_with_continue
+from src.squidge.savedata.checkpoint import Checkpoint
+
+POLL_INTERVAL = 60
+QUEUE_SIZE = 500
+CHECKPOINT_EVERY = 50
+# Recorded events are written out once this many are waiting, or this many seconds after the first
+RECORD_FLUSH_EVERY = 200
+RECORD_FLUSH_INTERVAL = 5.0
+
+Stage = Callable[['RecentChangeEvent'], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class RecentChangeEvent:
+    site_code: str
+    rcid: int
+    # 'edit', 'new' or 'log'
+    kind: str
+    title: str
+    user: str
+    timestamp: str
+    comment: str = ''
+    revid: int = 0
+    old_revid: int = 0
+    old_size: int = 0
+    new_size: int = 0
+    log_type: Optional[str] = None
+    log_action: Optional[str] = None
+
+    @classmethod
+    def from_api(cls, site_code: str, rc: dict) -> 'RecentChangeEvent':
+        return cls(
+            site_code=site_code,
+            rcid=rc['rcid'],
+            kind=rc.get('type', 'edit'),
+            title=rc.get('title', ''),
+            user=rc.get('user', ''),
+            timestamp=rc.get('timestamp', ''),
+            comment=rc.get('comment', ''),
+            revid=rc.get('revid', 0),
+            old_revid=rc.get('old_revid', 0),
+            old_size=rc.get('oldlen', 0),
+            new_size=rc.get('newlen', 0),
+            log_type=rc.get('logtype'),
+            log_action=rc.get('logaction'),
+        )
+
+    @classmethod
+    def from_dict(cls, obj: dict) -> 'RecentChangeEvent':
+        """Load an event written by as_dict."""
+        return cls(**{field.name: obj[field.name] for field in dataclasses.fields(cls) if field.name in obj})
+
+    def as_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    @property
+    def is_new_content(self) -> bool:
+        """Return whether this event brings new user-written names or text: a new page, account or upload."""
+        return self.kind == 'new' or self.log_type in ('newusers', 'upload')
+
+    @property
+    def event_type(self) -> str:
+        """The type rules select events by: the log type for log events (e.g. upload, newusers), else edit or new."""
+        return self.log_type or self.kind
+
+    @property
+    def posix_time(self) -> float:
+        """The event's timestamp in seconds, or now if it has none."""
+        try:
+            return datetime.datetime.fromisoformat(self.timestamp.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return datetime.datetime.now(datetime.timezone.utc).timestamp()
+
+
+class EventRecorder:
+    """
+    Appends events to a JSONL file per wiki and day in a directory, for replaying later.
+    Events are buffered and written in batches from the executor, so the event loop never waits on the disk.
+    """
+
+    def __init__(self, directory: str, flush_every: int = RECORD_FLUSH_EVERY,
+                 flush_interval: float = RECORD_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer: list[RecentChangeEvent] = []
+        # Batches are written one at a time, so they stay in order
+        self._write_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def record(self, event: RecentChangeEvent):
+        self._buffer.append(event)
+        if len(self._buffer) >= self.flush_every:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        batch, self._buffer = self._buffer, []
+        if batch:
+            async with self._write_lock:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, batch)
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    def _write(self, batch: list[RecentChangeEvent]):
+        os.makedirs(self.directory, exist_ok=True)
+        lines: dict[str, list[str]] = {}
+        for event in batch:
+            day = event.timestamp[:10] or datetime.date.today().isoformat()
+            lines.setdefault(f"{event.site_code}-{day}.jsonl", []).append(
+                json.dumps(event.as_dict(), ensure_ascii=False, separators=(',', ':')) + '\n')
+        for name, file_lines in lines.items():
+            with open(os.path.join(self.directory, name), 'a', encoding='utf-8') as f:
+                f.writelines(file_lines)
+
+
+class RecentChangesPoller:
+    """
+    Follows a wiki's recent changes with list=recentchanges, oldest first and following continuation,
+    and puts each change on a queue as a RecentChangeEvent.
+
+    The position of the last change that was fully processed is checkpointed to disk,
+    so after a restart polling resumes from there rather than from now.
+    Changes are deduplicated by rcid, as resuming from a timestamp returns that timestamp's changes again.
+    """
+
+    def __init__(self, site: Site, interval: float = POLL_INTERVAL):
+        self.site = site
+        self.interval = interval
+        self.checkpoint = Checkpoint(pywikibot.config.datafilepath(
+            'data', 'recentchanges', f"{site.family.name}-{site.code}.json"))
+        state = self.checkpoint.load() or {}
+        # Where the next poll starts, and the last change already put on the queue
+        self._start: str = state.get('timestamp') or \
+            datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self._last_queued: int = state.get('rcid', 0)
+        # The last change that went through every stage, which is what gets checkpointed
+        self._processed: Optional[RecentChangeEvent] = None
+        self._unsaved = 0
+        # Checkpoints are written one at a time, so an older one never lands after a newer one
+        self._save_lock = asyncio.Lock()
+
+    def _pages(self) -> Iterator[list[dict]]:
+        for data in query_with_continue(self.site, action='query', list='recentchanges', rcdir='newer',
+                                        rcstart=self._start, rctype='edit|new|log', rclimit='max',
+                                        rcprop='title|ids|user|comment|timestamp|sizes|loginfo'):
+            yield data.get('query', {}).get('recentchanges', [])
+
+    async def poll(self, queue: asyncio.Queue):
+        """Put every change since the last poll on the queue, one API response at a time."""
+        loop = asyncio.get_running_loop()
+        pages = self._pages()
+        while True:
+            changes = await loop.run_in_executor(None, next, pages, None)
+            if changes is None:
+                break
+            for rc in changes:
+                try:
+                    if rc['rcid'] <= self._last_queued:
+                        continue
+                    event = RecentChangeEvent.from_api(self.site.code, rc)
+                except (KeyError, TypeError, ValueError):
+                    # Skipped rather than retried, or it would stop every poll at the same change
+                    logging.exception(f"RecentChangesPoller: skipping an unreadable change on {self.site}: {rc!r}")
+                    continue
+                # Waits here while the queue is full, so a slow pipeline slows the polling rather than piling up
+                await queue.put(event)
+                self._last_queued = event.rcid
+                self._start = event.timestamp
+
+    async def run(self, queue: asyncio.Queue):
+        while True:
+            try:
+                await self.poll(queue)
+            except pywikibot.exceptions.Error as err:
+                logging.error(f"RecentChangesPoller: polling {self.site} failed, will retry: {err}")
+            except Exception:
+                # Anything else (a connection error, an odd response) mustn't stop this wiki's polling for good
+                logging.exception(f"RecentChangesPoller: polling {self.site} failed unexpectedly, will retry")
+            await asyncio.sleep(self.interval)
+
+    async def processed(self, event: RecentChangeEvent):
+        """Record that the event went through the pipeline, checkpointing every so often."""
+        self._processed = event
+        self._unsaved += 1
+        if self._unsaved >= CHECKPOINT_EVERY:
+            await self.save()
+
+    async def save(self):
+        """Checkpoint the last processed change, written from the executor so the loop never waits on the disk."""
+        if self._processed is None or not self._unsaved:
+            return
+        state = {'timestamp': self._processed.timestamp, 'rcid': self._processed.rcid}
+        self._unsaved = 0
+        async with self._save_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self.checkpoint.save, state)
+
+
+class RecentChangesPipeline:
+    """
+    Runs a poller per site into one bounded queue, and passes each event through the stages in order.
+    A stage that raises is logged and skipped for that event; the event still goes on to the next stage.
+    """
+
+    def __init__(self, sites: list[Site], stages: list[Stage], interval: float = POLL_INTERVAL):
+        self.pollers = {site.code: RecentChangesPoller(site, interval) for site in sites}
+        self.stages = stages
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(poller.run(self.queue)) for poller in self.pollers.values()]
+        self._tasks.append(asyncio.create_task(self._consume()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for poller in self.pollers.values():
+            await poller.save()
+
+    async def _consume(self):
+        while True:
+            event = await self.queue.get()
+            for stage in self.stages:
+                try:
+                    await stage(event)
+                except Exception as err:
+                    logging.exception(f"RecentChangesPipeline: {getattr(stage, '__name__', stage)} failed on "
+                                      f"{event.site_code} rcid {event.rcid}: {err}")
+            poller = self.pollers[event.site_code]
+            await poller.processed(event)
+            if self.queue.empty():
+                await poller.save()
+            self.queue.task_done()
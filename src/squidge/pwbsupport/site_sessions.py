@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import pywikibot
+from pywikibot.comms import http
+from requests.adapters import HTTPAdapter
+
+from src.squidge.pwbsupport.sites import LazySites
+
+TOKEN_TYPES = ('csrf', 'rollback')
+# Seconds between background token refreshes, which also keep the login sessions alive
+TOKEN_REFRESH_INTERVAL = 30 * 60
+# Connections kept open per wiki host, enough for the executor threads that edit concurrently
+POOL_SIZE_PER_HOST = 16
+
+
+def configure_http_pool(hosts: int, pool_size_per_host: int = POOL_SIZE_PER_HOST):
+    """
+    Size pywikibot's shared requests session so each wiki host keeps its own pool of open connections.
+    By default requests keeps 10 pools of 10, so concurrent edits from executor threads beyond that
+    open and throw away a connection each time.
+    """
+    adapter = HTTPAdapter(pool_connections=max(hosts, 1), pool_maxsize=pool_size_per_host)
+    http.session.mount('https://', adapter)
+    http.session.mount('http://', adapter)
+
+
+@dataclass
+class SiteSession:
+    logged_in_at: float
+    tokens_at: float
+
+
+class SiteSessionManager:
+    """
+    Logs into the wikis only when a command needs them, and keeps their tokens fresh.
+
+    ensure() logs into just the sites asked for, concurrently, and only those not already logged in
+    with tokens newer than the refresh interval; anything else is a dictionary lookup.
+    Sites that have been logged into have their CSRF and rollback tokens reloaded in the background,
+    so edits, deletes and rollbacks don't each start with a token request.
+    """
+
+    def __init__(self, sites: LazySites, token_types: Iterable[str] = TOKEN_TYPES,
+                 refresh_interval: float = TOKEN_REFRESH_INTERVAL):
+        self.sites = sites
+        self.token_types = list(token_types)
+        self.refresh_interval = refresh_interval
+        self._sessions: dict[str, SiteSession] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        # The pool is sized on the first login, as counting the sites configures them
+        self._pool_configured = False
+        self._pool_lock = threading.Lock()
+
+    def _configure_pool(self):
+        with self._pool_lock:
+            if not self._pool_configured:
+                configure_http_pool(len(self.sites))
+                self._pool_configured = True
+
+    def _is_fresh(self, code: str) -> bool:
+        session = self._sessions.get(code)
+        return (session is not None
+                and time.monotonic() - session.tokens_at < self.refresh_interval
+                and self.sites[code].logged_in())
+
+    def _login(self, code: str):
+        """Log into the site and load its tokens. Blocking, so run in the executor."""
+        self._configure_pool()
+        site = self.sites[code]
+        now = time.monotonic()
+        session = self._sessions.get(code)
+        if session is None or not site.logged_in():
+            site.login()
+            session = SiteSession(logged_in_at=now, tokens_at=0.0)
+        site.tokens.load_tokens(self.token_types)
+        session.tokens_at = now
+        self._sessions[code] = session
+
+    async def _ensure_one(self, code: str):
+        lock = self._locks.setdefault(code, asyncio.Lock())
+        # A command that arrives during another's login waits for it rather than logging in again
+        async with lock:
+            if not self._is_fresh(code):
+                await asyncio.get_running_loop().run_in_executor(None, self._login, code)
+
+    async def ensure(self, *codes: str):
+        """Make sure the given sites (default all) are logged in with fresh tokens, logging in concurrently."""
+        codes = codes or tuple(self.sites)
+        stale = [code for code in codes if not self._is_fresh(code)]
+        if stale:
+            await asyncio.gather(*(self._ensure_one(code) for code in stale))
+        self.start()
+
+    def start(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_tokens())
+
+    def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+    async def _refresh_tokens(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval / 2)
+            for code in list(self._sessions):
+                async with self._locks.setdefault(code, asyncio.Lock()):
+                    try:
+                        await loop.run_in_executor(None, self._login, code)
+                    except pywikibot.exceptions.Error as err:
+                        # Log in again when next needed
+                        logging.warning(f"SiteSessionManager: refreshing the tokens for {code} failed: {err}")
+                        self._sessions.pop(code, None)
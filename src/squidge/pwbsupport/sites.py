@@ -0,0 +1,86 @@
+import logging
+import os
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+import pywikibot.config
+from pywikibot import Site
+
+FAMILY = 'splatoonwiki'
+FAMILY_CODES = ('en', 'fr', 'es')
+FALLBACK_URL = "https://splatoonwiki.org"
+
+
+def _find_upwards(file: str, depth: int = 10) -> Optional[str]:
+    """Return the path to file from here or up to depth parent directories, or None."""
+    for i in range(0, depth):
+        if os.path.exists(file):
+            return file
+        file = "../" + file
+    return None
+
+
+class LazySites(Mapping):
+    """
+    The wikis by language code, each Site constructed the first time it's used.
+
+    The password and family files are looked for on first use too, so nothing touches the disk or pywikibot's
+    site machinery until a command or the recent changes feed needs a wiki. If the family file isn't found,
+    only 'en' is available, connected by URL.
+    """
+
+    def __init__(self, family: str = FAMILY, codes: tuple[str, ...] = FAMILY_CODES):
+        self.family = family
+        self._codes = list(codes)
+        self._sites: dict[str, Site] = {}
+        self._fallback = False
+        self._configured = False
+
+    def _configure(self):
+        if self._configured:
+            return
+        self._configured = True
+
+        password_file = _find_upwards(".pwd")
+        if password_file:
+            pywikibot.config.password_file = password_file
+        else:
+            logging.warning("Wiki password file not found. Wiki commands that require login will not work.")
+
+        family_file = _find_upwards(f"src/squidge/pwbsupport/{self.family}_family.py")
+        if family_file:
+            pywikibot.config.family_files[self.family] = family_file
+        else:
+            logging.critical("***Family file not found. Interwiki commands will not work.***")
+            self._fallback = True
+            self._codes = ['en']
+
+    def __getitem__(self, code: str) -> Site:
+        site = self._sites.get(code)
+        if site is None:
+            if code not in self:
+                raise KeyError(code)
+            if self._fallback:
+                site = Site(fam=self.family, url=FALLBACK_URL)
+            else:
+                # noinspection PyTypeChecker
+                site = Site(code=code, fam=self.family)
+            self._sites[code] = site
+        return site
+
+    def __contains__(self, code) -> bool:
+        self._configure()
+        return code in self._codes
+
+    def __iter__(self) -> Iterator[str]:
+        self._configure()
+        return iter(list(self._codes))
+
+    def __len__(self) -> int:
+        self._configure()
+        return len(self._codes)
+
+    @property
+    def constructed(self) -> list[Site]:
+        """The sites that have been used so far."""
+        return list(self._sites.values())
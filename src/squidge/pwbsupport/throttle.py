@@ -0,0 +1,41 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class ThrottledEditor:
+    """
+    Runs blocking pywikibot write operations off the event loop at a bounded rate.
+
+    At most `concurrency` operations are in flight at once, and operations are started
+    no more often than once per `interval` seconds.
+    Note that pywikibot's own put_throttle still applies to each write on top of this.
+    Operations run in the given executor, or else the loop's default one.
+    Make the editor from the event loop, as it holds asyncio primitives.
+    """
+
+    def __init__(self, interval: float = 1.0, concurrency: int = 1, executor: Optional[Executor] = None):
+        self.interval = interval
+        self.executor = executor
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def _wait_turn(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run func(*args, **kwargs) in the executor once the throttle allows it."""
+        async with self._semaphore:
+            await self._wait_turn()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,126 @@
+import json
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional, Union
+
+from pywikibot import Page, Site
+
+from src.squidge.pwbsupport.helpers import query_with_continue
+
+NON_WORD_REGEX = re.compile(r'[\W_]+')
+
+
+def normalise_name(name: str) -> str:
+    """Return the key a name is matched on: case-folded, without accents, punctuation or spaces."""
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    without_marks = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return NON_WORD_REGEX.sub('', without_marks)
+
+
+def load_translation_entries(path: str) -> list[dict[str, Union[str, list[str]]]]:
+    """
+    Load the official names file.
+    This is a JSON list of entries mapping a language code to that language's name for one thing, e.g.
+    `[{"en": "Splattershot", "fr": "Liquidateur", "es": "Lanzatintas"}]`,
+    or an object of such lists grouped by kind (weapons, stages, gear...).
+    A language may also map to a list of names, the first being the official one and the rest aliases.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    groups = data.values() if isinstance(data, dict) else [data]
+    return [entry for group in groups for entry in group if isinstance(entry, dict)]
+
+
+class TranslationIndex:
+    """
+    Matches wiki titles across languages through a table of official names.
+
+    Every name is reduced to a normalised key, so matching a wiki's whole list of titles is a dictionary lookup
+    per title. Keys that belong to more than one entry in a language are ambiguous and never matched.
+    """
+
+    def __init__(self, entries: Iterable[dict[str, Union[str, list[str]]]]):
+        # Language code to normalised name to entry number
+        self._index: dict[str, dict[str, int]] = defaultdict(dict)
+        ambiguous: dict[str, set[str]] = defaultdict(set)
+        for number, entry in enumerate(entries):
+            for code, names in entry.items():
+                for name in [names] if isinstance(names, str) else names:
+                    key = normalise_name(name)
+                    if not key:
+                        continue
+                    existing = self._index[code].setdefault(key, number)
+                    if existing != number:
+                        ambiguous[code].add(key)
+        for code, keys in ambiguous.items():
+            for key in keys:
+                del self._index[code][key]
+            logging.info(f"TranslationIndex: {len(keys)} ambiguous {code} name(s) will not be matched.")
+        # Language code and title to the titles of the same entry in other languages, once matched
+        self.hints: dict[tuple[str, str], list[str]] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> 'TranslationIndex':
+        return cls(load_translation_entries(path))
+
+    @property
+    def languages(self) -> list[str]:
+        return list(self._index)
+
+    @staticmethod
+    def iter_mainspace_titles(site: Site) -> Iterator[str]:
+        """Yield every non-redirect mainspace title on the site, 500 (or the site's limit) per request."""
+        for data in query_with_continue(site, action='query', list='allpages', apnamespace=0,
+                                        apfilterredir='nonredirects', aplimit='max'):
+            for page in data.get('query', {}).get('allpages', []):
+                yield page['title']
+
+    def match(self, titles_by_code: dict[str, Iterable[str]]) -> int:
+        """
+        Match every given title against the index in one pass, and work out the hints for each matched title.
+        Returns the number of titles that got hints.
+        """
+        # Entry number to language code to title
+        found: dict[int, dict[str, str]] = defaultdict(dict)
+        for code, titles in titles_by_code.items():
+            names = self._index.get(code)
+            if not names:
+                continue
+            for title in titles:
+                number = names.get(normalise_name(title))
+                if number is not None:
+                    # The first title wins if two titles normalise the same, e.g. case variants
+                    found[number].setdefault(code, title)
+
+        self.hints = {}
+        for titles in found.values():
+            if len(titles) < 2:
+                continue
+            for code, title in titles.items():
+                self.hints[(code, title)] = [f"{other_code}:{other_title}"
+                                             for other_code, other_title in titles.items() if other_code != code]
+        return len(self.hints)
+
+    def match_sites(self, sites: Iterable[Site]) -> int:
+        """Fetch all mainspace titles of each site with an indexed language, then match them."""
+        titles_by_code = {site.code: list(self.iter_mainspace_titles(site))
+                          for site in sites if site.code in self._index}
+        return self.match(titles_by_code)
+
+    def hints_for(self, page: Union[Page, tuple[str, str]]) -> list[str]:
+        """Return interwiki hints (`code:Title`) for the page, for InterwikiBotConfig.hintsource."""
+        key = page if isinstance(page, tuple) else (page.site.code, page.title())
+        return self.hints.get(key, [])
+
+
+def load_translation_index(path: Optional[str]) -> Optional[TranslationIndex]:
+    """Return the index for the official names file at path, or None if there's no path or it can't be read."""
+    if not path:
+        return None
+    try:
+        return TranslationIndex.from_file(path)
+    except (OSError, ValueError) as err:
+        logging.error(f"Could not load the translations file {path}: {err}")
+        return None
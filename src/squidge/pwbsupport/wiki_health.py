@@ -0,0 +1,112 @@
+import asyncio
+import csv
+import io
+import time
+from dataclasses import dataclass, fields
+from typing import Iterable, Optional
+
+import aiohttp
+
+from src.squidge.pwbsupport.http_pool import get_http_session
+
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=10, sock_connect=5)
+PROBE_CONCURRENCY = 32
+HEALTH_TTL = 15 * 60
+SORT_KEYS = ('status', 'latency', 'version', 'name')
+
+
+@dataclass
+class WikiHealth:
+    name: str
+    api: str
+    # 'ok', or what went wrong: 'timeout', 'http 404', 'not mediawiki', 'unreachable'...
+    status: str
+    latency_ms: Optional[float] = None
+    version: str = ''
+    sitename: str = ''
+    # time.time() of the probe
+    checked_at: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+
+
+def _version_key(version: str) -> tuple:
+    """'MediaWiki 1.39.3' -> (1, 39, 3), so versions sort numerically."""
+    numbers = version.rpartition(' ')[2].split('-')[0].split('.')
+    return tuple(int(n) if n.isdigit() else 0 for n in numbers)
+
+
+def sort_report(results: list[WikiHealth], by: str = 'status') -> list[WikiHealth]:
+    """Sort by status (dead first), latency (slowest first), version (oldest first) or name."""
+    if by == 'latency':
+        return sorted(results, key=lambda r: (r.latency_ms is None, -(r.latency_ms or 0), r.name.casefold()))
+    if by == 'version':
+        return sorted(results, key=lambda r: (not r.ok, _version_key(r.version), r.name.casefold()))
+    if by == 'name':
+        return sorted(results, key=lambda r: r.name.casefold())
+    return sorted(results, key=lambda r: (r.ok, r.status, r.name.casefold()))
+
+
+def report_csv(results: Iterable[WikiHealth]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow([f.name for f in fields(WikiHealth)])
+    for result in results:
+        writer.writerow([result.name, result.api, result.status,
+                         '' if result.latency_ms is None else f"{result.latency_ms:.0f}",
+                         result.version, result.sitename,
+                         time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(result.checked_at))])
+    return out.getvalue()
+
+
+class WikiHealthChecker:
+    """
+    Probes MediaWiki APIs for their siteinfo, all at once, to find the dead or broken ones in a wiki list.
+    Results are kept for HEALTH_TTL seconds per api URL, so checking a list again soon after only probes what's new.
+    """
+
+    def __init__(self, ttl: float = HEALTH_TTL, concurrency: int = PROBE_CONCURRENCY):
+        self.ttl = ttl
+        self._limit = asyncio.Semaphore(concurrency)
+        # api URL to (time.monotonic() probed, result)
+        self._cache: dict[str, tuple[float, WikiHealth]] = {}
+
+    async def _probe(self, name: str, api: str) -> WikiHealth:
+        params = {'action': 'query', 'meta': 'siteinfo', 'siprop': 'general', 'format': 'json', 'formatversion': '2'}
+        async with self._limit:
+            start = time.perf_counter()
+            try:
+                async with get_http_session().get(api, params=params, timeout=PROBE_TIMEOUT) as response:
+                    latency_ms = (time.perf_counter() - start) * 1000
+                    if response.status != 200:
+                        return WikiHealth(name, api, f"http {response.status}", latency_ms, checked_at=time.time())
+                    try:
+                        general = (await response.json(content_type=None))['query']['general']
+                    except (ValueError, KeyError, TypeError):
+                        return WikiHealth(name, api, 'not mediawiki', latency_ms, checked_at=time.time())
+            except asyncio.TimeoutError:
+                return WikiHealth(name, api, 'timeout', checked_at=time.time())
+            except aiohttp.ClientError as err:
+                return WikiHealth(name, api, f"unreachable ({type(err).__name__})", checked_at=time.time())
+        return WikiHealth(name, api, 'ok', latency_ms, general.get('generator', ''), general.get('sitename', ''),
+                          checked_at=time.time())
+
+    async def check(self, wikis: Iterable[tuple[str, str]], refresh: bool = False) -> list[WikiHealth]:
+        """Probe the (name, api URL) pairs not checked within the TTL (or all, if refresh) and return every result."""
+        now = time.monotonic()
+        results: dict[str, WikiHealth] = {}
+        to_probe: dict[str, str] = {}
+        for name, api in wikis:
+            cached = self._cache.get(api)
+            if cached is not None and not refresh and now - cached[0] < self.ttl:
+                results[api] = cached[1]
+            else:
+                to_probe.setdefault(api, name)
+
+        probed = await asyncio.gather(*(self._probe(name, api) for api, name in to_probe.items()))
+        for result in probed:
+            self._cache[result.api] = (time.monotonic(), result)
+            results[result.api] = result
+        return list(results.values())
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, TypeVar, Union
+
+import pywikibot
+from pywikibot import Site
+from pywikibot.family import AutoFamily
+
+from src.squidge.pwbsupport.throttle import ThrottledEditor
+from src.squidge.savedata.wiki_registry import WikiEntry, WikiRegistry
+
+T = TypeVar('T')
+# Wikis worked on at once by a fan out
+FAN_OUT_CONCURRENCY = 16
+
+
+class WikiConnection:
+    """
+    One registered wiki: its Site, made on first use, and the throttle every request to it goes through.
+    Make connections from the event loop (the throttle holds asyncio primitives), and only use site off it.
+    """
+
+    def __init__(self, entry: WikiEntry, executor: Optional[Executor] = None):
+        # Raises RuntimeError if there's no running loop in this thread
+        asyncio.get_running_loop()
+        self.entry = entry
+        self.throttle = ThrottledEditor(interval=entry.interval, concurrency=entry.concurrency, executor=executor)
+        self._site: Optional[Site] = None
+        self._site_lock = threading.Lock()
+
+    @property
+    def site(self) -> Site:
+        """The wiki's Site. Building it may load the wiki's siteinfo, so use this from the executor."""
+        if self._site is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+            else:
+                raise RuntimeError(f"Building the Site for {self.entry.key} blocks, so use it from the executor.")
+            with self._site_lock:
+                if self._site is None:
+                    family = AutoFamily(self.entry.key, self.entry.api)
+                    self._site = pywikibot.Site(code=self.entry.key, fam=family)
+        return self._site
+
+    async def run(self, func: Callable[[Site], T]) -> T:
+        """Run func(site) in the pool's executor, once this wiki's throttle allows."""
+        return await self.throttle.run(lambda: func(self.site))
+
+
+class WikiPool:
+    """
+    Connections to every wiki in a WikiRegistry.
+
+    Making the pool only reads the registry; no Site is built until something is run on that wiki,
+    so it costs the same to start with three wikis or three hundred.
+    Work runs in the pool's own bounded executor, so wikis that hang past a fan out's timeout
+    (whose threads can't be stopped) only tie up the pool, never the executor the rest of the bot uses.
+    Use the pool from the event loop.
+    """
+
+    def __init__(self, registry: WikiRegistry, concurrency: int = FAN_OUT_CONCURRENCY):
+        self.registry = registry
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='WikiPool')
+        self._connections: dict[str, WikiConnection] = {}
+
+    def __len__(self):
+        return len(self.registry.wikis)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.registry.wikis
+
+    def connection(self, key: str) -> WikiConnection:
+        entry = self.registry.wikis[key]
+        connection = self._connections.get(key)
+        # Re-made if the registry entry was replaced, e.g. with a new throttle
+        if connection is None or connection.entry is not entry:
+            connection = self._connections[key] = WikiConnection(entry, self.executor)
+        return connection
+
+    def close(self):
+        """Stop the pool's threads once their current work is done."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def fan_out(self, func: Callable[[Site], T], keys: Optional[Iterable[str]] = None,
+                      timeout: Optional[float] = None) -> dict[str, Union[T, Exception]]:
+        """
+        Run func(site) on each of the wikis (default all), up to the pool's concurrency at once
+        and each within its own wiki's throttle. Returns each wiki's result, or the exception it raised
+        (asyncio.TimeoutError if it took longer than timeout seconds), so one broken wiki doesn't fail the rest.
+        """
+        keys = list(self.registry.wikis if keys is None else keys)
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(key: str):
+            async with limit:
+                try:
+                    return await asyncio.wait_for(self.connection(key).run(func), timeout)
+                except Exception as err:
+                    logging.info(f"WikiPool: {key} failed: {err!r}")
+                    return err
+
+        results = await asyncio.gather(*(run_one(key) for key in keys))
+        return dict(zip(keys, results))
@@ -0,0 +1,67 @@
+import logging
+import time
+from typing import Any, Optional
+
+import aiohttp
+
+from src.squidge.pwbsupport.http_pool import get_http_session
+from src.squidge.savedata.checkpoint import Checkpoint
+
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=12, sock_connect=6.1)
+
+
+class CachedJsonFetcher:
+    """
+    A JSON document fetched over HTTP, with the last copy kept on disk along with its ETag and Last-Modified.
+
+    The cached copy is there straight away after a restart, and fetching again sends a conditional request,
+    so when nothing changed the server only answers 304 Not Modified instead of sending the whole document.
+    """
+
+    def __init__(self, url: str, path: str):
+        self.url = url
+        self.checkpoint = Checkpoint(path)
+        self.data: Optional[Any] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        # time.time() of the last fetch that reached the server, including 304s
+        self.checked_at: Optional[float] = None
+
+    def load_cached(self) -> Optional[Any]:
+        """Return the copy on disk, or None if there isn't one for this URL."""
+        state = self.checkpoint.load()
+        if state and state.get('url') == self.url:
+            self.data = state.get('data')
+            self.etag = state.get('etag')
+            self.last_modified = state.get('last_modified')
+            self.checked_at = state.get('checked_at')
+        return self.data
+
+    def _save(self):
+        self.checkpoint.save({'url': self.url, 'etag': self.etag, 'last_modified': self.last_modified,
+                              'checked_at': self.checked_at, 'data': self.data})
+
+    async def fetch(self) -> tuple[Any, bool]:
+        """
+        Fetch the document if it changed since the cached copy.
+        Returns the document and whether it changed. Raises aiohttp.ClientError if the request fails.
+        """
+        headers = {}
+        if self.data is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+        async with get_http_session().get(self.url, headers=headers, timeout=FETCH_TIMEOUT) as response:
+            self.checked_at = time.time()
+            if response.status == 304:
+                logging.info(f"CachedJsonFetcher: {self.url} is unchanged.")
+                return self.data, False
+            response.raise_for_status()
+            # GitHub's raw files are served as text/plain
+            self.data = await response.json(content_type=None)
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+        self._save()
+        return self.data, True
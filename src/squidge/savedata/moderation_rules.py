@@ -0,0 +1,32 @@
+import json
+from dataclasses import dataclass, field
+from typing import Union
+
+# Without saved rules, moderation is the Sight Engine check on new pages, accounts and uploads
+DEFAULT_RULES = [
+    {"name": "profanity", "kind": "external", "service": "sightengine", "events": ["new", "newusers", "upload"]},
+]
+
+
+@dataclass
+class ModerationRules:
+    rules: list[dict] = field(default_factory=lambda: [dict(rule) for rule in DEFAULT_RULES])
+
+    @staticmethod
+    def from_json(obj: Union[str, dict]):
+        if isinstance(obj, str):
+            json_ob = json.loads(obj)
+        elif isinstance(obj, dict):
+            json_ob = obj
+        else:
+            assert False, f"ModerationRules: Unknown type passed to from_json: {type(obj)}"
+
+        assert isinstance(json_ob, dict)
+        if "moderation_rules" not in json_ob:
+            return ModerationRules()
+        return ModerationRules(
+            rules=json_ob["moderation_rules"]
+        )
+
+    def as_dict(self):
+        return {"moderation_rules": self.rules}
@@ -0,0 +1,127 @@
+import difflib
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+
+# The WikiLookup fields a wiki can be searched by
+SEARCH_FIELDS = ('games', 'series', 'systems', 'genres', 'companies')
+NON_WORD_REGEX = re.compile(r'[\W_]+')
+
+
+def normalise_term(term: str) -> str:
+    """Case-folded, without accents, punctuation or spaces, so 'Pokémon Red' matches 'pokemon red'."""
+    decomposed = unicodedata.normalize('NFKD', term.casefold())
+    return NON_WORD_REGEX.sub('', ''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+class NIWAWikiIndex:
+    """
+    A WOB or WikiLookup wiki list, with case-insensitive maps from name, key and alias to wiki,
+    so lookups and uniqueness checks don't scan the list. Where two wikis share a name, the first is found.
+
+    Wikis are only ever added, and their positions in `wikis` never change, so the search index can
+    refer to them by position. After changing a wiki's fields, call reindex() with it.
+    """
+
+    def __init__(self, wikis: Iterable[dict] = ()):
+        self.wikis: list[dict] = []
+        self._by_name: dict[str, dict] = {}
+        self._by_key: dict[str, dict] = {}
+        self._by_alias: dict[str, dict] = {}
+        # id() of each wiki to its position
+        self._positions: dict[int, int] = {}
+        # Field to normalised term to the positions of the wikis with it
+        self._terms: dict[str, dict[str, set[int]]] = {name: defaultdict(set) for name in SEARCH_FIELDS}
+        # The original spelling of each normalised term, for display
+        self._spellings: dict[str, str] = {}
+        # Whether the list was changed since it was made, e.g. by wl_add
+        self.modified = False
+        for wiki in wikis:
+            self._index(len(self.wikis), wiki)
+            self.wikis.append(wiki)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.wikis)
+
+    def __len__(self) -> int:
+        return len(self.wikis)
+
+    def __bool__(self) -> bool:
+        return bool(self.wikis)
+
+    def _index(self, position: int, wiki: dict):
+        self._positions[id(wiki)] = position
+        self._by_name.setdefault(wiki.get("name", "").casefold(), wiki)
+        if wiki.get("key"):
+            self._by_key.setdefault(wiki["key"].casefold(), wiki)
+        for alias in wiki.get("aliases") or []:
+            self._by_alias.setdefault(alias.casefold(), wiki)
+        for field in SEARCH_FIELDS:
+            for term in wiki.get(field) or []:
+                normalised = normalise_term(term)
+                if normalised:
+                    self._terms[field][normalised].add(position)
+                    self._spellings.setdefault(normalised, term)
+
+    def add(self, wiki: dict):
+        self._index(len(self.wikis), wiki)
+        self.wikis.append(wiki)
+        self.modified = True
+
+    def reindex(self, wiki: dict):
+        """Update the search index after the wiki's fields were changed."""
+        position = self._positions[id(wiki)]
+        for field in SEARCH_FIELDS:
+            for positions in self._terms[field].values():
+                positions.discard(position)
+        self._index(position, wiki)
+        self.modified = True
+
+    def by_name(self, name: str) -> Optional[dict]:
+        return self._by_name.get(name.casefold())
+
+    def by_key(self, key: str) -> Optional[dict]:
+        return self._by_key.get(key.casefold())
+
+    def by_alias(self, alias: str) -> Optional[dict]:
+        return self._by_alias.get(alias.casefold())
+
+    def alias_conflicts(self, aliases: Iterable[str]) -> list[str]:
+        """Return the given aliases that another wiki already uses."""
+        return [alias for alias in aliases if alias.casefold() in self._by_alias]
+
+    def search(self, query: str, fields: Iterable[str] = ('games', 'series', 'systems'),
+               limit: int = 25) -> list[tuple[dict, list[str]]]:
+        """
+        Return the wikis whose fields match the query, best first, each with the terms it matched.
+        A term matches if it is the query, starts with it, contains it, or is a close spelling of it.
+        """
+        wanted = normalise_term(query)
+        if not wanted:
+            return []
+
+        # Position to score, and the matched terms
+        scores: dict[int, float] = defaultdict(float)
+        matched: dict[int, list[str]] = defaultdict(list)
+        for field in fields:
+            terms = self._terms.get(field, {})
+            close = set(difflib.get_close_matches(wanted, terms.keys(), n=10, cutoff=0.8))
+            for term, positions in terms.items():
+                if term == wanted:
+                    score = 3.0
+                elif term.startswith(wanted):
+                    score = 2.0
+                elif wanted in term:
+                    score = 1.0
+                elif term in close:
+                    score = difflib.SequenceMatcher(None, wanted, term).ratio()
+                else:
+                    continue
+                for position in positions:
+                    if score > scores[position]:
+                        scores[position] = score
+                    matched[position].append(self._spellings[term])
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], self.wikis[position].get("name", "")))
+        return [(self.wikis[position], matched[position]) for position in ranked[:limit]]
@@ -6,6 +6,7 @@ from discord.abc import Messageable
 from discord.ext.commands import Context
 
 from src.squidge.savedata.bad_words import BadWords
+from src.squidge.savedata.moderation_rules import ModerationRules
 from src.squidge.savedata.niwa_permissions import NIWAPermissions
 from src.squidge.savedata.wiki_permissions import WikiPermissions
 from src.squidge.savedata.highlights import Highlights
@@ -17,6 +18,7 @@ class SaveData:
     bad_words: BadWords = field(default_factory=BadWords)
     niwa_permissions: NIWAPermissions = field(default_factory=NIWAPermissions)
     highlights: Highlights = field(default_factory=Highlights)
+    moderation_rules: ModerationRules = field(default_factory=ModerationRules)
 
     @staticmethod
     def from_json(save_data_json):
@@ -24,7 +26,8 @@ class SaveData:
             wiki_permissions=WikiPermissions.from_json(save_data_json),
             bad_words=BadWords.from_json(save_data_json),
             niwa_permissions=NIWAPermissions.from_json(save_data_json),
-            highlights=Highlights.from_json(save_data_json)
+            highlights=Highlights.from_json(save_data_json),
+            moderation_rules=ModerationRules.from_json(save_data_json)
         )
         return sd
 
@@ -36,5 +39,6 @@ class SaveData:
         to_save = (self.wiki_permissions.as_dict()
                    | self.bad_words.as_dict()
                    | self.niwa_permissions.as_dict()
-                   | self.highlights.as_dict())
+                   | self.highlights.as_dict()
+                   | self.moderation_rules.as_dict())
         await channel.send(json.dumps(to_save))
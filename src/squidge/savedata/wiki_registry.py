@@ -0,0 +1,100 @@
+import json
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Union, Optional, Iterable
+
+from src.squidge.savedata.checkpoint import Checkpoint
+
+DEFAULT_REGISTRY_FILE = "data/wiki_registry.json"
+# Seconds between requests to one wiki, and requests in flight to it at once, unless the wiki says otherwise
+DEFAULT_INTERVAL = 1.0
+DEFAULT_CONCURRENCY = 2
+
+
+def wiki_key(name: str) -> str:
+    """Return a key for a wiki from its name, e.g. 'Bulbapedia (FR)' -> 'bulbapedia-fr'."""
+    return re.sub(r'[\W_]+', '-', name.casefold()).strip('-')
+
+
+@dataclass
+class WikiEntry:
+    key: str
+    name: str
+    # The full URL to the wiki's api.php
+    api: str
+    lang: str = 'en'
+    interval: float = DEFAULT_INTERVAL
+    concurrency: int = DEFAULT_CONCURRENCY
+
+    @staticmethod
+    def from_json(obj: dict):
+        return WikiEntry(
+            key=obj["key"],
+            name=obj.get("name", obj["key"]),
+            api=obj["api"],
+            lang=obj.get("lang", 'en'),
+            interval=obj.get("interval", DEFAULT_INTERVAL),
+            concurrency=obj.get("concurrency", DEFAULT_CONCURRENCY)
+        )
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class WikiRegistry:
+    """
+    The wikis the bot can reach beyond its own family, e.g. the NIWA wikis, by key.
+    This can hold far more than fits in the save data message, so it's kept in its own file.
+    """
+    wikis: dict[str, WikiEntry] = field(default_factory=dict)
+
+    @staticmethod
+    def from_json(obj: Union[str, dict]):
+        if isinstance(obj, str):
+            json_ob = json.loads(obj)
+        elif isinstance(obj, dict):
+            json_ob = obj
+        else:
+            assert False, f"WikiRegistry: Unknown type passed to from_json: {type(obj)}"
+
+        assert isinstance(json_ob, dict)
+        entries = (WikiEntry.from_json(wiki) for wiki in json_ob.get("wikis", []))
+        return WikiRegistry(
+            wikis={entry.key: entry for entry in entries}
+        )
+
+    def as_dict(self):
+        return {"wikis": [entry.as_dict() for entry in self.wikis.values()]}
+
+    @staticmethod
+    def load(path: str = DEFAULT_REGISTRY_FILE) -> 'WikiRegistry':
+        return WikiRegistry.from_json(Checkpoint(path).load() or {})
+
+    def save(self, path: str = DEFAULT_REGISTRY_FILE):
+        Checkpoint(path).save(self.as_dict())
+
+    def merge(self, entries: Iterable[WikiEntry]) -> int:
+        """Add or replace the given wikis, keeping any throttle settings already given. Returns how many were new."""
+        added = 0
+        for entry in entries:
+            existing: Optional[WikiEntry] = self.wikis.get(entry.key)
+            if existing is None:
+                added += 1
+            else:
+                entry.interval, entry.concurrency = existing.interval, existing.concurrency
+            self.wikis[entry.key] = entry
+        return added
+
+    @staticmethod
+    def entries_from_wiki_lookup(wl_wikis: list[dict]) -> list[WikiEntry]:
+        """The WikiLookup (wl_pull) wikis as entries. WikiLookup gives the api URL directly."""
+        return [WikiEntry(key=wiki_key(f"{wiki['name']} {wiki.get('lang', 'en')}"), name=wiki['name'],
+                          api=wiki['api'], lang=wiki.get('lang', 'en'))
+                for wiki in wl_wikis if wiki.get('api')]
+
+    @staticmethod
+    def entries_from_wob(wob_wikis: list[dict]) -> list[WikiEntry]:
+        """The Wiki Operating Buddy (wob_pull) wikis as entries. WOB gives the script path, e.g. https://x.org/w."""
+        return [WikiEntry(key=wiki['key'], name=wiki['name'], api=wiki['url'].rstrip('/') + '/api.php')
+                for wiki in wob_wikis if wiki.get('url')]